@@ -0,0 +1,172 @@
+"""Tablas de amortización y proyección de flujos de la cartera.
+
+Créditos a pagos fijos mensuales (anualidad) con tasa anual nominal. Todo se
+calcula con fórmulas cerradas sobre arreglos de NumPy: el saldo después de k
+pagos es
+
+    saldo_k = P (1 + r)^k - pago ((1 + r)^k - 1) / r
+
+así que la tabla de un crédito o la proyección de toda la cartera no tienen
+un ciclo de Python por mes. La proyección procesa los créditos por bloques
+(créditos x meses) para acotar la memoria.
+"""
+import numpy as np
+
+MAX_PLAZO = 600
+TAMANO_LOTE = 500
+TAMANO_BLOQUE = 4096
+
+COLUMNAS_TABLA = ('periodo', 'pago', 'interes', 'capital', 'saldo')
+
+
+def _a_arreglos(*valores):
+    return np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in valores))
+
+
+def pago_mensual(monto, tasa_anual, plazo):
+    """Pago fijo mensual; acepta escalares o arreglos (NaN si plazo <= 0)"""
+    monto, tasa_anual, plazo = _a_arreglos(monto, tasa_anual, plazo)
+    r = tasa_anual / 1200
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 1 - (1 + r)^-n sin perder precisión con tasas pequeñas
+        pago = np.where(r > 0, monto * r / -np.expm1(-plazo * np.log1p(r)), monto / plazo)
+    return np.where(plazo > 0, pago, np.nan)
+
+
+def saldo_despues_de(monto, tasa_anual, pago, k):
+    """Saldo insoluto después de k pagos (todos los argumentos se difunden)"""
+    monto, tasa_anual, pago, k = _a_arreglos(monto, tasa_anual, pago, k)
+    r = tasa_anual / 1200
+    crecimiento = k * np.log1p(r)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acumulado = np.where(r > 0, np.expm1(crecimiento) / r, k)
+    return monto * np.exp(crecimiento) - pago * acumulado
+
+
+def tabla(monto, tasa_anual, plazo):
+    """Tabla de amortización completa de un crédito como dict de arreglos"""
+    plazo = int(plazo)
+    pago = float(pago_mensual(monto, tasa_anual, plazo))
+    periodo = np.arange(1, plazo + 1)
+    saldos = saldo_despues_de(monto, tasa_anual, pago, np.arange(0, plazo + 1))
+    saldos[-1] = 0.0
+    interes = saldos[:-1] * (tasa_anual / 1200)
+    capital = saldos[:-1] - saldos[1:]
+    return {
+        'periodo': periodo,
+        'pago': interes + capital,
+        'interes': interes,
+        'capital': capital,
+        'saldo': saldos[1:],
+    }
+
+
+def proyectar(montos, tasas, plazos, transcurridos=0, horizonte=None, tamano_bloque=TAMANO_BLOQUE):
+    """Flujo mensual agregado de un conjunto de créditos.
+
+    `transcurridos` es el número de pagos ya vencidos de cada crédito; el mes
+    1 de la proyección es el siguiente pago. Regresa un dict de arreglos por
+    mes: pago, interes, capital, saldo (al cierre) y creditos (vigentes).
+    """
+    montos, tasas, plazos, transcurridos = _a_arreglos(montos, tasas, plazos, transcurridos)
+    restantes = plazos - np.maximum(transcurridos, 0)
+    vigentes = (restantes > 0) & (montos > 0) & (tasas >= 0)
+    montos, tasas, plazos, transcurridos = (a[vigentes] for a in (montos, tasas, plazos, transcurridos))
+    transcurridos = np.maximum(transcurridos, 0)
+    if horizonte is None:
+        horizonte = int(restantes[vigentes].max()) if vigentes.any() else 0
+
+    pagos = pago_mensual(montos, tasas, plazos)
+    r = tasas / 1200
+    con_tasa = r > 0
+    # Con tasa: saldo_k = (P - pago/r) (1 + r)^k + pago/r, una exponencial por celda
+    base = np.divide(pagos, r, out=np.zeros_like(pagos), where=con_tasa)
+    diferencia = montos - base
+    crecimiento = np.log1p(r)
+
+    # Sumas por mes (columna 0: hoy) del saldo y del saldo por la tasa; con
+    # ellas salen interés (tasa x saldo anterior) y capital (baja del saldo)
+    meses = np.arange(0, horizonte + 1)
+    saldo_total = np.zeros(horizonte + 1)
+    saldo_por_tasa = np.zeros(horizonte + 1)
+    for inicio in range(0, len(montos), tamano_bloque):
+        b = slice(inicio, inicio + tamano_bloque)
+        # Pagos hechos al cierre de cada mes; después del último el saldo es 0
+        k = np.minimum(transcurridos[b, None] + meses[None, :], plazos[b, None])
+        saldos = np.exp(k * crecimiento[b, None])
+        saldos *= diferencia[b, None]
+        saldos += base[b, None]
+        sin_tasa = ~con_tasa[b]
+        if sin_tasa.any():
+            saldos[sin_tasa] = montos[b][sin_tasa, None] - pagos[b][sin_tasa, None] * k[sin_tasa]
+        saldo_total += saldos.sum(axis=0)
+        saldo_por_tasa += r[b] @ saldos
+
+    # Créditos con pago en el mes t: los que tienen al menos t pagos pendientes
+    pendientes = (plazos - transcurridos).astype(np.int64)
+    por_restantes = np.bincount(np.minimum(pendientes, horizonte), minlength=horizonte + 1)
+    creditos = por_restantes[::-1].cumsum()[::-1][1:]
+
+    interes = saldo_por_tasa[:-1]
+    capital = saldo_total[:-1] - saldo_total[1:]
+    return {
+        'pago': interes + capital,
+        'interes': interes,
+        'capital': capital,
+        'saldo': saldo_total[1:],
+        'creditos': creditos,
+    }
+
+
+def _mes_absoluto(fecha):
+    return fecha.year * 12 + fecha.month - 1
+
+
+def cargar_cartera(conn):
+    """Créditos aprobados como arreglos: monto, tasa, plazo y mes de inicio"""
+    filas = conn.execute('''
+        SELECT COALESCE(monto_aprobado, monto), tasa_interes, plazo,
+               CAST(strftime('%Y', COALESCE(fecha_aprobacion, fecha_solicitud)) AS INTEGER) * 12
+               + CAST(strftime('%m', COALESCE(fecha_aprobacion, fecha_solicitud)) AS INTEGER) - 1
+        FROM creditos
+        WHERE estado = 'aprobado'
+    ''').fetchall()
+    datos = np.array(filas, dtype=np.float64).reshape(-1, 4)
+    return {
+        'monto': datos[:, 0], 'tasa': datos[:, 1], 'plazo': datos[:, 2],
+        'mes_inicio': np.nan_to_num(datos[:, 3]).astype(np.int64),
+    }
+
+
+def proyectar_cartera(conn, hoy, horizonte=None):
+    """Proyección mensual de la cartera aprobada a partir del mes siguiente a `hoy`"""
+    cartera = cargar_cartera(conn)
+    # El primer pago vence el mes siguiente al desembolso
+    transcurridos = _mes_absoluto(hoy) - cartera['mes_inicio']
+    resultado = proyectar(cartera['monto'], cartera['tasa'], cartera['plazo'], transcurridos, horizonte)
+    primer_mes = _mes_absoluto(hoy) + 1
+    resultado['mes'] = [f'{m // 12:04d}-{m % 12 + 1:02d}'
+                        for m in range(primer_mes, primer_mes + len(resultado['pago']))]
+    return resultado
+
+
+def iterar_csv(tabla_amortizacion, tamano_lote=TAMANO_LOTE):
+    """Tabla de amortización como CSV, en bloques de `tamano_lote` filas"""
+    yield ','.join(COLUMNAS_TABLA) + '\r\n'
+    for bloque in _bloques(tabla_amortizacion, tamano_lote):
+        yield ''.join(f'{p},{pago:.2f},{i:.2f},{c:.2f},{s:.2f}\r\n' for p, pago, i, c, s in bloque)
+
+
+def iterar_ndjson(tabla_amortizacion, tamano_lote=TAMANO_LOTE):
+    """Tabla de amortización como JSON por líneas, en bloques"""
+    for bloque in _bloques(tabla_amortizacion, tamano_lote):
+        yield ''.join(
+            f'{{"periodo":{p},"pago":{pago:.2f},"interes":{i:.2f},"capital":{c:.2f},"saldo":{s:.2f}}}\n'
+            for p, pago, i, c, s in bloque
+        )
+
+
+def _bloques(tabla_amortizacion, tamano_lote):
+    columnas = [tabla_amortizacion[c] for c in COLUMNAS_TABLA]
+    for inicio in range(0, len(columnas[0]), tamano_lote):
+        yield zip(*(c[inicio:inicio + tamano_lote].tolist() for c in columnas))
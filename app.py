@@ -1,172 +1,222 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context, stream_template
 import sqlite3
+import dataclasses
+import json
 from datetime import datetime
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
-import secrets
+import logging
+from werkzeug.security import check_password_hash
+import threading
+import atexit
+
+from conexiones import PoolConexiones
+import solicitudes
+import exportacion
+import scoring
+import reglas
+import codigos_postales
+import rfcs
+import importacion_analistas
+import secuencias
+import credenciales
+import sesiones
+import bitacora
+import estadisticas
+import amortizacion
+import trabajos
+import metricas
+import plantillas
+import modelos
+import busqueda
+import migraciones
+import cache_lectura
+import cartera
+import captura
 
 app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
+logger = logging.getLogger(__name__)
+# Latencia por ruta, consultas a la BD y render de plantillas (ver metricas.py)
+metricas.instrumentar(app)
+# Caché de bytecode, {% fragmento %} y estáticos con huella (ver plantillas.py)
+plantillas.configurar(app)
+# Sin SECRET_KEY se usa la clave compartida guardada en la BD (ver sesiones.py)
+app.secret_key = os.environ.get('SECRET_KEY')
 
 # Configuración de la base de datos
-DATABASE = 'creditos.db'
+DATABASE = os.environ.get('DATABASE', 'creditos.db')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+# Analistas leídos por consulta al recorrer la lista completa (iterar_analistas)
+LOTE_ANALISTAS = 500
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def obtener_pool():
+    """Pool de conexiones del proceso actual (se recrea tras un fork o si cambia DATABASE)"""
+    global _pool
+    pool = _pool
+    if pool is None or pool.database != DATABASE or pool.pid != os.getpid():
+        with _pool_lock:
+            pool = _pool
+            if pool is None or pool.database != DATABASE or pool.pid != os.getpid():
+                # Las conexiones heredadas de otro proceso no se pueden usar ni cerrar aquí
+                if pool is not None and pool.pid == os.getpid():
+                    pool.cerrar()
+                pool = _pool = PoolConexiones(DATABASE, max_conexiones=DB_POOL_SIZE,
+                                              factory=metricas.ConexionMedida)
+    return pool
+
+def cerrar_pool():
+    """Cerrar las conexiones del pool de este proceso"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.cerrar()
+        _pool = None
+
+atexit.register(cerrar_pool)
 
 def get_db():
-    """Obtener conexión a la base de datos"""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Obtener conexión a la base de datos desde el pool.
+
+    Uso: `with get_db() as conn:`. La conexión hace commit al salir del bloque
+    más externo (rollback si hubo excepción) y regresa al pool. Las llamadas
+    anidadas en el mismo hilo reutilizan la misma conexión y no confirman; si
+    fallan, revierten solo su parte (ver PoolConexiones.conexion).
+    """
+    return obtener_pool().conexion()
+
+# Sesiones del lado del servidor: tabla `sesiones` con caché LRU en memoria
+app.session_interface = sesiones.InterfazSesiones(sesiones.AlmacenSQLite(get_db))
+
+# Reglas de negocio vigentes; se verifican contra la BD cada REGLAS_INTERVALO_S
+reglas_vigentes = reglas.CacheReglas(get_db)
+
+# Códigos de analista (E<n>) únicos entre workers, repartidos por bloques
+codigos_analista = secuencias.AsignadorCodigos(get_db, importacion_analistas.SECUENCIA, 'E')
+
+# Números de solicitud (SOL-<n>): llave de idempotencia del formulario de captura
+codigos_solicitud = secuencias.AsignadorCodigos(get_db, captura.SECUENCIA, captura.PREFIJO)
+
+# Trabajo derivado de las decisiones, fuera del hilo de la petición
+cola_trabajos = trabajos.ColaTrabajos(get_db)
+
+# Solicitudes (con cliente) y analistas por código, validados contra cache_versiones
+cache_lecturas = cache_lectura.CacheLectura()
+
+# Agregados de riesgo desde la instantánea de la cartera (ver cartera.py)
+lector_cartera = cartera.LectorCartera(lambda: cartera.directorio(DATABASE))
+
+# Estado del pool y de las cachés, leído al exportar las métricas
+for nombre, ayuda, leer, tipo in (
+    ('credito_bd_conexiones_abiertas', 'Conexiones SQLite abiertas',
+     lambda: obtener_pool().estadisticas()['abiertas'], 'gauge'),
+    ('credito_bd_conexiones_en_uso', 'Conexiones SQLite tomadas por un hilo',
+     lambda: obtener_pool().estadisticas()['en_uso'], 'gauge'),
+    ('credito_bd_esperas_total', 'Veces que un hilo esperó una conexión libre',
+     lambda: obtener_pool().esperas, 'counter'),
+    ('credito_bd_espera_segundos_total', 'Tiempo total esperando una conexión libre',
+     lambda: obtener_pool().tiempo_espera, 'counter'),
+    ('credito_sesiones_cache_aciertos_total', 'Sesiones servidas desde la caché',
+     lambda: app.session_interface.aciertos, 'counter'),
+    ('credito_sesiones_cache_fallos_total', 'Sesiones leídas de la BD',
+     lambda: app.session_interface.fallos, 'counter'),
+    ('credito_nip_cache_aciertos_total', 'Verificaciones de NIP servidas desde la caché',
+     lambda: credenciales.cache_verificaciones.aciertos, 'counter'),
+    ('credito_nip_cache_fallos_total', 'Verificaciones de NIP con hash completo',
+     lambda: credenciales.cache_verificaciones.fallos, 'counter'),
+    ('credito_fragmentos_aciertos_total', 'Fragmentos de plantilla servidos desde la caché',
+     lambda: app.jinja_env.fragmentos.aciertos, 'counter'),
+    ('credito_fragmentos_fallos_total', 'Fragmentos de plantilla renderizados',
+     lambda: app.jinja_env.fragmentos.fallos, 'counter'),
+    ('credito_cache_lectura_aciertos_total', 'Lecturas servidas desde la caché de lectura',
+     lambda: cache_lecturas.aciertos, 'counter'),
+    ('credito_cache_lectura_fallos_total', 'Lecturas de la caché que fueron a la BD',
+     lambda: cache_lecturas.fallos, 'counter'),
+    ('credito_cache_lectura_invalidaciones_total', 'Entradas sacadas por escrituras del proceso',
+     lambda: cache_lecturas.invalidaciones, 'counter'),
+    ('credito_cache_lectura_entradas', 'Entradas en la caché de lectura',
+     lambda: len(cache_lecturas), 'gauge'),
+):
+    metricas.registro.medidor(nombre, ayuda, leer, tipo)
 
 def init_db():
-    """Inicializar la base de datos"""
-    try:
-        with get_db() as conn:
-            cursor = conn.cursor()
-            
-            # Tabla de analistas
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS analistas (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    codigo TEXT UNIQUE NOT NULL,
-                    nombre TEXT NOT NULL,
-                    apellido_paterno TEXT,
-                    apellido_materno TEXT,
-                    rfc TEXT UNIQUE NOT NULL,
-                    telefono TEXT,
-                    nip TEXT NOT NULL,
-                    estado TEXT DEFAULT 'pendiente',
-                    rol TEXT DEFAULT 'analista',
-                    fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Tabla de administradores
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS administradores (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    password TEXT NOT NULL,
-                    email TEXT,
-                    fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Tabla de clientes
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS clientes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nombre TEXT NOT NULL,
-                    apellido_paterno TEXT,
-                    apellido_materno TEXT,
-                    rfc TEXT UNIQUE NOT NULL,
-                    telefono TEXT,
-                    direccion TEXT,
-                    fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    analista_id INTEGER,
-                    FOREIGN KEY (analista_id) REFERENCES analistas (id)
-                )
-            ''')
-            
-            # Tabla de créditos
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS creditos (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    cliente_id INTEGER NOT NULL,
-                    analista_id INTEGER NOT NULL,
-                    monto REAL NOT NULL,
-                    plazo INTEGER NOT NULL,
-                    tasa_interes REAL NOT NULL,
-                    estado TEXT DEFAULT 'pendiente',
-                    fecha_solicitud TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    fecha_aprobacion TIMESTAMP,
-                    observaciones TEXT,
-                    FOREIGN KEY (cliente_id) REFERENCES clientes (id),
-                    FOREIGN KEY (analista_id) REFERENCES analistas (id)
-                )
-            ''')
-            
-            # Crear administrador por defecto si no existe
-            cursor.execute("SELECT COUNT(*) FROM administradores")
-            if cursor.fetchone()[0] == 0:
-                crear_admin_default()
-            
-            conn.commit()
-            print("✅ Base de datos inicializada correctamente")
-            
-    except Exception as e:
-        print(f"❌ Error inicializando base de datos: {e}")
+    """Llevar la base de datos a la versión actual del esquema (ver migraciones.py).
 
-def crear_admin_default():
-    """Crear administrador por defecto"""
-    try:
-        with get_db() as conn:
-            cursor = conn.cursor()
-            # Contraseña: admin123
-            password_hash = generate_password_hash('admin123')
-            cursor.execute('''
-                INSERT INTO administradores (username, password, email)
-                VALUES (?, ?, ?)
-            ''', ('admin', password_hash, 'admin@sistema.com'))
-            
-            # También crear un administrador en la tabla de analistas
-            cursor.execute('''
-                INSERT INTO analistas (codigo, nombre, apellido_paterno, apellido_materno, 
-                                     rfc, telefono, nip, estado, rol)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', ('RAG123', 'Administrador', 'Sistema', '', 'ADMIN123456RF', 
-                  '5555555555', '1234', 'aprobado', 'admin'))
-            
-            conn.commit()
-            print("✅ Administrador por defecto creado")
-    except Exception as e:
-        print(f"❌ Error creando admin: {e}")
+    Con la BD al día es una sola lectura de PRAGMA user_version. Si una
+    migración falla, la excepción se propaga y la aplicación no arranca.
+    """
+    with get_db() as conn:
+        version = migraciones.aplicar(conn)
+    # Clave de firma compartida; se fija aquí para que los workers la hereden ya cargada
+    app.session_interface.clave_secreta(app)
+    logger.info('Base de datos inicializada', extra={'database': DATABASE, 'version': version})
 
-def cargar_analistas():
-    """Cargar analistas desde SQLite - VERSIÓN CORREGIDA"""
-    try:
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM analistas ORDER BY fecha_registro DESC')
-            rows = cursor.fetchall()
-            
-            analistas = []
-            for row in rows:
-                # Manejo correcto de fecha_registro
-                fecha_registro = row['fecha_registro']
-                if fecha_registro:
-                    # Si es string, dejarlo como está
-                    if isinstance(fecha_registro, str):
-                        fecha_str = fecha_registro
-                    # Si es datetime, convertir a string
-                    else:
-                        try:
-                            fecha_str = fecha_registro.strftime('%Y-%m-%d %H:%M:%S')
-                        except:
-                            fecha_str = str(fecha_registro)
+def normalizar_codigo(codigo):
+    """Normalizar un código de analista tal como se guarda en la BD"""
+    return str(codigo or '').strip().upper()
+
+def iterar_analistas():
+    """Analistas del más reciente al más antiguo, uno a la vez.
+
+    Es un generador que lee por lotes de LOTE_ANALISTAS con paginación por
+    llave (fecha_registro, id): cada lote toma una conexión del pool, la
+    lee completa y la regresa antes de entregar filas. Así una página que lo
+    recorre mientras se envía la respuesta (stream_template) nunca retiene
+    una conexión del pool entre yields, ni tiene la lista completa en
+    memoria. El índice sobre fecha_registro evita ordenar la tabla.
+    """
+    ultima = None
+    while True:
+        try:
+            with get_db() as conn:
+                if ultima is None:
+                    filas = conn.execute(f'SELECT {modelos.COLUMNAS_ANALISTA} FROM analistas '
+                                         'ORDER BY fecha_registro DESC, id DESC LIMIT ?',
+                                         (LOTE_ANALISTAS,)).fetchall()
                 else:
-                    # Si no hay fecha, usar la actual
-                    fecha_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                
-                analistas.append({
-                    'id': row['id'],
-                    'codigo': str(row['codigo']).strip().upper(),  # Normalizar código
-                    'nombre': row['nombre'] or '',
-                    'apellido_paterno': row['apellido_paterno'] or '',
-                    'apellido_materno': row['apellido_materno'] or '',
-                    'rfc': str(row['rfc']).strip().upper(),  # Normalizar RFC
-                    'telefono': row['telefono'] or '',
-                    'nip': str(row['nip']).strip(),
-                    'estado': str(row['estado']).strip(),
-                    'rol': str(row['rol']).strip(),
-                    'fecha_registro': fecha_str
-                })
-            
-            print(f"📊 Cargados {len(analistas)} analistas desde SQLite")
-            return analistas
+                    filas = conn.execute(f'SELECT {modelos.COLUMNAS_ANALISTA} FROM analistas '
+                                         'WHERE (fecha_registro, id) < (?, ?) '
+                                         'ORDER BY fecha_registro DESC, id DESC LIMIT ?',
+                                         (*ultima, LOTE_ANALISTAS)).fetchall()
+        except Exception:
+            logger.exception('Error cargando analistas')
+            return
+        for fila in filas:
+            yield modelos.Analista.desde_fila(fila)
+        if len(filas) < LOTE_ANALISTAS:
+            return
+        ultima = (filas[-1][-1], filas[-1][0])
 
-    except Exception as e:
-        print(f"❌ Error cargando analistas: {e}")
-        return []
+def contar_analistas():
+    with get_db() as conn:
+        return conn.execute('SELECT COUNT(*) FROM analistas').fetchone()[0]
+
+def _cargar_analista(conn, codigo):
+    row = conn.execute(f'SELECT {modelos.COLUMNAS_ANALISTA} FROM analistas WHERE codigo = ?',
+                       (codigo,)).fetchone()
+    return modelos.Analista.desde_fila(row) if row else None
+
+def buscar_analista_por_codigo(codigo):
+    """Buscar un solo analista por código usando el índice UNIQUE de analistas.codigo.
+
+    Los códigos se guardan normalizados (sin espacios y en mayúsculas), así que la
+    búsqueda es una igualdad exacta que SQLite resuelve con el índice, sin importar
+    cuántos analistas haya registrados. Pasa por la caché de lectura, validada
+    contra el contador de la partición del analista: aprobarlo, rechazarlo o
+    cambiarle el NIP desde cualquier worker invalida la entrada.
+    """
+    codigo = normalizar_codigo(codigo)
+    if not codigo:
+        return None
+
+    try:
+        with get_db() as conn:
+            return cache_lecturas.obtener(conn, 'analista', codigo, lambda c: _cargar_analista(c, codigo),
+                                          lambda analista: [('analistas', analista.id)])
+    except Exception:
+        logger.exception('Error buscando analista', extra={'codigo': codigo})
+        return None
 
 def guardar_analista(analista_data):
     """Guardar analista en SQLite - VERSIÓN CORREGIDA"""
@@ -175,7 +225,7 @@ def guardar_analista(analista_data):
             cursor = conn.cursor()
             
             # Normalizar datos antes de guardar
-            codigo = str(analista_data.get('codigo', '')).strip().upper()
+            codigo = normalizar_codigo(analista_data.get('codigo'))
             rfc = str(analista_data.get('rfc', '') or analista_data.get('RFC', '')).strip().upper()
             telefono = analista_data.get('telefono', '') or analista_data.get('teléfono', '')
             
@@ -185,25 +235,23 @@ def guardar_analista(analista_data):
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
             ''', (
                 codigo,
-                analista_data.get('nombre', ''),
-                analista_data.get('apellido_paterno', ''),
-                analista_data.get('apellido_materno', ''),
+                analista_data.get('nombre') or '',
+                analista_data.get('apellido_paterno') or '',
+                analista_data.get('apellido_materno') or '',
                 rfc,
-                telefono,
-                analista_data.get('nip', ''),
-                analista_data.get('estado', 'pendiente'),
-                analista_data.get('rol', 'analista')
+                telefono or '',
+                credenciales.hashear_nip(str(analista_data.get('nip', '') or '').strip()),
+                str(analista_data.get('estado') or 'pendiente').strip().lower(),
+                str(analista_data.get('rol') or 'analista').strip()
             ))
-            
-            conn.commit()
-            print(f"✅ Analista {codigo} guardado en SQLite")
-            return True
+        logger.info('Analista guardado', extra={'codigo': codigo})
+        return True
 
     except sqlite3.IntegrityError as e:
-        print(f"⚠️ Error de integridad (RFC o código duplicado): {e}")
+        logger.warning('RFC o código de analista duplicado', extra={'error': str(e)})
         return False
-    except Exception as e:
-        print(f"❌ Error guardando analista: {e}")
+    except Exception:
+        logger.exception('Error guardando analista')
         return False
 
 def actualizar_analista(codigo, nuevos_datos):
@@ -217,49 +265,37 @@ def actualizar_analista(codigo, nuevos_datos):
                     rfc = ?, telefono = ?, estado = ?
                 WHERE codigo = ?
             ''', (
-                nuevos_datos.get('nombre'),
-                nuevos_datos.get('apellido_paterno'),
-                nuevos_datos.get('apellido_materno'),
-                nuevos_datos.get('rfc'),
-                nuevos_datos.get('telefono'),
-                nuevos_datos.get('estado'),
-                codigo
+                nuevos_datos.get('nombre') or '',
+                nuevos_datos.get('apellido_paterno') or '',
+                nuevos_datos.get('apellido_materno') or '',
+                str(nuevos_datos.get('rfc') or '').strip().upper(),
+                nuevos_datos.get('telefono') or '',
+                str(nuevos_datos.get('estado') or 'pendiente').strip().lower(),
+                normalizar_codigo(codigo)
             ))
-            conn.commit()
-            return True
-    except Exception as e:
-        print(f"❌ Error actualizando analista: {e}")
+        cache_lecturas.invalidar('analista', normalizar_codigo(codigo))
+        return True
+    except Exception:
+        logger.exception('Error actualizando analista', extra={'codigo': codigo})
         return False
 
 def aprobar_todos_los_analistas():
-    """Aprobar todos los analistas pendientes - útil para desarrollo"""
+    """Aprobar todos los analistas pendientes - útil para desarrollo.
+
+    Regresa el número de analistas aprobados (None si hubo error).
+    """
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            
-            # Primero, ver cuántos están pendientes
-            cursor.execute("SELECT COUNT(*) FROM analistas WHERE estado = 'pendiente'")
-            pendientes = cursor.fetchone()[0]
-            
-            if pendientes > 0:
-                # Aprobar todos los pendientes
-                cursor.execute("""
-                    UPDATE analistas 
-                    SET estado = 'aprobado' 
-                    WHERE estado = 'pendiente'
-                """)
-                conn.commit()
-                print(f"✅ {pendientes} analistas aprobados")
-            else:
-                print("ℹ️ No hay analistas pendientes")
-                
-            # Mostrar estado actual
-            cursor.execute("SELECT codigo, nombre, estado FROM analistas")
-            for row in cursor.fetchall():
-                print(f"Analista {row[0]} - {row[1]}: {row[2]}")
-                
-    except Exception as e:
-        print(f"❌ Error: {e}")
+            aprobados = conn.execute("""
+                UPDATE analistas 
+                SET estado = 'aprobado' 
+                WHERE estado = 'pendiente'
+            """).rowcount
+        logger.info('Analistas pendientes aprobados', extra={'total': aprobados})
+        return aprobados
+    except Exception:
+        logger.exception('Error aprobando analistas pendientes')
+        return None
 
 # RUTAS DE LA APLICACIÓN
 
@@ -273,7 +309,7 @@ def registro_analista():
     """Página de registro de analista - CORREGIDA"""
     if request.method == 'POST':
         # Generar código automático
-        codigo = f"E{str(secrets.randbelow(900) + 100)}"
+        codigo = codigos_analista.siguiente()
         
         # Obtener datos del formulario
         nombre_completo = request.form.get('nombre', '').strip()
@@ -315,61 +351,60 @@ def login_analista():
             codigo = request.form.get('codigo', '').strip().upper()
             nip = request.form.get('nip', '').strip()
 
-            print(f"🔐 Intento de login - Código: '{codigo}', NIP: '{nip}'")
+            logger.debug('Intento de login', extra={'codigo': codigo})
             
             if not codigo or not nip:
                 flash('Ingrese código y NIP', 'error')
                 return render_template('login_analista.html')
 
-            # Cargar analistas de la base de datos
-            analistas = cargar_analistas()
-            print(f"📋 Total analistas en BD: {len(analistas)}")
-            print(f"📋 Códigos disponibles: {[a.get('codigo') for a in analistas]}")
-            
-            # Buscar analista con código exacto (comparación normalizada)
-            analista = None
-            for a in analistas:
-                codigo_bd = str(a.get('codigo', '')).strip().upper()
-                print(f"Comparando: '{codigo}' con '{codigo_bd}'")
-                if codigo_bd == codigo:
-                    analista = a
-                    print(f"✅ Analista encontrado: {a.get('nombre')}")
-                    break
+            # Límite de intentos por código y por IP antes de calcular el hash
+            if not credenciales.permitir_intento(codigo, request.remote_addr or ''):
+                logger.warning('Demasiados intentos de login',
+                               extra={'codigo': codigo, 'ip': request.remote_addr})
+                flash('Demasiados intentos. Espere un momento antes de volver a intentar.', 'error')
+                return render_template('login_analista.html'), 429
+
+            # Buscar analista con código exacto (consulta indexada de una sola fila)
+            analista = buscar_analista_por_codigo(codigo)
 
             if not analista:
-                print(f"❌ Código {codigo} no encontrado en la base de datos")
+                logger.info('Login con código inexistente', extra={'codigo': codigo})
                 flash('Código de analista no encontrado', 'error')
                 return render_template('login_analista.html')
 
             # Verificar estado del analista
-            estado = analista.get('estado', '').strip().lower()
-            print(f"📊 Estado del analista: '{estado}'")
-            
-            if estado != 'aprobado':
+            if analista.estado != 'aprobado':
                 flash('Su cuenta está pendiente de aprobación', 'warning')
                 return render_template('login_analista.html')
 
             # Verificar NIP
-            nip_bd = str(analista.get('nip', '')).strip()
-            if nip_bd != nip:
-                print(f"❌ NIP incorrecto. Esperado: '{nip_bd}', Recibido: '{nip}'")
+            nip_bd = analista.nip
+            if not credenciales.verificar_nip(codigo, nip_bd, nip):
+                logger.info('NIP incorrecto', extra={'codigo': codigo, 'ip': request.remote_addr})
                 flash('NIP incorrecto', 'error')
                 return render_template('login_analista.html')
 
+            # NIP en texto plano o con otro costo: se guarda con el hash vigente
+            if credenciales.necesita_rehash(nip_bd):
+                with get_db() as conn:
+                    conn.execute('UPDATE analistas SET nip = ? WHERE codigo = ?',
+                                 (credenciales.hashear_nip(nip), codigo))
+                cache_lecturas.invalidar('analista', codigo)
+
             # Login exitoso
             session['user_type'] = 'analista'
-            session['user_id'] = analista.get('id')
+            session['user_id'] = analista.id
             session['user_codigo'] = codigo
-            session['user_nombre'] = analista.get('nombre', '')
+            session['user_nombre'] = analista.nombre
             
-            print(f"✅ Login exitoso para analista {codigo}")
-            flash(f'Bienvenido {analista.get("nombre")}', 'success')
+            logger.info('Login de analista', extra={'codigo': codigo})
+            flash(f'Bienvenido {analista.nombre}', 'success')
             
             # Redirigir al módulo de créditos
             return redirect(url_for('creditos'))
 
-        except Exception as e:
-            print(f"❌ Error en login: {e}")
+        except Exception:
+            logger.exception('Error en login de analista')
             flash('Error al procesar el login', 'error')
             return render_template('login_analista.html')
     
@@ -380,7 +415,7 @@ def captura_analista():
     """Captura de nuevo analista"""
     if request.method == 'POST':
         # Generar código automático
-        codigo = f"E{str(secrets.randbelow(900) + 100)}"
+        codigo = codigos_analista.siguiente()
         
         analista_data = {
             'codigo': codigo,
@@ -399,7 +434,15 @@ def captura_analista():
         else:
             flash('Error al registrar analista. RFC o código puede estar duplicado.', 'error')
     
-    return render_template('captura_analista.html')
+    resumen = {}
+    if 'user_type' in session:
+        with get_db() as conn:
+            resumen = estadisticas.obtener(conn, _analista_filtrado())
+    return render_template('captura_analista.html',
+                           total_solicitudes=resumen.get('total', 0),
+                           aprobadas=resumen.get('aprobadas', 0),
+                           rechazadas=resumen.get('rechazadas', 0),
+                           zona_gris=resumen.get('zona_gris', 0))
 
 @app.route('/login_admin', methods=['GET', 'POST'])
 def login_admin():
@@ -434,7 +477,15 @@ def panel_admin():
         flash('Acceso no autorizado', 'error')
         return redirect(url_for('index'))
     
-    return render_template('panel_admin.html')
+    datos = lector_cartera.agregados()
+    return render_template('panel_admin.html', cartera=datos, **_tarjetas_admin(datos))
+
+def _tarjetas_admin(datos):
+    """Totales de las tarjetas de panel_admin; vacíos hasta la primera instantánea"""
+    if datos is None:
+        return {}
+    return {'total_solicitudes': datos['total_solicitudes'], 'aprobadas': datos['aprobadas'],
+            'rechazadas': datos['rechazadas'], 'total_analistas': datos['analistas_activos']}
 
 @app.route('/admin_panel')
 def admin_panel():
@@ -448,8 +499,9 @@ def gestionar_analistas():
         flash('Acceso no autorizado', 'error')
         return redirect(url_for('index'))
     
-    analistas = cargar_analistas()
-    return render_template('gestionar_analistas.html', analistas=analistas)
+    # La tabla se genera fila por fila mientras se envía la respuesta
+    return Response(stream_template('gestionar_analistas.html', analistas=iterar_analistas(),
+                                    total_analistas=contar_analistas()))
 
 @app.route('/admin/aprobar_analista/<codigo>')
 def aprobar_analista(codigo):
@@ -463,10 +515,10 @@ def aprobar_analista(codigo):
             cursor = conn.cursor()
             cursor.execute(
                 "UPDATE analistas SET estado = 'aprobado' WHERE codigo = ?", 
-                (codigo,)
+                (normalizar_codigo(codigo),)
             )
-            conn.commit()
-            flash(f'Analista {codigo} aprobado', 'success')
+        cache_lecturas.invalidar('analista', normalizar_codigo(codigo))
+        flash(f'Analista {codigo} aprobado', 'success')
     except Exception as e:
         flash(f'Error al aprobar analista: {e}', 'error')
     
@@ -484,10 +536,10 @@ def rechazar_analista(codigo):
             cursor = conn.cursor()
             cursor.execute(
                 "UPDATE analistas SET estado = 'rechazado' WHERE codigo = ?", 
-                (codigo,)
+                (normalizar_codigo(codigo),)
             )
-            conn.commit()
-            flash(f'Analista {codigo} rechazado', 'warning')
+        cache_lecturas.invalidar('analista', normalizar_codigo(codigo))
+        flash(f'Analista {codigo} rechazado', 'warning')
     except Exception as e:
         flash(f'Error al rechazar analista: {e}', 'error')
     
@@ -500,10 +552,103 @@ def aprobar_todos():
         flash('Acceso no autorizado', 'error')
         return redirect(url_for('index'))
     
-    aprobar_todos_los_analistas()
-    flash('Todos los analistas han sido aprobados', 'success')
+    aprobados = aprobar_todos_los_analistas()
+    if aprobados is None:
+        flash('Error al aprobar los analistas', 'error')
+    else:
+        flash(f'{aprobados} analistas aprobados', 'success')
     return redirect(url_for('gestionar_analistas'))
 
+def _responder_lote(resultado, mensaje, redirigir):
+    """JSON para clientes de API; flash con el resumen para el formulario"""
+    if request.is_json or request.accept_mimetypes.best == 'application/json':
+        return jsonify(success=True, **resultado)
+    errores = resultado['errores']
+    flash(mensaje, 'success' if not errores else 'warning')
+    for fila, detalle in errores[:10]:
+        flash(f'{fila}: {"; ".join(detalle) if isinstance(detalle, list) else detalle}', 'error')
+    if len(errores) > 10:
+        flash(f'... y {len(errores) - 10} errores más', 'error')
+    return redirect(redirigir)
+
+@app.route('/admin/importar_analistas', methods=['POST'])
+def importar_analistas():
+    """Alta masiva de analistas desde un archivo CSV/JSON o un cuerpo JSON"""
+    if session.get('user_type') != 'admin':
+        if request.is_json:
+            return jsonify({'success': False, 'error': 'No autorizado'}), 401
+        flash('Acceso no autorizado', 'error')
+        return redirect(url_for('index'))
+
+    try:
+        if request.is_json:
+            datos = request.get_json(silent=True)
+            registros = datos.get('registros') if isinstance(datos, dict) else datos
+            if not isinstance(registros, list) or not all(isinstance(r, dict) for r in registros):
+                raise importacion_analistas.ArchivoInvalidoError('Se esperaba una lista de registros')
+        else:
+            archivo = request.files.get('archivo')
+            if not archivo or not archivo.filename:
+                raise importacion_analistas.ArchivoInvalidoError('Seleccione un archivo CSV o JSON')
+            registros = importacion_analistas.leer_registros(archivo.read(), archivo.filename)
+    except importacion_analistas.ArchivoInvalidoError as e:
+        if request.is_json:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        flash(str(e), 'error')
+        return redirect(url_for('gestionar_analistas'))
+
+    with get_db() as conn:
+        resultado = importacion_analistas.importar_analistas(conn, registros)
+    return _responder_lote(
+        resultado,
+        f"{len(resultado['insertados'])} analistas importados, {len(resultado['errores'])} filas con errores",
+        url_for('gestionar_analistas'),
+    )
+
+@app.route('/admin/estado_analistas', methods=['POST'])
+def estado_analistas():
+    """Aprobar, rechazar o regresar a pendiente los analistas seleccionados"""
+    if session.get('user_type') != 'admin':
+        if request.is_json:
+            return jsonify({'success': False, 'error': 'No autorizado'}), 401
+        flash('Acceso no autorizado', 'error')
+        return redirect(url_for('index'))
+
+    if request.is_json:
+        datos = request.get_json(silent=True) or {}
+        codigos, estado = datos.get('codigos') or [], datos.get('estado')
+    else:
+        codigos, estado = request.form.getlist('codigos'), request.form.get('estado')
+    if estado not in importacion_analistas.ESTADOS or not isinstance(codigos, list):
+        if request.is_json:
+            return jsonify({'success': False, 'error': 'Estado o códigos inválidos'}), 400
+        flash('Seleccione analistas y una acción válida', 'error')
+        return redirect(url_for('gestionar_analistas'))
+
+    with get_db() as conn:
+        resultado = importacion_analistas.cambiar_estado(conn, codigos, estado)
+    return _responder_lote(
+        resultado,
+        f"{len(resultado['actualizados'])} analistas marcados como {estado}",
+        url_for('gestionar_analistas'),
+    )
+
+@app.route('/admin/pool_db')
+def pool_db():
+    """Contadores del pool de conexiones de este proceso"""
+    if session.get('user_type') != 'admin':
+        return jsonify({'success': False, 'error': 'Acceso no autorizado'}), 403
+
+    return jsonify({'success': True, 'pool': obtener_pool().estadisticas()})
+
+@app.route('/admin/cache_lectura')
+def cache_lectura_estado():
+    """Contadores de la caché de lectura de este proceso"""
+    if session.get('user_type') != 'admin':
+        return jsonify({'success': False, 'error': 'Acceso no autorizado'}), 403
+
+    return jsonify({'success': True, 'cache': cache_lecturas.estadisticas()})
+
 @app.route('/creditos')
 def creditos():
     """Módulo de créditos - requiere autenticación"""
@@ -527,14 +672,100 @@ def creditos():
     
     return render_template('creditos.html', user=user_data)
 
-@app.route('/nueva_solicitud')
+def _filtros_solicitudes(analista_id=None):
+    """Filtros de solicitudes tomados del query string"""
+    args = request.args
+    return solicitudes.normalizar_filtros(
+        estado=args.get('estado'),
+        fecha_desde=args.get('fecha_desde'),
+        fecha_hasta=args.get('fecha_hasta'),
+        analista_id=analista_id,
+    )
+
+def _analista_filtrado():
+    """analista_id a filtrar: el propio para analistas, el de ?analista= para admins"""
+    if session.get('user_type') == 'analista':
+        return session.get('user_id')
+
+    codigo = normalizar_codigo(request.args.get('analista'))
+    if not codigo:
+        return None
+    analista = buscar_analista_por_codigo(codigo)
+    # Un código inexistente no debe caer en "todos los analistas"
+    return analista.id if analista else -1
+
+def _pagina_solicitudes(analista_id=None):
+    """Página de solicitudes según los filtros y el cursor del query string"""
+    args = request.args
+    filtros = _filtros_solicitudes(analista_id)
+    # Filtros a conservar en los enlaces de paginación
+    args_filtros = {k: v for k, v in args.items()
+                    if k in ('estado', 'fecha_desde', 'fecha_hasta', 'analista') and v}
+
+    with get_db() as conn:
+        return solicitudes.listar_solicitudes(
+            conn, filtros,
+            cursor=args.get('cursor'),
+            direccion=args.get('dir', 'sig'),
+            page=args.get('page', 1, type=int),
+            por_pagina=args.get('por_pagina', solicitudes.POR_PAGINA, type=int),
+            args_filtros=args_filtros,
+        )
+
+@app.route('/nueva_solicitud', methods=['GET', 'POST'])
 def nueva_solicitud():
-    """Nueva solicitud de crédito"""
+    """Nueva solicitud de crédito.
+
+    El GET asigna el número de solicitud que el formulario reenvía oculto; el
+    POST da de alta cliente y crédito una sola vez por número (ver captura.py),
+    así que un doble envío lleva a la misma solicitud.
+    """
     if 'user_type' not in session:
         flash('Debe iniciar sesión primero', 'error')
         return redirect(url_for('login_analista'))
-    
-    return render_template('nueva_solicitud.html')
+
+    if request.method == 'GET':
+        return render_template('nueva_solicitud.html', numero_solicitud=codigos_solicitud.siguiente())
+
+    numero = request.form.get('numero_solicitud', '').strip()
+    analista_id = session.get('user_id')
+    datos, errores = captura.validar(request.form, reglas_vigentes.obtener()['tasa_base'])
+    if not numero.startswith(captura.PREFIJO):
+        errores.append('Número de solicitud inválido; vuelva a abrir el formulario')
+    if analista_id is None:
+        errores.append('Solo un analista puede capturar solicitudes')
+    if errores:
+        for error in errores:
+            flash(error, 'error')
+        return render_template('nueva_solicitud.html', numero_solicitud=numero,
+                               borrador=request.form.to_dict()), 400
+
+    def encolar_calificacion(conn, credito_id):
+        cola_trabajos.encolar(conn, 'calificar_solicitud', {'credito_id': credito_id},
+                              referencia=f'credito:{credito_id}')
+
+    try:
+        with get_db() as conn:
+            credito_id, creada = captura.registrar(conn, numero, analista_id, datos, encolar_calificacion)
+    except captura.NumeroSolicitudEnUsoError as e:
+        logger.warning('Número de solicitud reutilizado', extra={
+            'numero_solicitud': numero, 'credito_id': e.credito_id, 'usuario': analista_id})
+        flash(f'{e}; se abrió un formulario nuevo', 'error')
+        return redirect(url_for('nueva_solicitud'))
+    except captura.ClienteDeOtroAnalistaError as e:
+        logger.warning('RFC de un cliente de otro analista', extra={
+            'numero_solicitud': numero, 'rfc': e.rfc, 'usuario': analista_id})
+        flash(str(e), 'error')
+        return render_template('nueva_solicitud.html', numero_solicitud=numero,
+                               borrador=request.form.to_dict()), 409
+
+    if creada:
+        logger.info('Solicitud registrada', extra={
+            'credito_id': credito_id, 'numero_solicitud': numero, 'usuario': analista_id})
+        flash('Solicitud registrada correctamente', 'success')
+    else:
+        flash('La solicitud ya estaba registrada', 'info')
+    return redirect(url_for('ver_solicitud', id=credito_id))
 
 @app.route('/mis_solicitudes')
 def mis_solicitudes():
@@ -543,7 +774,129 @@ def mis_solicitudes():
         flash('Debe iniciar sesión primero', 'error')
         return redirect(url_for('login_analista'))
     
-    return render_template('mis_solicitudes.html')
+    # Los analistas solo ven sus propias solicitudes
+    pagina = _pagina_solicitudes(_analista_filtrado())
+    return render_template('mis_solicitudes.html', solicitudes=pagina)
+
+@app.route('/exportar_solicitudes')
+def exportar_solicitudes():
+    """Exportar solicitudes filtradas en CSV (opcionalmente gzip) o XLSX, en flujo"""
+    if 'user_type' not in session:
+        flash('Debe iniciar sesión primero', 'error')
+        return redirect(url_for('login_analista'))
+
+    filtros = _filtros_solicitudes(_analista_filtrado())
+    formato = request.args.get('formato', 'csv').lower()
+    comprimir = request.args.get('gzip', '').lower() in ('1', 'true', 'si')
+    nombre = f"solicitudes_{datetime.now().strftime('%Y%m%d_%H%M')}"
+
+    def generar():
+        # La conexión se mantiene solo mientras dura la descarga
+        with get_db() as conn:
+            filas = exportacion.iterar_filas(conn, filtros)
+            if formato == 'xlsx':
+                yield from exportacion.generar_xlsx(filas)
+            elif comprimir:
+                yield from exportacion.comprimir_gzip(exportacion.generar_csv(filas))
+            else:
+                yield from exportacion.generar_csv(filas)
+
+    if formato == 'xlsx':
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        nombre += '.xlsx'
+    elif comprimir:
+        mimetype = 'application/gzip'
+        nombre += '.csv.gz'
+    else:
+        mimetype = 'text/csv; charset=utf-8'
+        nombre += '.csv'
+
+    return Response(
+        stream_with_context(generar()),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{nombre}"',
+            'X-Accel-Buffering': 'no',
+            'Cache-Control': 'no-store',
+        },
+    )
+
+@app.route('/solicitud/<int:id>')
+def ver_solicitud(id):
+    """Ver una solicitud: evaluación si sigue en proceso, resultado si ya hay decisión"""
+    if 'user_type' not in session:
+        flash('Debe iniciar sesión primero', 'error')
+        return redirect(url_for('login_analista'))
+
+    with get_db() as conn:
+        solicitud = obtener_solicitud(conn, id)
+    if not solicitud:
+        flash('Solicitud no encontrada', 'error')
+        return redirect(url_for('mis_solicitudes'))
+
+    if solicitud.decision:
+        return redirect(url_for('resultado_solicitud', id=id))
+    return redirect(url_for('evaluar_solicitud', id=id))
+
+@app.route('/resultado_solicitud/<int:id>')
+def resultado_solicitud(id):
+    """Resultado de una solicitud con decisión"""
+    if 'user_type' not in session:
+        flash('Debe iniciar sesión primero', 'error')
+        return redirect(url_for('login_analista'))
+
+    with get_db() as conn:
+        solicitud = obtener_solicitud(conn, id)
+    if not solicitud:
+        flash('Solicitud no encontrada', 'error')
+        return redirect(url_for('mis_solicitudes'))
+
+    # La plantilla calcula los pagos del crédito aprobado con este helper
+    return render_template('resultado_solicitud.html', solicitud=solicitud,
+                           calcular_pago_mensual_helper=lambda *a: float(amortizacion.pago_mensual(*a)))
+
+def _dependencias_solicitud(solicitud):
+    return [('creditos', solicitud.id), ('analistas', solicitud.analista_id),
+            ('clientes', solicitud.cliente.id if solicitud.cliente else None)]
+
+def obtener_solicitud(conn, id):
+    """solicitudes.obtener_solicitud a través de la caché de lectura.
+
+    Regresa una copia: se puede modificar (calificar_si_falta lo hace) sin
+    tocar la entrada guardada. El cliente sí es compartido.
+    """
+    return cache_lecturas.obtener(conn, 'solicitud', id, lambda c: solicitudes.obtener_solicitud(c, id),
+                                  _dependencias_solicitud)
+
+def calificar_si_falta(conn, solicitud, reglas_actuales):
+    """Calcular y guardar los scores de una solicitud que aún no los tiene.
+
+    La recomendación se recalcula siempre con las reglas vigentes, aunque el
+    score ya estuviera guardado.
+    """
+    if not solicitud.cliente:
+        return solicitud
+    if solicitud.score_total is not None:
+        solicitud.recomendacion = scoring.recomendar(
+            solicitud.cliente.fico_score, solicitud.cliente.tdsr,
+            solicitud.score_total, reglas_actuales,
+        ).item()
+        return solicitud
+    datos = dataclasses.asdict(solicitud.cliente)
+    for campo in ('monto_solicitado', 'ultima_calificacion', 'mop_6', 'mop_12', 'num_consultas'):
+        datos[campo] = getattr(solicitud, campo)
+    resultado = scoring.calificar_solicitud(datos, reglas_actuales)
+    conn.execute('''
+        UPDATE creditos SET score_cualitativo = ?, score_historial = ?,
+            score_cuantitativo = ?, score_total = ?, recomendacion = ?
+        WHERE id = ?
+    ''', (resultado['score_cualitativo'], resultado['score_historial'],
+          resultado['score_cuantitativo'], resultado['score_total'],
+          resultado['recomendacion'], solicitud.id))
+    cache_lecturas.invalidar('solicitud', solicitud.id)
+    for campo, valor in resultado.items():
+        setattr(solicitud, campo, valor)
+    return solicitud
 
 @app.route('/evaluar_solicitud')
 def evaluar_solicitud():
@@ -551,17 +904,458 @@ def evaluar_solicitud():
     if 'user_type' not in session:
         flash('Debe iniciar sesión primero', 'error')
         return redirect(url_for('login_analista'))
-    
-    return render_template('evaluar_solicitud.html')
 
-@app.route('/reglas_negocio')
+    reglas_actuales = reglas_vigentes.obtener()
+    with get_db() as conn:
+        solicitud = obtener_solicitud(conn, request.args.get('id', type=int) or 0)
+        if solicitud:
+            calificar_si_falta(conn, solicitud, reglas_actuales)
+    if not solicitud:
+        flash('Solicitud no encontrada', 'error')
+        return redirect(url_for('mis_solicitudes'))
+
+    return render_template('evaluar_solicitud.html', solicitud=solicitud, reglas=reglas_actuales)
+
+@app.route('/tomar_decision/<int:id>', methods=['POST'])
+def tomar_decision(id):
+    """Registrar la decisión de una solicitud.
+
+    El cambio de estado se confirma aquí; el trabajo derivado (scores
+    faltantes, resumen de amortización, notificación) se encola en la misma
+    transacción y lo hace la cola de trabajos.
+    """
+    if 'user_type' not in session:
+        flash('Debe iniciar sesión primero', 'error')
+        return redirect(url_for('login_analista'))
+
+    form = request.form
+    decision = form.get('decision_manual', '')
+    justificacion = form.get('justificacion', '').strip()
+
+    with get_db() as conn:
+        solicitud = obtener_solicitud(conn, id)
+        if solicitud and decision == 'automatica':
+            calificar_si_falta(conn, solicitud, reglas_vigentes.obtener())
+            decision = solicitud.recomendacion
+    if not solicitud:
+        flash('Solicitud no encontrada', 'error')
+        return redirect(url_for('mis_solicitudes'))
+    if solicitud.decision:
+        flash('La solicitud ya tiene una decisión', 'warning')
+        return redirect(url_for('resultado_solicitud', id=id))
+
+    errores = []
+    if decision not in solicitudes.ESTADOS_DECISION:
+        errores.append('Seleccione una decisión válida')
+    if not justificacion:
+        errores.append('La justificación es obligatoria')
+    monto_aprobado, tasa, plazo = None, solicitud.tasa_interes, solicitud.plazo
+    if decision == 'aprobado':
+        monto_aprobado = form.get('monto_aprobado', type=float) or solicitud.monto_solicitado
+        tasa = form.get('tasa_interes', type=float) or tasa
+        plazo = form.get('plazo_meses', type=int) or plazo
+        if not monto_aprobado or monto_aprobado <= 0:
+            errores.append('El monto aprobado debe ser mayor que cero')
+        if tasa is None or not 0 <= tasa <= 100:
+            errores.append('La tasa de interés debe estar entre 0 y 100')
+        if not plazo or not 1 <= plazo <= amortizacion.MAX_PLAZO:
+            errores.append(f'El plazo debe estar entre 1 y {amortizacion.MAX_PLAZO} meses')
+    if errores:
+        for error in errores:
+            flash(error, 'error')
+        return redirect(url_for('evaluar_solicitud', id=id))
+
+    motivo_rechazo = (form.get('motivo_rechazo') or None) if decision == 'rechazado' else None
+    observaciones = justificacion
+    if motivo_rechazo:
+        observaciones = f"[{motivo_rechazo}] {justificacion}"
+
+    with get_db() as conn:
+        # La condición sobre el estado evita que dos decisiones simultáneas
+        # se pisen: solo la primera actualiza la fila
+        actualizadas = conn.execute('''
+            UPDATE creditos SET estado = ?, monto_aprobado = ?, tasa_interes = ?, plazo = ?,
+                fecha_aprobacion = CURRENT_TIMESTAMP, observaciones = ?,
+                justificacion = ?, motivo_rechazo = ?
+            WHERE id = ? AND (estado IS NULL OR estado NOT IN (?, ?, ?))
+        ''', (decision, monto_aprobado, tasa, plazo, observaciones, justificacion, motivo_rechazo, id,
+              *solicitudes.ESTADOS_DECISION)).rowcount
+        if actualizadas:
+            cache_lecturas.invalidar('solicitud', id)
+            referencia = f'credito:{id}'
+            for tipo in ('derivados_decision', 'notificar_decision'):
+                cola_trabajos.encolar(conn, tipo, {'credito_id': id}, referencia=referencia)
+    if not actualizadas:
+        flash('La solicitud ya tiene una decisión', 'warning')
+        return redirect(url_for('resultado_solicitud', id=id))
+
+    logger.info('Decisión registrada', extra={
+        'credito_id': id, 'decision': decision,
+        'usuario': session.get('user_id'), 'tipo_usuario': session.get('user_type'),
+    })
+    flash('Decisión registrada correctamente', 'success')
+    return redirect(url_for('resultado_solicitud', id=id))
+
+@cola_trabajos.tarea('derivados_decision')
+def derivados_decision(credito_id):
+    """Scores faltantes y resumen de pagos de un crédito ya decidido"""
+    with get_db() as conn:
+        solicitud = obtener_solicitud(conn, credito_id)
+        if solicitud is None:
+            return None
+        calificar_si_falta(conn, solicitud, reglas_vigentes.obtener())
+    resultado = {'decision': solicitud.decision, 'score_total': solicitud.score_total}
+    if solicitud.decision == 'aprobado':
+        tabla = amortizacion.tabla(solicitud.monto_aprobado, solicitud.tasa_interes, solicitud.plazo)
+        resultado.update(
+            pago_mensual=round(float(tabla['pago'][0]), 2),
+            total_intereses=round(float(tabla['interes'].sum()), 2),
+            total_pagado=round(float(tabla['pago'].sum()), 2),
+        )
+    return resultado
+
+@cola_trabajos.tarea('calificar_solicitud')
+def calificar_solicitud(credito_id):
+    """Scores de una solicitud recién capturada, antes de que la abran para evaluar"""
+    with get_db() as conn:
+        solicitud = obtener_solicitud(conn, credito_id)
+        if solicitud is None:
+            return None
+        calificar_si_falta(conn, solicitud, reglas_vigentes.obtener())
+    return {'score_total': solicitud.score_total, 'recomendacion': solicitud.recomendacion}
+
+@cola_trabajos.tarea('notificar_decision')
+def notificar_decision(credito_id):
+    """Avisar al analista de la decisión (por ahora, en la bitácora)"""
+    with get_db() as conn:
+        solicitud = obtener_solicitud(conn, credito_id)
+    if solicitud is None:
+        return None
+    logger.info('Notificación de decisión', extra={
+        'credito_id': credito_id, 'decision': solicitud.decision,
+        'numero': solicitud.numero, 'analista': solicitud.analista_codigo,
+    })
+    return {'notificado': True}
+
+@cola_trabajos.tarea('instantanea_cartera')
+def instantanea_cartera():
+    """Instantánea de la cartera para los tableros; se vuelve a programar sola"""
+    # La siguiente se programa antes de generar: si esta falla, la cadena sigue
+    programar_instantanea_cartera(retraso=cartera.INTERVALO)
+    with get_db() as conn:
+        meta = cartera.generar(conn, cartera.directorio(DATABASE))
+    return {'filas': meta['filas'], 'duracion_s': meta['duracion_s']}
+
+def programar_instantanea_cartera(retraso=0):
+    """Encolar la siguiente instantánea, salvo que ya haya una pendiente"""
+    with get_db() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        pendiente = conn.execute(
+            "SELECT 1 FROM trabajos WHERE referencia = 'cartera' AND estado = 'pendiente' LIMIT 1"
+        ).fetchone()
+        if not pendiente:
+            # Sin reintentos: si falla, la siguiente programada la reemplaza
+            cola_trabajos.encolar(conn, 'instantanea_cartera', {}, referencia='cartera',
+                                  retraso=retraso, max_intentos=1)
+
+@app.route('/api/generar_rfc', methods=['POST'])
+def api_generar_rfc():
+    """Generar o validar RFC y calcular la edad.
+
+    Acepta un registro (nombre, apellidos, fecha_nacimiento, homoclave, o bien
+    rfc para solo validar) o un lote {"registros": [...]} de hasta
+    rfcs.MAX_LOTE registros; los duplicados se buscan con una consulta por lote.
+    """
+    if 'user_type' not in session:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+
+    datos = request.get_json(silent=True)
+    if isinstance(datos, list):
+        datos = {'registros': datos}
+    if not isinstance(datos, dict):
+        return jsonify({'success': False, 'error': 'Se esperaba un objeto JSON'}), 400
+
+    registros = datos.get('registros')
+    if registros is None:
+        with get_db() as conn:
+            resultado = rfcs.procesar_lote(conn, [datos])[0]
+        if not resultado['valido']:
+            return jsonify(success=False, error='; '.join(resultado['errores']), **resultado)
+        return jsonify(success=True, **resultado)
+
+    if not isinstance(registros, list) or not all(isinstance(r, dict) for r in registros):
+        return jsonify({'success': False, 'error': 'registros debe ser una lista de objetos'}), 400
+    if len(registros) > rfcs.MAX_LOTE:
+        return jsonify({'success': False,
+                        'error': f'Máximo {rfcs.MAX_LOTE} registros por lote'}), 413
+
+    with get_db() as conn:
+        resultados = rfcs.procesar_lote(conn, registros)
+    return jsonify({
+        'success': True,
+        'total': len(resultados),
+        'validos': sum(1 for r in resultados if r['valido']),
+        'duplicados': sum(1 for r in resultados if r['duplicado_en']),
+        'resultados': resultados,
+    })
+
+@app.route('/api/validar_cp', methods=['POST'])
+def api_validar_cp():
+    """Estado, municipio, zona y colonias de un código postal"""
+    if 'user_type' not in session:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+
+    indice = codigos_postales.obtener_indice()
+    if indice is None:
+        return jsonify({'success': False, 'error': 'Catálogo de códigos postales no disponible'}), 503
+
+    datos = request.get_json(silent=True) or request.form
+    codigo_postal = str(datos.get('codigo_postal') or '').strip()
+    registro = indice.buscar(codigo_postal)
+    if registro is None:
+        return jsonify({'success': True, 'valido': False, 'codigo_postal': codigo_postal})
+    return jsonify(success=True, valido=True, **registro)
+
+@app.route('/api/estadisticas_analista')
+def api_estadisticas_analista():
+    """Totales por estado, montos y tasa de aprobación (fila precalculada, con ETag)"""
+    if 'user_type' not in session:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+
+    with get_db() as conn:
+        datos = estadisticas.obtener(conn, _analista_filtrado())
+    respuesta = jsonify(success=True, **datos)
+    # El navegador guarda la respuesta pero revalida siempre (304 si no cambió)
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    respuesta.add_etag()
+    return respuesta.make_conditional(request)
+
+def _filas_en_orden(conn, sql, ids):
+    """Filas de `sql` (con ? = lista JSON de ids) en el orden de relevancia de `ids`"""
+    filas = {fila['id']: fila for fila in conn.execute(sql, (json.dumps(ids),))}
+    return [filas[i] for i in ids if i in filas]
+
+@app.route('/api/buscar_clientes')
+def api_buscar_clientes():
+    """Clientes por nombre, apellidos, RFC o teléfono, por relevancia (ver busqueda.py).
+
+    Un analista solo ve sus clientes; un administrador, todos (o los de ?analista=).
+    """
+    if 'user_type' not in session:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+
+    analista_id = _analista_filtrado()
+    filtro, parametros = ('t.analista_id = ?', (analista_id,)) if analista_id is not None else (None, ())
+    with get_db() as conn:
+        ids, corregida = busqueda.buscar(conn, 'clientes', request.args.get('q', ''),
+                                         request.args.get('limite', 20, type=int), filtro, parametros)
+        filas = _filas_en_orden(conn, '''
+            SELECT c.id, c.nombre, c.apellido_paterno, c.apellido_materno, c.rfc, c.telefono,
+                   (SELECT MAX(cr.id) FROM creditos cr WHERE cr.cliente_id = c.id) AS credito_id
+            FROM clientes c WHERE c.id IN (SELECT value FROM json_each(?))
+        ''', ids)
+    return jsonify(success=True, corregida=corregida, resultados=[{
+        'id': f['id'],
+        'nombre': ' '.join(p for p in (f['nombre'], f['apellido_paterno'], f['apellido_materno']) if p),
+        'rfc': f['rfc'],
+        'telefono': f['telefono'] or '',
+        'url': url_for('ver_solicitud', id=f['credito_id']) if f['credito_id'] else None,
+    } for f in filas])
+
+@app.route('/api/buscar_analistas')
+def api_buscar_analistas():
+    """Analistas por código, nombre, apellidos, RFC o teléfono (solo administradores)"""
+    if session.get('user_type') != 'admin':
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+
+    with get_db() as conn:
+        ids, corregida = busqueda.buscar(conn, 'analistas', request.args.get('q', ''),
+                                         request.args.get('limite', 20, type=int))
+        filas = _filas_en_orden(conn, '''
+            SELECT id, codigo, nombre, apellido_paterno, apellido_materno, rfc, telefono, estado
+            FROM analistas WHERE id IN (SELECT value FROM json_each(?))
+        ''', ids)
+    return jsonify(success=True, corregida=corregida, resultados=[{
+        'codigo': f['codigo'],
+        'nombre': ' '.join(p for p in (f['nombre'], f['apellido_paterno'], f['apellido_materno']) if p),
+        'rfc': f['rfc'],
+        'telefono': f['telefono'],
+        'estado': f['estado'],
+    } for f in filas])
+
+@app.route('/api/amortizacion')
+def api_amortizacion():
+    """Tabla de amortización en flujo (CSV o JSON por líneas).
+
+    Para un crédito existente (?id=) o para montos simulados
+    (?monto=&tasa=&plazo=).
+    """
+    if 'user_type' not in session:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+
+    args = request.args
+    credito_id = args.get('id', type=int)
+    if credito_id is not None:
+        with get_db() as conn:
+            solicitud = obtener_solicitud(conn, credito_id)
+        if not solicitud:
+            return jsonify({'success': False, 'error': 'Solicitud no encontrada'}), 404
+        monto = solicitud.monto_aprobado or solicitud.monto_solicitado
+        tasa, plazo = solicitud.tasa_interes, solicitud.plazo
+    else:
+        monto, tasa, plazo = args.get('monto', type=float), args.get('tasa', type=float), args.get('plazo', type=int)
+
+    if not monto or monto <= 0 or tasa is None or tasa < 0:
+        return jsonify({'success': False, 'error': 'Monto y tasa inválidos'}), 400
+    if not plazo or not 1 <= plazo <= amortizacion.MAX_PLAZO:
+        return jsonify({'success': False,
+                        'error': f'El plazo debe estar entre 1 y {amortizacion.MAX_PLAZO} meses'}), 400
+
+    tabla = amortizacion.tabla(monto, tasa, plazo)
+    if args.get('formato', 'csv').lower() == 'ndjson':
+        generar, mimetype, extension = amortizacion.iterar_ndjson, 'application/x-ndjson', 'ndjson'
+    else:
+        generar, mimetype, extension = amortizacion.iterar_csv, 'text/csv; charset=utf-8', 'csv'
+    nombre = f"amortizacion_{credito_id if credito_id is not None else 'simulacion'}.{extension}"
+
+    return Response(
+        stream_with_context(generar(tabla)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{nombre}"',
+            'X-Accel-Buffering': 'no',
+            'Cache-Control': 'no-store',
+        },
+    )
+
+@app.route('/api/proyeccion_cartera')
+def api_proyeccion_cartera():
+    """Flujo mensual proyectado de la cartera aprobada (solo administradores)"""
+    if session.get('user_type') != 'admin':
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+
+    horizonte = request.args.get('horizonte', type=int)
+    if horizonte is not None and not 1 <= horizonte <= amortizacion.MAX_PLAZO:
+        return jsonify({'success': False,
+                        'error': f'El horizonte debe estar entre 1 y {amortizacion.MAX_PLAZO} meses'}), 400
+
+    with get_db() as conn:
+        proyeccion = amortizacion.proyectar_cartera(conn, datetime.now(), horizonte)
+    return jsonify(
+        success=True, mes=proyeccion['mes'], creditos=proyeccion['creditos'].tolist(),
+        **{clave: proyeccion[clave].round(2).tolist() for clave in ('pago', 'interes', 'capital', 'saldo')},
+    )
+
+@app.route('/api/cartera')
+def api_cartera():
+    """Agregados de riesgo de la última instantánea de la cartera"""
+    if session.get('user_type') != 'admin':
+        return jsonify({'success': False, 'error': 'Acceso no autorizado'}), 403
+
+    datos = lector_cartera.agregados()
+    if datos is None:
+        return jsonify({'success': False, 'error': 'Aún no hay instantánea de la cartera'}), 503
+    return jsonify(success=True, **datos)
+
+@app.route('/api/estadisticas_admin')
+def api_estadisticas_admin():
+    """Tarjetas de panel_admin (las actualiza panel_admin.js)"""
+    if session.get('user_type') != 'admin':
+        return jsonify({'success': False, 'error': 'Acceso no autorizado'}), 403
+
+    datos = lector_cartera.agregados()
+    if datos is None:
+        return jsonify({'success': False, 'error': 'Aún no hay instantánea de la cartera'}), 503
+    return jsonify(success=True, generada=datos['generada'], **_tarjetas_admin(datos))
+
+@app.route('/api/trabajos/<int:id>')
+def api_trabajo(id):
+    """Estado de un trabajo en segundo plano (para sondeo)"""
+    if 'user_type' not in session:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+
+    with get_db() as conn:
+        trabajo = trabajos.obtener(conn, id)
+    if trabajo is None:
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+    return jsonify(success=True, **trabajo)
+
+@app.route('/api/solicitud/<int:id>/trabajos')
+def api_trabajos_solicitud(id):
+    """Trabajos en segundo plano de una solicitud y si ya terminaron todos"""
+    if 'user_type' not in session:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+
+    with get_db() as conn:
+        lista = trabajos.listar(conn, f'credito:{id}')
+    return jsonify({
+        'success': True,
+        'terminados': all(t['estado'] in ('completado', 'fallido') for t in lista),
+        'trabajos': lista,
+    })
+
+@app.route('/api/trabajos/metricas')
+def api_metricas_trabajos():
+    """Tamaño de la cola, rendimiento y reintentos (solo administradores)"""
+    if session.get('user_type') != 'admin':
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+
+    with get_db() as conn:
+        datos = trabajos.metricas(conn, ventana=request.args.get('ventana', trabajos.VENTANA_METRICAS, type=int))
+    return jsonify(success=True, **datos)
+
+@app.route('/metricas')
+def metricas_prometheus():
+    """Métricas de todos los workers en formato de texto de Prometheus.
+
+    Para administradores o con `Authorization: Bearer <METRICAS_TOKEN>`.
+    """
+    if not metricas.token_valido() and session.get('user_type') != 'admin':
+        return jsonify({'success': False, 'error': 'No autorizado'}), 403
+
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4; charset=utf-8',
+                    headers={'Cache-Control': 'no-store'})
+
+@app.route('/api/codigos_postales')
+def api_codigos_postales():
+    """Autocompletado: códigos postales que empiezan con ?prefijo="""
+    if 'user_type' not in session:
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+
+    indice = codigos_postales.obtener_indice()
+    if indice is None:
+        return jsonify({'success': False, 'error': 'Catálogo de códigos postales no disponible'}), 503
+
+    limite = max(1, min(request.args.get('limite', 20, type=int), 100))
+    resultados = indice.por_prefijo(request.args.get('prefijo', '').strip(), limite)
+    return jsonify({'success': True, 'resultados': resultados})
+
+@app.route('/reglas_negocio', methods=['GET', 'POST'])
 def reglas_negocio():
     """Configurar reglas de negocio"""
     if session.get('user_type') != 'admin':
         flash('Acceso no autorizado', 'error')
         return redirect(url_for('index'))
-    
-    return render_template('reglas_negocio.html')
+
+    if request.method == 'POST':
+        if request.form.get('accion') == 'restablecer':
+            nuevas, errores = dict(reglas.POR_DEFECTO), []
+        else:
+            nuevas, errores = reglas.validar(request.form)
+        if errores:
+            for error in errores:
+                flash(error, 'error')
+            return redirect(url_for('reglas_negocio'))
+
+        with get_db() as conn:
+            version = reglas.guardar(conn, nuevas, session.get('admin_username'))
+        reglas_vigentes.invalidar()
+        flash(f'Reglas guardadas (versión {version}). Se aplican en todos los procesos '
+              f'en menos de {reglas_vigentes.intervalo:g} segundos.', 'success')
+        return redirect(url_for('reglas_negocio'))
+
+    return render_template('reglas_negocio.html', reglas=reglas_vigentes.obtener(),
+                           campos=reglas.CAMPOS)
 
 @app.route('/todas_solicitudes')
 def todas_solicitudes():
@@ -570,7 +1364,9 @@ def todas_solicitudes():
         flash('Acceso no autorizado', 'error')
         return redirect(url_for('index'))
     
-    return render_template('todas_solicitudes.html')
+    pagina = _pagina_solicitudes(_analista_filtrado())
+    return render_template('todas_solicitudes.html', solicitudes=pagina,
+                           cartera=lector_cartera.agregados())
 
 @app.route('/logout')
 def logout():
@@ -583,20 +1379,19 @@ def logout():
 @app.route('/debug_analistas')
 def debug_analistas():
     """Ver todos los analistas (solo para debug)"""
-    analistas = cargar_analistas()
-    return f'''
-    <h1>Total: {len(analistas)} analistas</h1>
-    <pre>{analistas}</pre>
-    <a href="{url_for('index')}">Volver</a>
-    '''
+    def generar(total, volver):
+        yield f'<h1>Total: {total} analistas</h1>\n<pre>'
+        for analista in iterar_analistas():
+            yield f'{analista}\n'
+        yield f'</pre>\n<a href="{volver}">Volver</a>\n'
+    return Response(stream_with_context(generar(contar_analistas(), url_for('index'))))
 
 @app.route('/test_registro', methods=['GET', 'POST'])
 def test_registro():
     """Página de test para registro de analistas"""
     if request.method == 'POST':
         # Generar código automático
-        import random
-        codigo = f"E{random.randint(100, 999)}"
+        codigo = codigos_analista.siguiente()
         
         # Separar el nombre completo
         nombre_completo = request.form.get('nombre', '').strip()
@@ -645,11 +1440,12 @@ def test_registro():
             validaciones.append(f"❌ PASO 2: Nombre inválido")
         
         # 3. RFC válido
-        rfc = request.form.get('rfc', '')
-        if len(rfc) == 13 and rfc.isalnum():
+        rfc = request.form.get('rfc', '').strip().upper()
+        errores_rfc = rfcs.validar_rfc(rfc)
+        if not errores_rfc:
             validaciones.append(f"✅ PASO 3: RFC válido ({len(rfc)} caracteres)")
         else:
-            validaciones.append(f"❌ PASO 3: RFC inválido (se esperan 13 caracteres alfanuméricos)")
+            validaciones.append(f"❌ PASO 3: RFC inválido ({'; '.join(errores_rfc)})")
         
         # 4. NIP válido
         nip = request.form.get('nip', '')
@@ -659,8 +1455,8 @@ def test_registro():
             validaciones.append(f"❌ PASO 4: NIP inválido (se esperan 4 dígitos)")
         
         # 5. RFC no duplicado
-        analistas = cargar_analistas()
-        rfc_existe = any(a['rfc'] == rfc.upper() for a in analistas)
+        with get_db() as conn:
+            rfc_existe = rfc in rfcs.buscar_duplicados(conn, [rfc])
         if not rfc_existe:
             validaciones.append(f"✅ PASO 5: RFC {rfc} disponible")
         else:
@@ -730,4 +1526,53 @@ def test_registro():
             button { background: #007bff; color: white; padding: 10px 20px; border: none; cursor: pointer; }
         </style>
     </head>
-    <body
+    <body>
+        <h2>🔧 Test de Registro de Analista</h2>
+        <form method="POST">
+            <label>Nombre completo:</label>
+            <input type="text" name="nombre" required>
+            <label>RFC:</label>
+            <input type="text" name="rfc" maxlength="13" required>
+            <label>Teléfono:</label>
+            <input type="text" name="telefono" required>
+            <label>NIP (4 dígitos):</label>
+            <input type="password" name="nip" maxlength="4" required>
+            <button type="submit">Registrar</button>
+        </form>
+        <br>
+        <a href="/debug_analistas">Ver todos los analistas</a>
+    </body>
+    </html>
+    '''
+
+_db_inicializada = False
+_init_lock = threading.Lock()
+
+def create_app():
+    """Fábrica de la aplicación para servidores WSGI.
+
+    Inicializa la base de datos una sola vez por proceso; los workers creados
+    con fork después de la inicialización la heredan y no repiten el DDL.
+    """
+    global _db_inicializada
+    if not _db_inicializada:
+        with _init_lock:
+            if not _db_inicializada:
+                bitacora.configurar()
+                init_db()
+                programar_instantanea_cartera()
+                # Abrir (y compilar si hace falta) el índice de códigos
+                # postales antes del fork para que los workers compartan el mmap
+                codigos_postales.obtener_indice()
+                # Compilar las plantillas una vez (o leerlas de la caché de
+                # bytecode) para que ningún worker compile en su primera petición
+                plantillas.precompilar(app)
+                _db_inicializada = True
+    return app
+
+if __name__ == '__main__':
+    # Servidor de desarrollo; en producción usar servidor.py (ver Procfile)
+    create_app()
+    cola_trabajos.iniciar()
+    port = int(os.environ.get('PORT', 5000))
+    app.run(host='0.0.0.0', port=port, debug=False)
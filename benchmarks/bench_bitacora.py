@@ -0,0 +1,114 @@
+"""Latencia del login de analista según cómo se escribe la bitácora.
+
+Uso:
+    python benchmarks/bench_bitacora.py [--logins 5000] [--destino archivo|pipe]
+
+Variantes:
+  síncrono DEBUG   cada mensaje se escribe en el hilo de la petición, como los
+                   print() anteriores (StreamHandler con buffer de línea)
+  síncrono INFO    igual, pero solo los mensajes INFO o mayores
+  cola INFO        configuración por defecto: JSON, nivel INFO, QueueHandler
+  cola DEBUG 1%    nivel DEBUG con muestreo del 1 %
+
+Con --destino pipe la salida va a un pipe que otro proceso lee despacio (como
+un recolector de logs atrasado); ahí se nota que la escritura síncrona
+bloquea la petición. La verificación del NIP va por la caché y el limitador
+está desactivado para medir solo el costo de la bitácora.
+"""
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+import bitacora  # noqa: E402
+import credenciales  # noqa: E402
+
+# Lee 4 KiB cada 100 ms (~40 KiB/s)
+LECTOR_LENTO = 'import sys, time\nwhile sys.stdin.buffer.read1(4096):\n    time.sleep(0.1)\n'
+
+
+def abrir_destino(tipo, directorio):
+    if tipo == 'pipe':
+        lector = subprocess.Popen([sys.executable, '-c', LECTOR_LENTO], stdin=subprocess.PIPE)
+        return open(lector.stdin.fileno(), 'w', buffering=1, closefd=False), lector
+    return open(os.path.join(directorio, 'app.log'), 'w', buffering=1), None
+
+
+def quitar_manejadores():
+    bitacora._detener()  # vacía la cola antes de cerrar el destino
+    raiz = logging.getLogger()
+    for manejador in list(raiz.handlers):
+        raiz.removeHandler(manejador)
+
+
+def sincrono(destino, nivel):
+    """Escribir en el hilo de la petición; a DEBUG equivale a los print() anteriores"""
+    raiz = logging.getLogger()
+    manejador = logging.StreamHandler(destino)
+    manejador.setFormatter(bitacora.FormatoJSON())
+    raiz.addHandler(manejador)
+    raiz.setLevel(nivel)
+
+
+def medir(n):
+    datos = {'codigo': 'RAG123', 'nip': '1234'}
+    tiempos = []
+    for _ in range(n):
+        cliente = aplicacion.app.test_client()
+        inicio = time.perf_counter()
+        respuesta = cliente.post('/login_analista', data=datos)
+        tiempos.append(time.perf_counter() - inicio)
+        assert respuesta.status_code == 302
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.99)], sum(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=5000)
+    parser.add_argument('--destino', choices=('archivo', 'pipe'), default='archivo')
+    args = parser.parse_args()
+
+    for limite in (credenciales.limite_por_codigo, credenciales.limite_por_ip):
+        limite.capacidad = limite.por_segundo = 10**9
+
+    variantes = (
+        ('síncrono DEBUG', lambda destino: sincrono(destino, 'DEBUG')),
+        ('síncrono INFO', lambda destino: sincrono(destino, 'INFO')),
+        ('cola INFO', lambda destino: bitacora.configurar('INFO', 'json', destino=destino)),
+        ('cola DEBUG 1%', lambda destino: bitacora.configurar('DEBUG', 'json', 0.01, destino)),
+    )
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        aplicacion.init_db()
+        with aplicacion.get_db() as conn:
+            conn.execute("UPDATE analistas SET nip = ? WHERE codigo = 'RAG123'",
+                         (credenciales.hashear_nip('1234'),))
+
+        for nombre, configurar in variantes:
+            destino, lector = abrir_destino(args.destino, directorio)
+            configurar(destino)
+            medir(200)  # calentamiento (y la caché de verificación)
+            resultados.append((nombre, *medir(args.logins)))
+            quitar_manejadores()
+            destino.close()
+            if lector:
+                lector.stdin.close()
+                lector.wait()
+        aplicacion.cerrar_pool()
+
+    print(f"{'variante':<16} {'p50 ms':>8} {'p99 ms':>8} {'logins/s':>9}  (destino: {args.destino})")
+    for nombre, p50, p99, total in resultados:
+        print(f"{nombre:<16} {p50 * 1e3:>8.3f} {p99 * 1e3:>8.3f} {args.logins / total:>9,.0f}")
+
+
+if __name__ == '__main__':
+    main()
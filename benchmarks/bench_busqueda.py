@@ -0,0 +1,135 @@
+"""Búsqueda de clientes: índice FTS5 (busqueda.py) contra LIKE sobre la tabla.
+
+Uso:
+    python benchmarks/bench_busqueda.py [--clientes 1000000] [--consultas 200]
+
+Llena una BD temporal con --clientes clientes con RFC y teléfono únicos y
+nombres y apellidos con acentos repartidos según Zipf (unos cuantos apellidos
+concentran a la mayoría de los clientes, como en un padrón real), y mide:
+  carga        inserción con los triggers del índice activos, y 'rebuild'
+               completo del índice sobre la tabla ya cargada
+  consultas    mediana y p99 de busqueda.buscar() por tipo de consulta, y la
+               mediana del LIKE '%texto%' que haría la búsqueda sin índice
+               (solo --consultas-like veces: cada una recorre la tabla)
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+import busqueda  # noqa: E402
+
+NOMBRES = ('José', 'María', 'Juan', 'Guadalupe', 'Francisco', 'Verónica', 'Jesús', 'Andrés',
+           'Mariana', 'Sofía', 'Raúl', 'Ángel', 'Lucía', 'Héctor', 'Mónica', 'Iván', 'Inés',
+           'Ramón', 'Martín', 'Fernanda', 'Óscar', 'Patricia', 'Sebastián', 'Noemí', 'Alejandro',
+           'Rosa', 'Miguel', 'Leticia', 'Arturo', 'Gabriela', 'Ricardo', 'Adriana', 'Jorge',
+           'Claudia', 'Roberto', 'Araceli', 'Eduardo', 'Silvia', 'Fernando', 'Yolanda', 'Rubén',
+           'Alicia', 'Sergio', 'Beatriz', 'Efraín', 'Elena', 'Gerardo', 'Teresa', 'Joaquín', 'Irene')
+APELLIDOS = ('Hernández', 'García', 'Martínez', 'López', 'González', 'Pérez', 'Rodríguez',
+             'Sánchez', 'Ramírez', 'Cruz', 'Flores', 'Gómez', 'Díaz', 'Vázquez', 'Núñez',
+             'Gutiérrez', 'Jiménez', 'Ruiz', 'Álvarez', 'Muñoz', 'Domínguez', 'Ibáñez',
+             'Villaseñor', 'Zúñiga', 'Echeverría', 'Olvera', 'Quintanilla', 'Bárcenas', 'Morales',
+             'Reyes', 'Castillo', 'Ortiz', 'Moreno', 'Romero', 'Chávez', 'Mendoza', 'Aguilar',
+             'Torres', 'Medina', 'Castro', 'Vargas', 'Guzmán', 'Velázquez', 'Rojas', 'Salazar',
+             'Ríos', 'Contreras', 'Juárez', 'Espinoza', 'Luna', 'Cortés', 'Rivera', 'Herrera',
+             'Mejía', 'Galván', 'Cárdenas', 'Valdés', 'Nava', 'Fuentes', 'Ochoa', 'Solís', 'Peña')
+
+
+def zipf(valores):
+    return [1 / (i + 1) for i in range(len(valores))]
+
+
+def clientes(n, semilla=7):
+    azar = random.Random(semilla)
+    nombres = azar.choices(NOMBRES, zipf(NOMBRES), k=n)
+    paternos = azar.choices(APELLIDOS, zipf(APELLIDOS), k=n)
+    maternos = azar.choices(APELLIDOS, zipf(APELLIDOS), k=n)
+    for i in range(n):
+        yield (nombres[i], paternos[i], maternos[i],
+               f'{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}XX{i:09d}', f'55{i:08d}')
+
+
+def poblar(conn, n):
+    conn.executemany('''
+        INSERT INTO clientes (nombre, apellido_paterno, apellido_materno, rfc, telefono)
+        VALUES (?, ?, ?, ?, ?)
+    ''', clientes(n))
+
+
+def consultas(n, azar):
+    """Tipo de consulta -> textos de ejemplo, como los escribiría un analista"""
+    return {
+        'nombre y apellido': [f'{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)}' for _ in range(50)],
+        'sin acentos': [f'{azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}'.lower()
+                        .translate(str.maketrans('áéíóúñÁÉÍÓÚÑ', 'aeiounAEIOUN')) for _ in range(50)],
+        'prefijos': [f'{azar.choice(NOMBRES)[:3]} {azar.choice(APELLIDOS)[:4]}' for _ in range(50)],
+        'RFC': [f'{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}XX{i:09d}'
+                for i in (azar.randrange(n) for _ in range(50))],
+        'teléfono (prefijo)': [f'55{azar.randrange(n):08d}'[:8] for _ in range(50)],
+        'con errores': [f'{azar.choice(("Gutierez", "Hernandes", "Villasenior", "Rodrigues", "Echeveria"))} '
+                        f'{azar.choice(NOMBRES)}' for _ in range(50)],
+    }
+
+
+def tiempos(funcion, textos, repeticiones):
+    resultado = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(textos[i % len(textos)])
+        resultado.append(time.perf_counter() - inicio)
+    resultado.sort()
+    return statistics.median(resultado), resultado[int(len(resultado) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clientes', type=int, default=1_000_000)
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--consultas-like', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        aplicacion.init_db()
+        with aplicacion.get_db() as conn:
+            inicio = time.perf_counter()
+            poblar(conn, args.clientes)
+            carga = time.perf_counter() - inicio
+        with aplicacion.get_db() as conn:
+            inicio = time.perf_counter()
+            busqueda.reconstruir(conn, 'clientes')
+            reconstruccion = time.perf_counter() - inicio
+            nombres = conn.execute('SELECT count(*) FROM clientes_nombres').fetchone()[0]
+        print(f'{args.clientes:,} clientes: carga con triggers {carga:.1f} s, '
+              f'reconstruir() {reconstruccion:.1f} s, {nombres:,} nombres distintos')
+
+        columnas = busqueda.INDICES['clientes'][1]
+        like = ' OR '.join(f'{c} LIKE ?' for c in columnas)
+        print(f"{'consulta':<20} {'FTS p50 ms':>11} {'FTS p99 ms':>11} {'LIKE p50 ms':>12} {'resultados':>11}")
+        with aplicacion.get_db() as conn:
+            def fts(texto):
+                return busqueda.buscar(conn, 'clientes', texto)[0]
+
+            def sin_indice(texto):
+                # Un solo término; con varios serían varias pasadas como esta
+                patron = f'%{texto.split()[0]}%'
+                return conn.execute(f'SELECT id FROM clientes WHERE {like} LIMIT 20',
+                                    (patron,) * len(columnas)).fetchall()
+
+            for tipo, textos in consultas(args.clientes, random.Random(11)).items():
+                fts(textos[0])  # calentamiento
+                p50, p99 = tiempos(fts, textos, args.consultas)
+                lento, _ = tiempos(sin_indice, textos, args.consultas_like)
+                encontrados = statistics.median(len(fts(t)) for t in textos)
+                print(f'{tipo:<20} {p50 * 1e3:>11.2f} {p99 * 1e3:>11.2f} {lento * 1e3:>12.1f} {encontrados:>11.0f}')
+        aplicacion.cerrar_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Caché de lectura (cache_lectura.py): solicitudes con y sin caché.
+
+Uso:
+    python benchmarks/bench_cache_lectura.py [--creditos 100000] [--lecturas 20000]
+
+Llena una BD temporal con --creditos créditos (un cliente por crédito) y lee
+--lecturas veces solicitudes con ids repartidos según Zipf (unas cuantas
+solicitudes abiertas concentran las vistas, como en la bandeja de un analista).
+Sin caché y con caché da la mediana, el p99 y la proporción de aciertos. La
+columna "escrituras" intercala una actualización de un cliente cada N
+lecturas hecha con otra conexión, como la haría otro worker.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+
+
+def poblar(conn, n):
+    conn.executemany('INSERT INTO clientes (nombre, apellido_paterno, rfc, fico_score, tdsr) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     ((f'Nombre{i}', 'Paterno', f'BENC{i:09d}', 600 + i % 200, 20 + i % 30)
+                      for i in range(n)))
+    conn.executemany('INSERT INTO creditos (cliente_id, analista_id, monto, plazo, tasa_interes) '
+                     'VALUES (?, 1, 50000, 24, 30)', ((i + 1,) for i in range(n)))
+
+
+def medir(funcion, ids, escritor, cada):
+    tiempos = []
+    for i, id_ in enumerate(ids):
+        if cada and i % cada == 0:
+            escritor.execute('UPDATE clientes SET fico_score = fico_score WHERE id = ?',
+                             (random.randrange(1, len(ids)),))
+        inicio = time.perf_counter()
+        funcion(id_)
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--creditos', type=int, default=100_000)
+    parser.add_argument('--lecturas', type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        aplicacion.init_db()
+        with aplicacion.get_db() as conn:
+            poblar(conn, args.creditos)
+        escritor = sqlite3.connect(aplicacion.DATABASE, isolation_level=None, timeout=30)
+        azar = random.Random(5)
+        pesos = [1 / (i + 1) for i in range(args.creditos)]
+        ids = azar.choices(range(1, args.creditos + 1), pesos, k=args.lecturas)
+        cache = aplicacion.cache_lecturas
+
+        def solicitud(id_):
+            with aplicacion.get_db() as conn:
+                return aplicacion.obtener_solicitud(conn, id_)
+
+        print(f'{args.creditos:,} créditos, {args.lecturas:,} lecturas')
+        print(f"{'lectura':<14} {'escrituras':>12} {'p50 µs':>9} {'p99 µs':>9} {'aciertos':>9}")
+        for activa, cada in ((False, 0), (True, 0), (True, 100), (True, 10)):
+            cache.activa = activa
+            cache.limpiar()
+            cache.aciertos = cache.fallos = 0
+            p50, p99 = medir(solicitud, ids, escritor, cada)
+            escrituras = f'1/{cada}' if cada else '-'
+            proporcion = cache.estadisticas()['proporcion_aciertos']
+            print(f'{"caché" if activa else "BD":<14} {escrituras:>12} {p50 * 1e6:>9.1f} {p99 * 1e6:>9.1f} '
+                  f'{"-" if proporcion is None else f"{proporcion:.0%}":>9}')
+        escritor.close()
+        aplicacion.cerrar_pool()
+
+
+if __name__ == '__main__':
+    main()
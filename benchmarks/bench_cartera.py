@@ -0,0 +1,107 @@
+"""Tableros de riesgo (cartera.py): instantánea por columnas contra SQL en vivo.
+
+Uso:
+    python benchmarks/bench_cartera.py [--creditos 1000000] [--repeticiones 5]
+
+Llena una BD temporal con --creditos créditos (un cliente por cada 3, 50
+analistas, estados y scores repartidos) y mide:
+  generar      escribir la instantánea (una lectura completa de la BD)
+  abrir        Instantanea + agregados() sobre las columnas mapeadas, lo que
+               paga cada worker una vez por instantánea
+  SQL          los mismos agregados con GROUP BY sobre las tablas vivas, lo
+               que pagaría cada carga del tablero sin instantánea
+Reporta la mediana de --repeticiones y el tamaño de la instantánea en disco.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+import cartera  # noqa: E402
+
+CONSULTAS_SQL = (
+    'SELECT estado, COUNT(*), SUM(monto), SUM(CASE WHEN estado = \'aprobado\' '
+    'THEN COALESCE(monto_aprobado, monto) ELSE 0 END) FROM creditos GROUP BY estado',
+    'SELECT analista_id, estado, COUNT(*) FROM creditos GROUP BY analista_id, estado',
+    'SELECT CAST((c.fico_score - 300) / 50 AS INTEGER), COUNT(*) FROM creditos cr '
+    'JOIN clientes c ON c.id = cr.cliente_id GROUP BY 1',
+    'SELECT CAST(c.tdsr / 10 AS INTEGER), COUNT(*) FROM creditos cr '
+    'JOIN clientes c ON c.id = cr.cliente_id GROUP BY 1',
+    'SELECT estado, COUNT(*) FROM creditos WHERE score_total BETWEEN 200 AND 300 GROUP BY estado',
+)
+
+
+def poblar(conn, n):
+    conn.executemany("INSERT INTO analistas (codigo, nombre, rfc, nip, estado) "
+                     "VALUES (?, 'Bench', ?, 'x', 'aprobado')",
+                     ((f'BEN{i:03d}', f'BENA{i:09d}') for i in range(50)))
+    clientes = max(n // 3, 1)
+    conn.executemany('INSERT INTO clientes (nombre, apellido_paterno, rfc, fico_score, tdsr) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     ((f'Nombre{i}', 'Paterno', f'BENC{i:09d}', 450 + i % 400, i % 70)
+                      for i in range(clientes)))
+    estados = ('pendiente', 'aprobado', 'rechazado', 'zona_gris')
+    conn.executemany('''
+        INSERT INTO creditos (cliente_id, analista_id, monto, monto_aprobado, plazo, tasa_interes,
+                              estado, score_total)
+        VALUES (?, ?, ?, ?, 24, 0.3, ?, ?)
+    ''', ((i % clientes + 1, i % 50 + 1, 10_000 + i % 90_000, 9_000 + i % 80_000 if i % 4 == 1 else None,
+           estados[i % 4], i % 500) for i in range(n)))
+
+
+def mediana(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def tamano(ruta):
+    return sum(os.path.getsize(os.path.join(ruta, nombre)) for nombre in os.listdir(ruta))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--creditos', type=int, default=1_000_000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        aplicacion.init_db()
+        with aplicacion.get_db() as conn:
+            poblar(conn, args.creditos)
+        destino = os.path.join(directorio, 'cartera')
+
+        def generar():
+            with aplicacion.get_db() as conn:
+                cartera.generar(conn, destino)
+
+        def abrir():
+            cartera.agregados(cartera.Instantanea(os.path.join(destino, cartera._instantaneas(destino)[-1])))
+
+        def sql():
+            with aplicacion.get_db() as conn:
+                for consulta in CONSULTAS_SQL:
+                    conn.execute(consulta).fetchall()
+
+        print(f'{args.creditos:,} créditos, mediana de {args.repeticiones}')
+        print(f"{'caso':<32} {'ms':>10}")
+        for nombre, funcion in (('generar instantánea', generar), ('abrir + agregados (mmap)', abrir),
+                                ('agregados en SQL (tablas vivas)', sql)):
+            print(f'{nombre:<32} {mediana(funcion, args.repeticiones) * 1e3:>10.1f}')
+        ultima = os.path.join(destino, cartera._instantaneas(destino)[-1])
+        print(f'instantánea: {tamano(ultima) / 2**20:.1f} MiB, '
+              f'BD: {os.path.getsize(aplicacion.DATABASE) / 2**20:.1f} MiB')
+        aplicacion.cerrar_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Índice de códigos postales (mmap) contra un dict de dicts.
+
+Uso:
+    python benchmarks/bench_codigos_postales.py [--catalogo CPdescarga.txt] [--consultas 200000]
+
+Sin --catalogo genera un catálogo sintético con el formato de SEPOMEX y un
+tamaño parecido al oficial (~145k asentamientos, ~32k códigos postales). Cada
+variante corre en un proceso aparte y reporta el tiempo de arranque, la
+memoria anónima (RssAnon, privada de cada worker), la memoria respaldada por
+archivo (RssFile, compartida entre workers) y la latencia de búsqueda.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import codigos_postales  # noqa: E402
+
+ZONAS = ['Urbano', 'Urbano', 'Urbano', 'Semiurbano', 'Rural']
+
+
+def generar_catalogo(ruta, n_cp=32_000, semilla=3):
+    rng = random.Random(semilla)
+    estados = [f'Estado {i:02d}' for i in range(32)]
+    with open(ruta, 'w', encoding='latin-1', newline='') as salida:
+        salida.write('El Catálogo Nacional de Códigos Postales, es elaborado por Correos de México\r\n')
+        salida.write('d_codigo|d_asenta|d_tipo_asenta|D_mnpio|d_estado|d_ciudad|d_CP|c_estado|'
+                     'c_oficina|c_CP|c_tipo_asenta|c_mnpio|id_asenta_cpcons|d_zona|c_cve_ciudad\r\n')
+        for cp in sorted(rng.sample(range(1000, 100000), n_cp)):
+            e = cp * 32 // 100000
+            municipio = f'Municipio {e:02d}-{cp % 97:03d}'
+            for a in range(rng.choice((1, 2, 3, 4, 5, 8))):
+                salida.write(f'{cp:05d}|Colonia {cp}-{a} Ñuñoa|Colonia|{municipio}|{estados[e]}|'
+                             f'Ciudad {e}|{cp:05d}|{e:02d}|{cp:05d}||09|{cp % 97:03d}|{a:04d}|'
+                             f'{rng.choice(ZONAS)}|01\r\n')
+
+
+def rss():
+    valores = {}
+    with open('/proc/self/status') as status:
+        for linea in status:
+            if linea.startswith(('RssAnon', 'RssFile')):
+                nombre, kb = linea.split(':')
+                valores[nombre] = int(kb.split()[0]) / 1024
+    return valores
+
+
+def dict_de_dicts(catalogo):
+    datos = {}
+    for cp, colonia, municipio, estado, zona in codigos_postales.leer_catalogo(catalogo):
+        registro = datos.setdefault(f'{cp:05d}', {
+            'codigo_postal': f'{cp:05d}', 'estado': estado, 'municipio': municipio,
+            'zona': zona, 'colonias': [],
+        })
+        registro['colonias'].append(colonia)
+    return datos
+
+
+def variante(nombre, catalogo, indice, consultas):
+    """Se ejecuta en un subproceso y escribe sus métricas en JSON"""
+    antes = rss()
+    inicio = time.perf_counter()
+    if nombre == 'dict':
+        datos = dict_de_dicts(catalogo)
+        buscar = datos.get
+    else:
+        if nombre == 'compilar':
+            codigos_postales.compilar(catalogo, indice)
+        datos = codigos_postales.IndiceCP(indice)
+        buscar = datos.buscar
+    arranque = time.perf_counter() - inicio
+    despues = rss()
+    cps = list(datos) if nombre == 'dict' else [f'{cp:05d}' for cp in datos.cps]
+
+    rng = random.Random(1)
+    muestra = [rng.choice(cps) for _ in range(consultas)]
+    inicio = time.perf_counter()
+    for cp in muestra:
+        buscar(cp)
+    por_consulta = (time.perf_counter() - inicio) / consultas
+
+    prefijo = None
+    if nombre != 'dict':
+        inicio = time.perf_counter()
+        for cp in muestra[:10_000]:
+            datos.por_prefijo(cp[:3], 10)
+        prefijo = (time.perf_counter() - inicio) / 10_000
+
+    print(json.dumps({
+        'arranque': arranque,
+        'anon': despues['RssAnon'] - antes['RssAnon'],
+        'archivo': despues['RssFile'] - antes['RssFile'],
+        'consulta_us': por_consulta * 1e6,
+        'prefijo_us': prefijo * 1e6 if prefijo else None,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--catalogo')
+    parser.add_argument('--consultas', type=int, default=200_000)
+    parser.add_argument('--variante', help=argparse.SUPPRESS)
+    parser.add_argument('--indice', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variante:
+        variante(args.variante, args.catalogo, args.indice, args.consultas)
+        return
+
+    with tempfile.TemporaryDirectory() as directorio:
+        catalogo = args.catalogo
+        if not catalogo:
+            catalogo = os.path.join(directorio, 'CPdescarga.txt')
+            generar_catalogo(catalogo)
+        indice = os.path.join(directorio, 'CPdescarga.cpidx')
+        print(f'Catálogo: {os.path.getsize(catalogo) / 2**20:.1f} MiB')
+
+        print(f"{'variante':<22} {'arranque s':>10} {'RssAnon MiB':>12} {'RssFile MiB':>12} "
+              f"{'búsqueda µs':>12} {'prefijo µs':>11}")
+        for nombre, etiqueta in (('dict', 'dict de dicts'), ('compilar', 'compilar + mmap'),
+                                 ('mmap', 'mmap (ya compilado)')):
+            salida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--variante', nombre,
+                 '--catalogo', catalogo, '--indice', indice, '--consultas', str(args.consultas)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            m = json.loads(salida.strip().splitlines()[-1])
+            prefijo = f"{m['prefijo_us']:>11.1f}" if m['prefijo_us'] else f"{'-':>11}"
+            print(f"{etiqueta:<22} {m['arranque']:>10.3f} {m['anon']:>12.1f} {m['archivo']:>12.1f} "
+                  f"{m['consulta_us']:>12.2f} {prefijo}")
+        print(f'Índice: {os.path.getsize(indice) / 2**20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
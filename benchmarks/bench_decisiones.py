@@ -0,0 +1,134 @@
+"""Latencia de POST /tomar_decision con el trabajo derivado en línea o en la cola.
+
+Uso:
+    python benchmarks/bench_decisiones.py [--decisiones 2000] [--hilos 2] [--latencia-notificacion 20]
+
+Variantes:
+  en línea   la petición ejecuta ella misma los trabajos encolados antes de
+             responder (como si scores, amortización y notificación se
+             hicieran en la ruta)
+  cola       la petición solo confirma el cambio de estado; un proceso aparte
+             con --hilos hilos trabaja la cola (como servidor.py)
+
+La notificación simula un canal externo (correo, SMS) que tarda
+--latencia-notificacion ms. Al final se reporta el rendimiento de la cola
+según trabajos.metricas.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+import bench_scoring  # noqa: E402
+import trabajos  # noqa: E402
+
+COLUMNAS_CLIENTE = ('estado_civil', 'dependientes', 'nivel_estudios', 'zona', 'antiguedad_domicilio',
+                    'antiguedad_empleo', 'ingreso_mensual', 'ultima_calificacion', 'mop_6', 'mop_12',
+                    'num_consultas', 'fico_score', 'tdsr', 'ocupacion')
+
+
+def poblar(n):
+    """n clientes con datos de scoring y una solicitud pendiente cada uno"""
+    datos = bench_scoring.generar(n)
+    filas = zip(*(datos[c].tolist() for c in COLUMNAS_CLIENTE))
+    with aplicacion.get_db() as conn:
+        analista_id = conn.execute("SELECT id FROM analistas WHERE codigo = 'RAG123'").fetchone()[0]
+        ids = []
+        for i, fila in enumerate(filas):
+            cliente_id = conn.execute(f'''
+                INSERT INTO clientes (nombre, rfc, analista_id, {', '.join(COLUMNAS_CLIENTE)})
+                VALUES (?, ?, ?, {', '.join('?' * len(COLUMNAS_CLIENTE))})
+            ''', (f'Cliente {i}', f'BENC{i:09d}', analista_id, *fila)).lastrowid
+            ids.append(conn.execute('''
+                INSERT INTO creditos (cliente_id, analista_id, monto, plazo, tasa_interes)
+                VALUES (?, ?, ?, 12, 30)
+            ''', (cliente_id, analista_id, datos['monto_solicitado'][i])).lastrowid)
+    return ids
+
+
+def trabajar_cola(hilos):
+    aplicacion.cola_trabajos.ejecutar(hilos)
+
+
+def medir(ids, en_linea):
+    cliente = aplicacion.app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_type'], sesion['user_id'] = 'admin', 1
+    tiempos = []
+    for credito_id in ids:
+        inicio = time.perf_counter()
+        respuesta = cliente.post(f'/tomar_decision/{credito_id}', data={
+            'decision_manual': 'aprobado', 'justificacion': 'benchmark',
+            'monto_aprobado': '50000', 'tasa_interes': '30', 'plazo_meses': '12',
+        })
+        if en_linea:
+            while aplicacion.cola_trabajos.procesar_uno():
+                pass
+        tiempos.append(time.perf_counter() - inicio)
+        assert respuesta.status_code == 302
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.99)], sum(tiempos)
+
+
+def esperar_cola_vacia(timeout=300):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        with aplicacion.get_db() as conn:
+            datos = trabajos.metricas(conn)
+        if datos['pendientes'] == datos['en_proceso'] == 0:
+            return
+        time.sleep(0.2)
+    raise RuntimeError('La cola no se vació a tiempo')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--decisiones', type=int, default=2000)
+    parser.add_argument('--hilos', type=int, default=2)
+    parser.add_argument('--latencia-notificacion', type=float, default=20)
+    args = parser.parse_args()
+
+    notificar = aplicacion.notificar_decision
+
+    @aplicacion.cola_trabajos.tarea('notificar_decision')
+    def notificacion_externa(credito_id):
+        time.sleep(args.latencia_notificacion / 1000)
+        return notificar(credito_id)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        aplicacion.init_db()
+        ids = poblar(2 * args.decisiones)
+
+        en_linea = medir(ids[:args.decisiones], en_linea=True)
+
+        aplicacion.cerrar_pool()  # ninguna conexión debe cruzar el fork
+        proceso = multiprocessing.get_context('fork').Process(target=trabajar_cola, args=(args.hilos,))
+        proceso.start()
+        inicio = time.perf_counter()
+        cola = medir(ids[args.decisiones:], en_linea=False)
+        esperar_cola_vacia()
+        drenado = time.perf_counter() - inicio
+        proceso.terminate()
+        proceso.join()
+
+        with aplicacion.get_db() as conn:
+            resumen = trabajos.metricas(conn, ventana=int(drenado) + 1)
+        aplicacion.cerrar_pool()
+
+    print(f"{'variante':<10} {'p50 ms':>8} {'p99 ms':>8} {'decisiones/s':>13}")
+    for nombre, (p50, p99, total) in (('en línea', en_linea), ('cola', cola)):
+        print(f"{nombre:<10} {p50 * 1e3:>8.3f} {p99 * 1e3:>8.3f} {args.decisiones / total:>13,.0f}")
+    print(f"cola vacía a los {drenado:.2f} s; {2 * args.decisiones / drenado:,.0f} trabajos/s, "
+          f"duración promedio {resumen['duracion_promedio_ms']} ms, "
+          f"espera promedio {resumen['espera_promedio_ms']} ms, fallidos {resumen['fallidos']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Envíos duplicados de nueva_solicitud en paralelo (captura.py).
+
+Uso:
+    python benchmarks/bench_envios_duplicados.py [--formularios 50] [--copias 8]
+
+Abre --formularios formularios (un número de solicitud cada uno) y envía cada
+uno --copias veces a la vez desde hilos distintos, cada hilo con su cliente
+de prueba y su conexión del pool, como un analista que da doble clic en una
+red lenta. La mitad de los formularios repite el RFC de otro, para ejercitar
+el alta del cliente por RFC. Al final comprueba que haya exactamente un
+crédito por número, un cliente por RFC y un trabajo de calificación por
+crédito, y da la latencia de los envíos (p50 y p99). Después un segundo
+analista captura el RFC de uno de esos clientes con otros datos: debe
+recibir 409 sin que cambie el perfil del cliente. Sale con error si algo se
+duplicó o se sobrescribió.
+"""
+import argparse
+import datetime
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+import rfcs  # noqa: E402
+
+
+def rfc_de(i):
+    base = rfcs.base_rfc(f'Nombre{i}', 'Paterno', 'Materno', datetime.date(1980, 1, 1) + datetime.timedelta(i))
+    return base + 'A1' + rfcs.digito_verificador(base + 'A1')
+
+
+def formulario(numero, i):
+    return {
+        'numero_solicitud': numero, 'nombre': f'Nombre{i}', 'apellido_paterno': 'Paterno',
+        'apellido_materno': 'Materno', 'fecha_nacimiento': str(datetime.date(1980, 1, 1) + datetime.timedelta(i)),
+        'rfc': rfc_de(i), 'estado_civil': 'casado', 'dependientes': '1', 'nivel_estudios': 'licenciatura',
+        'codigo_postal': '01000', 'colonia': 'Centro', 'zona': 'urbana', 'antiguedad_domicilio': '3',
+        'ocupacion': 'empleado', 'antiguedad_empleo': '4', 'ingreso_mensual': '30000', 'pagos_minimos': '5000',
+        'monto_solicitado': str(50_000 + i), 'fico_score': '700', 'ultima_calificacion': '1',
+        'mop_6': '1', 'mop_12': '1', 'num_consultas': '0', 'firma_solicitud': 'on',
+    }
+
+
+def cliente_de_prueba(flask_app, analista_id):
+    cliente = flask_app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_type'] = 'analista'
+        sesion['user_id'] = analista_id
+    return cliente
+
+
+def numero_nuevo(cliente):
+    html = cliente.get('/nueva_solicitud').get_data(as_text=True)
+    return re.search(r'name="numero_solicitud" value="([^"]+)"', html).group(1)
+
+
+def envio_ajeno(flask_app, datos):
+    """Otro analista envía el RFC de `datos`; regresa (status, fila antes, fila después)"""
+    with aplicacion.get_db() as conn:
+        otro_id = conn.execute("INSERT INTO analistas (codigo, nombre, rfc, nip, estado) "
+                               "VALUES ('BENCH2', 'Otro', 'BENCH2RFC', 'x', 'aprobado') RETURNING id").fetchone()[0]
+        antes = tuple(conn.execute('SELECT * FROM clientes WHERE rfc = ?', (datos['rfc'],)).fetchone())
+    otro = cliente_de_prueba(flask_app, otro_id)
+    ajenos = dict(datos, numero_solicitud=numero_nuevo(otro), ocupacion='comerciante', ingreso_mensual='99999')
+    respuesta = otro.post('/nueva_solicitud', data=ajenos)
+    with aplicacion.get_db() as conn:
+        despues = tuple(conn.execute('SELECT * FROM clientes WHERE rfc = ?', (datos['rfc'],)).fetchone())
+    return respuesta.status_code, antes, despues
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--formularios', type=int, default=50)
+    parser.add_argument('--copias', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        flask_app = aplicacion.create_app()
+        with aplicacion.get_db() as conn:
+            analista_id = conn.execute("SELECT id FROM analistas WHERE codigo = 'RAG123'").fetchone()[0]
+        abridor = cliente_de_prueba(flask_app, analista_id)
+        envios = []
+        for i in range(args.formularios):
+            # La mitad de los formularios comparte cliente (RFC) con el anterior
+            envios.append(formulario(numero_nuevo(abridor), i - i % 2))
+
+        tiempos, redirecciones, errores = [], [], []
+        barrera = threading.Barrier(args.copias)
+
+        def enviar(datos, cliente):
+            barrera.wait()
+            inicio = time.perf_counter()
+            respuesta = cliente.post('/nueva_solicitud', data=datos)
+            tiempos.append(time.perf_counter() - inicio)
+            if respuesta.status_code != 302:
+                errores.append(respuesta.status_code)
+            redirecciones.append((datos['numero_solicitud'], respuesta.headers.get('Location')))
+
+        clientes = [cliente_de_prueba(flask_app, analista_id) for _ in range(args.copias)]
+        inicio = time.perf_counter()
+        for datos in envios:
+            hilos = [threading.Thread(target=enviar, args=(datos, cliente)) for cliente in clientes]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        total = time.perf_counter() - inicio
+
+        destinos = {}
+        for numero, destino in redirecciones:
+            destinos.setdefault(numero, set()).add(destino)
+        with aplicacion.get_db() as conn:
+            creditos = conn.execute('SELECT COUNT(*) FROM creditos WHERE numero_solicitud IS NOT NULL').fetchone()[0]
+            clientes_bd = conn.execute('SELECT COUNT(*) FROM clientes').fetchone()[0]
+            trabajos_bd = conn.execute(
+                "SELECT COUNT(*) FROM trabajos WHERE tipo = 'calificar_solicitud'").fetchone()[0]
+        ajeno_status, ajeno_antes, ajeno_despues = envio_ajeno(flask_app, envios[0])
+        aplicacion.cerrar_pool()
+
+    tiempos.sort()
+    esperados = len({datos['rfc'] for datos in envios})
+    print(f'{args.formularios} formularios x {args.copias} envíos simultáneos en {total:.2f} s')
+    print(f'latencia p50 {statistics.median(tiempos) * 1e3:.1f} ms, '
+          f'p99 {tiempos[int(len(tiempos) * 0.99) - 1] * 1e3:.1f} ms')
+    print(f'créditos {creditos} (esperados {args.formularios}), clientes {clientes_bd} (esperados {esperados}), '
+          f'trabajos de calificación {trabajos_bd}')
+    fallas = []
+    if errores:
+        fallas.append(f'{len(errores)} respuestas inesperadas: {sorted(set(errores))}')
+    if any(len(d) != 1 for d in destinos.values()):
+        fallas.append('copias de un mismo formulario llevaron a solicitudes distintas')
+    if creditos != args.formularios or trabajos_bd != args.formularios:
+        fallas.append('créditos o trabajos duplicados')
+    if clientes_bd != esperados:
+        fallas.append('clientes duplicados')
+    print(f'RFC de otro analista: HTTP {ajeno_status}, perfil '
+          f'{"sin cambios" if ajeno_antes == ajeno_despues else "MODIFICADO"}')
+    if ajeno_status != 409:
+        fallas.append(f'el RFC de otro analista respondió {ajeno_status} en lugar de 409')
+    if ajeno_antes != ajeno_despues:
+        fallas.append('otro analista sobrescribió el perfil del cliente')
+    for falla in fallas:
+        print(f'FALLA: {falla}')
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
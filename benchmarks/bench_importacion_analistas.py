@@ -0,0 +1,99 @@
+"""Alta masiva de analistas: importación por lote contra guardar_analista por fila.
+
+Uso:
+    python benchmarks/bench_importacion_analistas.py [--filas 50000] [--muestra-por-fila 2000]
+
+Genera un CSV sintético con RFC válidos, lo importa con
+importacion_analistas.importar_analistas (una transacción, executemany) y
+aprueba todos los códigos con cambiar_estado. Como referencia mide
+guardar_analista + aprobar uno por uno sobre una muestra y lo extrapola.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+import importacion_analistas  # noqa: E402
+import rfcs  # noqa: E402
+
+
+def generar_csv(n, desplazamiento=0):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(['nombre', 'apellido_paterno', 'apellido_materno', 'rfc', 'telefono', 'nip'])
+    inicio = date(1960, 1, 1)
+    for i in range(desplazamiento, desplazamiento + n):
+        nombre, paterno, materno = f'Nombre{i}', f'Paterno{i % 977}', f'Materno{i % 541}'
+        nacimiento = inicio + timedelta(days=i % 14000)
+        base = rfcs.base_rfc(nombre, paterno, materno, nacimiento)
+        homoclave = f'{chr(65 + i % 26)}{chr(65 + (i // 26) % 26)}'
+        # Unicidad: el número de fila cambia la homoclave
+        rfc = base + homoclave
+        rfc += rfcs.digito_verificador(rfc)
+        escritor.writerow([nombre, paterno, materno, rfc, f'55{i:08d}', f'{i % 10000:04d}'])
+    return salida.getvalue().encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, default=50_000)
+    parser.add_argument('--muestra-por-fila', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        aplicacion.init_db()
+
+        contenido = generar_csv(args.filas)
+        inicio = time.perf_counter()
+        registros = importacion_analistas.leer_registros(contenido, 'analistas.csv')
+        with aplicacion.get_db() as conn:
+            resultado = importacion_analistas.importar_analistas(conn, registros)
+        importacion = time.perf_counter() - inicio
+        codigos = [codigo for _, codigo in resultado['insertados']]
+
+        inicio = time.perf_counter()
+        with aplicacion.get_db() as conn:
+            cambio = importacion_analistas.cambiar_estado(conn, codigos, 'aprobado')
+        aprobacion = time.perf_counter() - inicio
+
+        # Referencia: una transacción por analista
+        muestra = importacion_analistas.leer_registros(
+            generar_csv(args.muestra_por_fila, desplazamiento=args.filas), 'muestra.csv')
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()  # guardar_analista imprime una línea por fila
+        try:
+            inicio = time.perf_counter()
+            for i, registro in enumerate(muestra):
+                aplicacion.guardar_analista(dict(registro, codigo=f'R{i}'))
+            por_fila = (time.perf_counter() - inicio) / len(muestra)
+            inicio = time.perf_counter()
+            with aplicacion.app.test_request_context():
+                aplicacion.session['user_type'] = 'admin'
+                for i in range(len(muestra)):
+                    aplicacion.aprobar_analista(f'R{i}')
+            aprobar_por_fila = (time.perf_counter() - inicio) / len(muestra)
+        finally:
+            sys.stdout = stdout
+        aplicacion.cerrar_pool()
+
+    n = args.filas
+    print(f"{'operación':<34} {'filas':>8} {'segundos':>10} {'filas/s':>10}")
+    print(f"{'importar (lote)':<34} {n:>8,} {importacion:>10.2f} {n / importacion:>10,.0f}")
+    print(f"{'aprobar (lote)':<34} {len(cambio['actualizados']):>8,} {aprobacion:>10.2f} "
+          f"{len(cambio['actualizados']) / aprobacion:>10,.0f}")
+    print(f"{'guardar_analista por fila (extrap.)':<34} {n:>8,} {por_fila * n:>10.2f} {1 / por_fila:>10,.0f}")
+    print(f"{'aprobar_analista por fila (extrap.)':<34} {n:>8,} {aprobar_por_fila * n:>10.2f} "
+          f"{1 / aprobar_por_fila:>10,.0f}")
+    print(f"errores de importación: {len(resultado['errores'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark: latencia de login_analista según el número de analistas registrados.
+
+Uso:
+    python benchmarks/bench_login_analista.py [--tamanos 100,1000,10000,100000]
+
+Crea una base temporal por cada tamaño, inserta los analistas en bloque y mide
+el POST a /login_analista con el cliente de pruebas de Flask. Con la búsqueda
+indexada por código la mediana debe mantenerse prácticamente constante.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+
+
+def poblar(total):
+    """Insertar `total` analistas aprobados con códigos E000001..E{total}"""
+    with aplicacion.get_db() as conn:
+        conn.executemany(
+            '''INSERT INTO analistas (codigo, nombre, apellido_paterno, apellido_materno,
+                                      rfc, telefono, nip, estado, rol)
+               VALUES (?, ?, '', '', ?, '', '4321', 'aprobado', 'analista')''',
+            ((f'E{i:06d}', f'Analista {i}', f'BENCH{i:08d}') for i in range(1, total + 1))
+        )
+        conn.commit()
+
+
+def medir(cliente, codigo, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        respuesta = cliente.post('/login_analista', data={'codigo': codigo, 'nip': '4321'})
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        assert respuesta.status_code == 302, respuesta.status_code
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanos', default='100,1000,10000,100000')
+    parser.add_argument('--repeticiones', type=int, default=200)
+    args = parser.parse_args()
+
+    aplicacion.app.config['TESTING'] = True
+    print(f"{'analistas':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for total in (int(t) for t in args.tamanos.split(',')):
+        with tempfile.TemporaryDirectory() as directorio:
+            aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+            aplicacion.init_db()
+            poblar(total)
+
+            cliente = aplicacion.app.test_client()
+            # El último código insertado es el peor caso para un recorrido lineal
+            tiempos = sorted(medir(cliente, f'e{total:06d} ', args.repeticiones))
+            p50 = statistics.median(tiempos)
+            p99 = tiempos[int(len(tiempos) * 0.99) - 1]
+            print(f"{total:>10} {p50:>8.3f} {p99:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Logins de analista por segundo (un núcleo) según el costo del hash del NIP.
+
+Uso:
+    python benchmarks/bench_login_analistas.py [--costos 1000,10000,50000,100000,600000] [--segundos 2]
+
+Para cada costo (iteraciones de PBKDF2) mide POST /login_analista en un solo
+proceso: sin caché (cada login calcula el hash), con la caché de
+verificaciones (el mismo analista vuelve a entrar) y una ráfaga de relleno de
+credenciales (NIPs incorrectos contra un código desde una IP) con el
+limitador activo, reportando cuánta CPU consumió la ráfaga.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+import credenciales  # noqa: E402
+
+
+def medir(datos, segundos, antes=None):
+    """Logins por segundo durante `segundos` (mínimo 5 peticiones).
+
+    Cada login usa un cliente nuevo: la sesión acumula los mensajes flash y
+    una cookie cada vez más grande sesgaría la medición.
+    """
+    n = 0
+    inicio = time.perf_counter()
+    while n < 5 or time.perf_counter() - inicio < segundos:
+        if antes:
+            antes()
+        respuesta = aplicacion.app.test_client().post('/login_analista', data=datos)
+        assert respuesta.status_code == 302, respuesta.status_code
+        n += 1
+    return n / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--costos', default='1000,10000,50000,100000,600000')
+    parser.add_argument('--segundos', type=float, default=2.0)
+    parser.add_argument('--rafaga', type=int, default=1000, help='intentos en la ráfaga')
+    args = parser.parse_args()
+
+    limites = (credenciales.limite_por_codigo, credenciales.limite_por_ip)
+    configurados = [(l.capacidad, l.por_segundo) for l in limites]
+
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        stdout, sys.stdout = sys.stdout, io.StringIO()  # la app imprime cada login
+        try:
+            aplicacion.init_db()
+            filas = []
+            for costo in (int(c) for c in args.costos.split(',')):
+                credenciales.ITERACIONES = costo
+                with aplicacion.get_db() as conn:
+                    conn.execute("UPDATE analistas SET nip = ? WHERE codigo = 'RAG123'",
+                                 (credenciales.hashear_nip('1234'),))
+                datos = {'codigo': 'RAG123', 'nip': '1234'}
+
+                # Throughput sin limitador
+                for limite in limites:
+                    limite.capacidad, limite.por_segundo = 10**9, 10**9
+                medir(datos, 0.2)  # calentamiento
+                sin_cache = medir(datos, args.segundos,
+                                  antes=credenciales.cache_verificaciones.limpiar)
+                con_cache = medir(datos, args.segundos)
+
+                # Ráfaga con los límites configurados: solo los intentos
+                # permitidos llegan a calcular el hash
+                for limite, (capacidad, por_segundo) in zip(limites, configurados):
+                    limite.capacidad, limite.por_segundo = capacidad, por_segundo
+                    limite._buckets.clear()
+                rechazados_antes = (credenciales.limite_por_ip.rechazados
+                                    + credenciales.limite_por_codigo.rechazados)
+                cpu = time.process_time()
+                for i in range(args.rafaga):
+                    aplicacion.app.test_client().post(
+                        '/login_analista', data={'codigo': 'RAG123', 'nip': f'{i % 10000:04d}'})
+                cpu = time.process_time() - cpu
+                rechazados = (credenciales.limite_por_ip.rechazados
+                              + credenciales.limite_por_codigo.rechazados - rechazados_antes)
+                filas.append((costo, sin_cache, con_cache, args.rafaga - rechazados, cpu))
+        finally:
+            sys.stdout = stdout
+        aplicacion.cerrar_pool()
+
+    print(f"{'iteraciones':>11} {'login/s sin caché':>18} {'login/s con caché':>18} "
+          f"{'ráfaga: hashes':>15} {'ráfaga: CPU s':>14}")
+    for costo, sin_cache, con_cache, hashes, cpu in filas:
+        print(f"{costo:>11,} {sin_cache:>18,.0f} {con_cache:>18,.0f} {hashes:>15,} {cpu:>14.2f}")
+    print(f"(ráfaga de {args.rafaga} NIPs incorrectos contra un código desde una IP)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Costo de la instrumentación por petición (metricas.py).
+
+Uso:
+    python benchmarks/bench_metricas.py [--peticiones 3000] [--rondas 3]
+
+Mide login_analista y gestionar_analistas con METRICAS_ACTIVAS=0 y =1, cada
+variante en su propio proceso (la instrumentación se decide al importar la
+aplicación). Las variantes se alternan durante --rondas rondas y se reporta
+la mejor de cada una, porque entre procesos el ruido es del mismo orden que
+la diferencia. Imprime también el tamaño de la exposición de Prometheus.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTAS = ('login_analista', 'gestionar_analistas')
+
+
+def medir(peticiones):
+    """Cuerpo del proceso hijo: imprime un JSON con p50/p99 por ruta"""
+    sys.path.insert(0, RAIZ)
+    import app as aplicacion
+    import credenciales
+    import metricas
+
+    for limite in (credenciales.limite_por_codigo, credenciales.limite_por_ip):
+        limite.capacidad = limite.por_segundo = 10**9
+
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        aplicacion.init_db()
+        with aplicacion.get_db() as conn:
+            conn.execute("UPDATE analistas SET nip = ? WHERE codigo = 'RAG123'",
+                         (credenciales.hashear_nip('1234'),))
+
+        admin = aplicacion.app.test_client()
+        with admin.session_transaction() as sesion:
+            sesion['user_type'], sesion['user_id'] = 'admin', 1
+
+        rutas = {
+            'login_analista': lambda: aplicacion.app.test_client().post(
+                '/login_analista', data={'codigo': 'RAG123', 'nip': '1234'}),
+            'gestionar_analistas': lambda: admin.get('/gestionar_analistas'),
+        }
+        resultados = {}
+        for nombre, peticion in rutas.items():
+            for _ in range(200):  # calentamiento
+                peticion()
+            tiempos = []
+            for _ in range(peticiones):
+                inicio = time.perf_counter()
+                peticion()
+                tiempos.append(time.perf_counter() - inicio)
+            tiempos.sort()
+            resultados[nombre] = (statistics.median(tiempos), tiempos[int(len(tiempos) * 0.99)])
+        resultados['exposicion_bytes'] = len(admin.get('/metricas').data) if metricas.ACTIVAS else 0
+        aplicacion.cerrar_pool()
+    print(json.dumps(resultados))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--peticiones', type=int, default=3000)
+    parser.add_argument('--rondas', type=int, default=3)
+    parser.add_argument('--hijo', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        return medir(args.peticiones)
+
+    variantes = {'0': [], '1': []}
+    for _ in range(args.rondas):
+        for activas, resultados in variantes.items():
+            entorno = dict(os.environ, METRICAS_ACTIVAS=activas, LOG_NIVEL='WARNING')
+            salida = subprocess.run([sys.executable, __file__, '--hijo', '--peticiones', str(args.peticiones)],
+                                    env=entorno, capture_output=True, text=True, check=True).stdout
+            resultados.append(json.loads(salida.strip().splitlines()[-1]))
+
+    print(f"{'ruta':<22} {'p50 sin':>9} {'p50 con':>9} {'p99 sin':>9} {'p99 con':>9}   (ms)")
+    for ruta in RUTAS:
+        (p50_sin, p99_sin), (p50_con, p99_con) = (
+            min((r[ruta] for r in variantes[activas]), key=lambda t: t[0]) for activas in ('0', '1'))
+        print(f"{ruta:<22} {p50_sin * 1e3:>9.3f} {p50_con * 1e3:>9.3f} {p99_sin * 1e3:>9.3f} {p99_con * 1e3:>9.3f}")
+    print(f"exposición de /metricas: {variantes['1'][-1]['exposicion_bytes']:,} bytes")
+
+
+if __name__ == '__main__':
+    main()
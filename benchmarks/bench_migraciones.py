@@ -0,0 +1,128 @@
+"""Bloqueo de escritura durante las migraciones sobre una tabla `creditos` grande.
+
+Uso:
+    python benchmarks/bench_migraciones.py [--creditos 1000000] [--lote 5000]
+
+Llena una BD temporal con --creditos créditos con decisión y mide, mientras
+un hilo inserta un crédito cada 10 ms con su propia conexión:
+  relleno      la migración 5 (justificación y motivo desde observaciones)
+               por lotes de rowid (migraciones.Relleno) contra el mismo
+               UPDATE en una sola transacción
+  índice       CREATE INDEX sobre creditos (cliente_id), la migración 3, que
+               SQLite no puede partir: es lo que espera un escritor por índice
+Para cada caso: duración total y espera del escritor (p50, p99 y máxima).
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+import migraciones  # noqa: E402
+
+RELLENO = migraciones.MIGRACIONES[4]
+
+
+def poblar(conn, n):
+    conn.execute("INSERT INTO clientes (nombre, rfc) VALUES ('Bench', 'BENC000000XXX')")
+    estados = ('aprobado', 'rechazado', 'zona_gris')
+    conn.executemany('''
+        INSERT INTO creditos (cliente_id, analista_id, monto, plazo, tasa_interes, estado, observaciones)
+        VALUES (1, 1, 50000, 24, 0.3, ?, ?)
+    ''', ((estados[i % 3], f'[Historial negativo] Motivo {i}' if i % 3 == 1 else f'Justificación {i}')
+          for i in range(n)))
+
+
+def reiniciar(conn):
+    """Dejar la BD como antes de la migración 5"""
+    conn.execute('UPDATE creditos SET justificacion = NULL, motivo_rechazo = NULL')
+    conn.execute('DELETE FROM migraciones WHERE version >= ?', (RELLENO.version,))
+    conn.execute(f'PRAGMA user_version = {RELLENO.version - 1}')
+
+
+class Escritor(threading.Thread):
+    """Inserta un crédito cada 10 ms y guarda cuánto tardó cada INSERT"""
+
+    def __init__(self, database):
+        super().__init__(daemon=True)
+        self.conn = sqlite3.connect(database, timeout=600, isolation_level=None, check_same_thread=False)
+        self.esperas = []
+        self.alto = threading.Event()
+
+    def run(self):
+        while not self.alto.is_set():
+            inicio = time.perf_counter()
+            self.conn.execute('''
+                INSERT INTO creditos (cliente_id, analista_id, monto, plazo, tasa_interes, estado)
+                VALUES (1, 1, 1000, 12, 0.3, 'pendiente')
+            ''')
+            self.esperas.append(time.perf_counter() - inicio)
+            time.sleep(0.01)
+
+    def detener(self):
+        self.alto.set()
+        self.join()
+        self.conn.close()
+        esperas = sorted(self.esperas)
+        return statistics.median(esperas), esperas[int(len(esperas) * 0.99) - 1], esperas[-1]
+
+
+def medir(database, funcion):
+    escritor = Escritor(database)
+    escritor.start()
+    time.sleep(0.1)
+    inicio = time.perf_counter()
+    funcion()
+    duracion = time.perf_counter() - inicio
+    time.sleep(0.1)
+    return (duracion, *escritor.detener())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--creditos', type=int, default=1_000_000)
+    parser.add_argument('--lote', type=int, default=migraciones.TAMANO_LOTE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        aplicacion.init_db()
+        with aplicacion.get_db() as conn:
+            poblar(conn, args.creditos)
+            reiniciar(conn)
+        relleno = migraciones.Relleno(RELLENO.version, RELLENO.descripcion, RELLENO.tabla,
+                                      RELLENO.asignaciones, RELLENO.condicion, lote=args.lote)
+
+        def por_lotes():
+            with aplicacion.get_db() as conn:
+                migraciones.aplicar(conn, [relleno])
+
+        def de_una_vez():
+            with aplicacion.get_db() as conn, migraciones.transaccion(conn):
+                conn.execute(f'UPDATE creditos SET {relleno.asignaciones} WHERE {relleno.condicion}')
+
+        def indice():
+            with aplicacion.get_db() as conn, migraciones.transaccion(conn):
+                conn.execute('DROP INDEX IF EXISTS idx_creditos_cliente')
+                conn.execute('CREATE INDEX idx_creditos_cliente ON creditos (cliente_id)')
+
+        print(f'{args.creditos:,} créditos, lotes de {args.lote:,} filas')
+        print(f"{'caso':<28} {'total s':>8} {'escritor p50 ms':>16} {'p99 ms':>8} {'máx ms':>9}")
+        casos = (('relleno por lotes', por_lotes), ('relleno en un UPDATE', de_una_vez),
+                 ('CREATE INDEX (uno)', indice))
+        for nombre, funcion in casos:
+            duracion, p50, p99, maxima = medir(aplicacion.DATABASE, funcion)
+            print(f'{nombre:<28} {duracion:>8.2f} {p50 * 1e3:>16.2f} {p99 * 1e3:>8.2f} {maxima * 1e3:>9.1f}')
+            with aplicacion.get_db() as conn:
+                reiniciar(conn)
+        aplicacion.cerrar_pool()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Memoria de los listados de analistas: dicts por fila contra modelos con __slots__.
+
+Uso:
+    python benchmarks/bench_modelos.py [--analistas 100000]
+
+Con --analistas filas en la tabla mide (tracemalloc):
+  lista        memoria retenida por la lista completa, como dicts normalizados
+               al leer (lo que hacía cargar_analistas) y como modelos.Analista
+  iterador     pico al recorrer iterar_analistas() sin guardar las filas
+  página       pico al generar /gestionar_analistas: render_template con la
+               lista de dicts (antes) contra la respuesta en streaming (ahora)
+
+Los tiempos incluyen el costo de tracemalloc; sirven para comparar entre sí.
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as aplicacion  # noqa: E402
+import modelos  # noqa: E402
+from flask import render_template  # noqa: E402
+
+
+def poblar(n):
+    filas = ((f'B{i:07d}', f'Nombre{i}', 'Paterno', 'Materno', f'BENC{i:09d}', '5555555555',
+              'pbkdf2:sha256$x', 'aprobado' if i % 3 else 'pendiente') for i in range(n))
+    with aplicacion.get_db() as conn:
+        conn.executemany('''
+            INSERT INTO analistas (codigo, nombre, apellido_paterno, apellido_materno, rfc,
+                                   telefono, nip, estado, rol, fecha_registro)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'analista', datetime('now', '-' || abs(random() % 1000) || ' minutes'))
+        ''', filas)
+
+
+def fila_a_dict(row):
+    """La conversión por lectura que hacía cargar_analistas (referencia)"""
+    fecha_registro = row['fecha_registro']
+    if isinstance(fecha_registro, str):
+        fecha_str = fecha_registro
+    elif fecha_registro:
+        fecha_str = fecha_registro.strftime('%Y-%m-%d %H:%M:%S')
+    else:
+        fecha_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return {
+        'id': row['id'],
+        'codigo': str(row['codigo'] or '').strip().upper(),
+        'nombre': row['nombre'] or '',
+        'apellido_paterno': row['apellido_paterno'] or '',
+        'apellido_materno': row['apellido_materno'] or '',
+        'rfc': str(row['rfc']).strip().upper(),
+        'telefono': row['telefono'] or '',
+        'nip': str(row['nip']).strip(),
+        'estado': str(row['estado']).strip(),
+        'rol': str(row['rol']).strip(),
+        'fecha_registro': fecha_str,
+    }
+
+
+def cargar_dicts():
+    with aplicacion.get_db() as conn:
+        return [fila_a_dict(f) for f in conn.execute('SELECT * FROM analistas ORDER BY fecha_registro DESC')]
+
+
+def medir(funcion):
+    """(segundos, bytes retenidos por el resultado, pico) de funcion()"""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    retenido, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return duracion, retenido, pico
+
+
+def recorrer():
+    for _ in aplicacion.iterar_analistas():
+        pass
+
+
+def pagina_antes(admin):
+    with aplicacion.app.test_request_context('/gestionar_analistas'):
+        analistas = cargar_dicts()
+        html = render_template('gestionar_analistas.html', analistas=analistas,
+                               total_analistas=len(analistas))
+    return len(html)
+
+
+def pagina_ahora(admin):
+    respuesta = admin.get('/gestionar_analistas', buffered=False)
+    total = sum(len(parte) for parte in respuesta.response)
+    respuesta.close()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--analistas', type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+        aplicacion.create_app()
+        poblar(args.analistas)
+        admin = aplicacion.app.test_client()
+        with admin.session_transaction() as sesion:
+            sesion['user_type'], sesion['user_id'] = 'admin', 1
+        pagina_ahora(admin)  # calentamiento (plantilla compilada, páginas de la BD en caché)
+
+        def lista_modelos():
+            return list(aplicacion.iterar_analistas())
+
+        casos = (
+            ('lista de dicts (antes)', cargar_dicts),
+            ('lista de modelos.Analista', lista_modelos),
+            ('iterar_analistas()', recorrer),
+            ('página, render_template (antes)', lambda: pagina_antes(admin)),
+            ('página en streaming (ahora)', lambda: pagina_ahora(admin)),
+        )
+        with aplicacion.get_db() as conn:
+            fila = conn.execute(f'SELECT {modelos.COLUMNAS_ANALISTA} FROM analistas LIMIT 1').fetchone()
+        print(f"{aplicacion.contar_analistas():,} analistas; objeto por fila sin contar los valores: "
+              f"dict {sys.getsizeof(fila_a_dict(fila))} B, Analista {sys.getsizeof(modelos.Analista.desde_fila(fila))} B")
+        print(f"{'caso':<34} {'tiempo s':>9} {'retenido MiB':>13} {'pico MiB':>9}")
+        for nombre, funcion in casos:
+            duracion, retenido, pico = medir(funcion)
+            print(f"{nombre:<34} {duracion:>9.3f} {retenido / 2**20:>13.1f} {pico / 2**20:>9.1f}")
+        aplicacion.cerrar_pool()
+
+
+if __name__ == '__main__':
+    main()
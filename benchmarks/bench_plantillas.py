@@ -0,0 +1,154 @@
+"""Primera petición y render por página con y sin las cachés de plantillas.
+
+Uso:
+    python benchmarks/bench_plantillas.py [--renders 500] [--rondas 3]
+
+Primera petición: cada variante corre en un proceso nuevo y mide la primera
+petición a cada página (lo que ve un worker recién creado):
+  fuente         JINJA_CACHE_DIR vacío; se compila desde el código fuente
+  bytecode       JINJA_CACHE_DIR ya poblado por una corrida anterior
+  precompiladas  plantillas.precompilar() antes de la petición, como hace
+                 create_app() antes del fork
+
+Render: mediana por página con la aplicación caliente, con los fragmentos
+({% fragmento %}) activos y sin ellos.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = ('nueva_solicitud', 'mis_solicitudes', 'evaluar_solicitud', 'resultado_solicitud',
+           'panel_admin', 'gestionar_analistas', 'reglas_negocio')
+
+
+def preparar(directorio):
+    """BD con 200 solicitudes del analista RAG123 y clientes de prueba con sesión"""
+    sys.path.insert(0, RAIZ)
+    import app as aplicacion
+    import bench_decisiones
+
+    aplicacion.DATABASE = os.path.join(directorio, 'bench.db')
+    aplicacion.init_db()
+    ids = bench_decisiones.poblar(200)
+    with aplicacion.get_db() as conn:
+        analista = conn.execute("SELECT id, codigo, nombre FROM analistas WHERE codigo = 'RAG123'").fetchone()
+
+    admin = aplicacion.app.test_client()
+    with admin.session_transaction() as sesion:
+        sesion['user_type'], sesion['user_id'] = 'admin', 1
+    analista_cliente = aplicacion.app.test_client()
+    with analista_cliente.session_transaction() as sesion:
+        sesion['user_type'] = 'analista'
+        sesion['user_id'] = sesion['analista_id'] = analista['id']
+        sesion['analista_codigo'], sesion['analista_nombre'] = analista['codigo'], analista['nombre']
+
+    rutas = {
+        'nueva_solicitud': (analista_cliente, '/nueva_solicitud'),
+        'mis_solicitudes': (analista_cliente, '/mis_solicitudes'),
+        'evaluar_solicitud': (admin, f'/evaluar_solicitud?id={ids[0]}'),
+        'resultado_solicitud': (admin, f'/resultado_solicitud/{ids[0]}'),
+        'panel_admin': (admin, '/panel_admin'),
+        'gestionar_analistas': (admin, '/gestionar_analistas'),
+        'reglas_negocio': (admin, '/reglas_negocio'),
+    }
+    return aplicacion, rutas
+
+
+def pedir(cliente, url):
+    respuesta = cliente.get(url)
+    assert respuesta.status_code == 200, (url, respuesta.status_code)
+
+
+def primera_peticion(precompilar):
+    """Cuerpo del proceso hijo: ms de la primera petición a cada página"""
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion, rutas = preparar(directorio)
+        import plantillas
+
+        resultados = {}
+        if precompilar:
+            plantillas.precompilar(aplicacion.app)
+        for nombre in PAGINAS:
+            inicio = time.perf_counter()
+            pedir(*rutas[nombre])
+            resultados[nombre] = time.perf_counter() - inicio
+        aplicacion.cerrar_pool()
+    print(json.dumps(resultados))
+
+
+def renders(n):
+    """Cuerpo del proceso hijo: mediana de n peticiones por página, con y sin fragmentos"""
+    with tempfile.TemporaryDirectory() as directorio:
+        aplicacion, rutas = preparar(directorio)
+        fragmentos = aplicacion.app.jinja_env.fragmentos
+        resultados = {}
+        for activa in (False, True):
+            fragmentos.activa = activa
+            for nombre in PAGINAS:
+                cliente, url = rutas[nombre]
+                for _ in range(20):  # calentamiento
+                    pedir(cliente, url)
+                tiempos = []
+                for _ in range(n):
+                    inicio = time.perf_counter()
+                    pedir(cliente, url)
+                    tiempos.append(time.perf_counter() - inicio)
+                resultados.setdefault(nombre, []).append(statistics.median(tiempos))
+        aplicacion.cerrar_pool()
+    print(json.dumps(resultados))
+
+
+def hijo(argumentos, **entorno):
+    salida = subprocess.run([sys.executable, __file__, '--hijo', *argumentos],
+                            env=dict(os.environ, LOG_NIVEL='WARNING', **entorno),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renders', type=int, default=500)
+    parser.add_argument('--rondas', type=int, default=3)
+    parser.add_argument('--hijo', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--modo', choices=('fuente', 'bytecode', 'precompiladas', 'renders'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        if args.modo == 'renders':
+            return renders(args.renders)
+        return primera_peticion(precompilar=args.modo == 'precompiladas')
+
+    variantes = {'fuente': [], 'bytecode': [], 'precompiladas': []}
+    for _ in range(args.rondas):
+        with tempfile.TemporaryDirectory() as cache:
+            for modo, resultados in variantes.items():
+                # 'fuente' corre primero con el directorio vacío y lo deja poblado
+                resultados.append(hijo(['--modo', modo], JINJA_CACHE_DIR=cache))
+    mejor = {modo: {c: min(r[c] for r in resultados) for c in resultados[0]}
+             for modo, resultados in variantes.items()}
+
+    print('Primera petición por página (ms, mejor de', args.rondas, 'procesos)')
+    print(f"{'página':<22} {'fuente':>9} {'bytecode':>9} {'precompiladas':>14}")
+    for nombre in PAGINAS:
+        print(f"{nombre:<22} {mejor['fuente'][nombre] * 1e3:>9.2f} {mejor['bytecode'][nombre] * 1e3:>9.2f}"
+              f" {mejor['precompiladas'][nombre] * 1e3:>14.2f}")
+    print(f"{'total':<22} {sum(mejor['fuente'][n] for n in PAGINAS) * 1e3:>9.2f}"
+          f" {sum(mejor['bytecode'][n] for n in PAGINAS) * 1e3:>9.2f}"
+          f" {sum(mejor['precompiladas'][n] for n in PAGINAS) * 1e3:>14.2f}")
+
+    resultados = hijo(['--modo', 'renders', '--renders', str(args.renders)])
+    print()
+    print(f"Petición con la aplicación caliente (ms, mediana de {args.renders})")
+    print(f"{'página':<22} {'sin fragmentos':>15} {'con fragmentos':>15}")
+    for nombre in PAGINAS:
+        sin, con = resultados[nombre]
+        print(f"{nombre:<22} {sin * 1e3:>15.3f} {con * 1e3:>15.3f}")
+
+
+if __name__ == '__main__':
+    main()
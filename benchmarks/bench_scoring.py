@@ -0,0 +1,93 @@
+"""Micro-benchmark del motor de scoring vectorizado.
+
+Uso:
+    python benchmarks/bench_scoring.py [--tamanos 10000,100000,1000000]
+
+Genera solicitudes sintéticas con los valores posibles del formulario y compara
+scoring.calcular_scores contra calificar cada solicitud por separado con
+scoring.calificar_solicitud (el ciclo por fila solo se mide hasta 100k y se
+extrapola para tamaños mayores).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scoring  # noqa: E402
+
+ESTADO_CIVIL = ['Soltero', 'Casado', 'Divorciado', 'Viudo', 'Unión Libre']
+ESTUDIOS = ['Primaria', 'Secundaria', 'Preparatoria', 'Universidad', 'Posgrado']
+ZONAS = ['Urbana', 'Semiurbana', 'Rural']
+OCUPACIONES = ['Empleado Público', 'Empleado Privado', 'Profesionista Independiente',
+               'Negocio Propio', 'Comerciante', 'Agricultor']
+CALIFICACIONES = ['1', '2', '3', '4', '9', '96', '97', '98']
+MOP = ['1', '2', '3', '4', '5']
+
+MAX_POR_FILA = 100_000
+
+
+def generar(n, semilla=7):
+    rng = np.random.default_rng(semilla)
+    ingreso = rng.uniform(5000, 60000, n).round(2)
+    return {
+        'edad': rng.integers(18, 75, n).astype(np.float64),
+        'estado_civil': rng.choice(ESTADO_CIVIL, n).astype(object),
+        'dependientes': rng.integers(0, 11, n).astype(np.float64),
+        'nivel_estudios': rng.choice(ESTUDIOS, n).astype(object),
+        'zona': rng.choice(ZONAS, n).astype(object),
+        'antiguedad_domicilio': rng.uniform(0, 20, n).round(1),
+        'ocupacion': rng.choice(OCUPACIONES, n).astype(object),
+        'antiguedad_empleo': rng.uniform(0, 25, n).round(1),
+        'fico_score': rng.integers(300, 801, n).astype(np.float64),
+        'ultima_calificacion': rng.choice(CALIFICACIONES, n).astype(object),
+        'mop_6': rng.choice(MOP, n).astype(object),
+        'mop_12': rng.choice(MOP, n).astype(object),
+        'num_consultas': rng.integers(0, 15, n).astype(np.float64),
+        'tdsr': rng.uniform(5, 60, n).round(2),
+        'ingreso_mensual': ingreso,
+        'monto_solicitado': rng.uniform(5000, 250000, n).round(-3),
+    }
+
+
+def por_fila(datos, n):
+    campos = list(datos)
+    columnas = [datos[c].tolist() for c in campos]
+    for i in range(n):
+        scoring.calificar_solicitud({c: col[i] for c, col in zip(campos, columnas)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanos', default='10000,100000,1000000')
+    args = parser.parse_args()
+
+    print(f"{'solicitudes':>12} {'vectorizado s':>14} {'sol/s':>12} {'por fila s':>12} {'aceleración':>12}")
+    segundos_por_fila = None
+    for n in (int(t) for t in args.tamanos.split(',')):
+        datos = generar(n)
+
+        inicio = time.perf_counter()
+        resultado = scoring.calcular_scores(datos)
+        vectorizado = time.perf_counter() - inicio
+        assert resultado['score_total'].max() <= scoring.MAX_TOTAL
+
+        if n <= MAX_POR_FILA:
+            inicio = time.perf_counter()
+            por_fila(datos, n)
+            fila = time.perf_counter() - inicio
+            segundos_por_fila = fila / n
+            etiqueta = f'{fila:>12.3f}'
+        else:
+            fila = segundos_por_fila * n
+            etiqueta = f'{fila:>11.1f}*'
+
+        print(f'{n:>12,} {vectorizado:>14.3f} {n / vectorizado:>12,.0f} {etiqueta} {fila / vectorizado:>11.0f}x')
+    print('* extrapolado a partir del tamaño mayor medido por fila')
+
+
+if __name__ == '__main__':
+    main()
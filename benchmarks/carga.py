@@ -0,0 +1,131 @@
+"""Prueba de carga: requests/s y latencia p50/p99 de servidor.py.
+
+Uso:
+    python benchmarks/carga.py [--workers 1,4,16] [--clientes 32] [--duracion 5]
+
+Por cada número de workers arranca servidor.py sobre una base temporal, abre
+`--clientes` conexiones keep-alive concurrentes y mide durante `--duracion`
+segundos el POST a /login_analista y el GET a /gestionar_analistas.
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def esperar_servidor(port, timeout=15):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('El servidor no respondió a tiempo')
+
+
+def cookie_admin(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    cuerpo = urlencode({'username': 'admin', 'password': 'admin123'})
+    conn.request('POST', '/login_admin', body=cuerpo,
+                 headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    respuesta = conn.getresponse()
+    respuesta.read()
+    return respuesta.getheader('Set-Cookie').split(';', 1)[0]
+
+
+def peticion_login():
+    cuerpo = urlencode({'codigo': 'RAG123', 'nip': '1234'})
+    return 'POST', '/login_analista', cuerpo, {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+def peticion_listado(cookie):
+    return 'GET', '/gestionar_analistas', None, {'Cookie': cookie}
+
+
+def cliente(port, peticion, fin, latencias, errores):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    metodo, ruta, cuerpo, headers = peticion
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        try:
+            conn.request(metodo, ruta, body=cuerpo, headers=headers)
+            respuesta = conn.getresponse()
+            respuesta.read()
+            if respuesta.status >= 400:
+                errores.append(respuesta.status)
+        except (OSError, http.client.HTTPException) as e:
+            errores.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencias.append(time.perf_counter() - inicio)
+    conn.close()
+
+
+def medir(port, peticion, clientes, duracion):
+    latencias, errores = [], []
+    fin = time.perf_counter() + duracion
+    hilos = [threading.Thread(target=cliente, args=(port, peticion, fin, latencias, errores))
+             for _ in range(clientes)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    latencias.sort()
+    if not latencias:
+        return 0.0, 0.0, 0.0, len(errores)
+    p50 = statistics.median(latencias) * 1000
+    p99 = latencias[max(0, int(len(latencias) * 0.99) - 1)] * 1000
+    return len(latencias) / duracion, p50, p99, len(errores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,4,16')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--clientes', type=int, default=32)
+    parser.add_argument('--duracion', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'ruta':<24} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errores':>7}")
+    for workers in (int(w) for w in args.workers.split(',')):
+        with tempfile.TemporaryDirectory() as directorio:
+            port = puerto_libre()
+            env = dict(os.environ, DATABASE=os.path.join(directorio, 'carga.db'))
+            proceso = subprocess.Popen(
+                [sys.executable, os.path.join(RAIZ, 'servidor.py'), '--host', '127.0.0.1',
+                 '--port', str(port), '--workers', str(workers), '--threads', str(args.threads)],
+                cwd=RAIZ, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                esperar_servidor(port)
+                rutas = {
+                    'POST /login_analista': peticion_login(),
+                    'GET /gestionar_analistas': peticion_listado(cookie_admin(port)),
+                }
+                for nombre, peticion in rutas.items():
+                    rps, p50, p99, errores = medir(port, peticion, args.clientes, args.duracion)
+                    print(f"{workers:>7} {nombre:<24} {rps:>9.1f} {p50:>8.2f} {p99:>8.2f} {errores:>7}")
+            finally:
+                proceso.terminate()
+                proceso.wait(timeout=10)
+
+
+if __name__ == '__main__':
+    main()
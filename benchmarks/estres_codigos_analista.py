@@ -0,0 +1,151 @@
+"""Prueba de estrés del asignador de códigos de analista.
+
+Uso:
+    python benchmarks/estres_codigos_analista.py [--procesos 8] [--hilos 8] [--registros 200] [--bloque 10]
+
+Varios procesos (cada uno con su propio pool, como los workers de waitress o
+gunicorn) y varios hilos por proceso registran analistas en paralelo por
+POST /registro_analista mientras otro proceso hace importaciones masivas. Al
+final verifica que cada alta obtuvo un código distinto y quedó guardada, y
+compara con la tasa de colisión que tenía E + randbelow(900).
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rfc_sintetico(i):
+    """RFC con estructura y dígito verificador válidos, distinto para cada i"""
+    import rfcs
+    letras = ''.join(chr(65 + (i // 26 ** k) % 26) for k in range(4))
+    rfc = f'{letras}800101A{i % 10}'
+    return rfc + rfcs.digito_verificador(rfc)
+
+
+def registrar(database, proceso, hilos, registros, salida):
+    import app as aplicacion
+    aplicacion.DATABASE = database
+    sys.stdout = io.StringIO()  # las rutas imprimen una línea por alta
+
+    fallidos = []
+
+    def trabajador(hilo):
+        cliente = aplicacion.app.test_client()
+        for r in range(registros):
+            i = (proceso * hilos + hilo) * registros + r
+            respuesta = cliente.post('/registro_analista', data={
+                'nombre': f'Nombre{i} Paterno Materno', 'rfc': rfc_sintetico(i),
+                'telefono': '5555555555', 'nip': '1234',
+            })
+            # Éxito: página de registro exitoso, o redirección si no existe esa plantilla
+            if respuesta.status_code != 302 and b'registrado con c' not in respuesta.data:
+                fallidos.append(i)
+
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=trabajador, args=(h,)) for h in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    salida.put((proceso, len(fallidos), time.perf_counter() - inicio,
+                aplicacion.codigos_analista.bloques_reservados))
+
+
+def importar(database, lotes, filas, desplazamiento, salida):
+    import app as aplicacion
+    import importacion_analistas
+    aplicacion.DATABASE = database
+    insertados = errores = 0
+    for lote in range(lotes):
+        registros = [{
+            'nombre': f'Lote{lote}', 'apellido_paterno': f'Fila{f}',
+            'rfc': rfc_sintetico(desplazamiento + lote * filas + f), 'nip': '1234',
+        } for f in range(filas)]
+        with aplicacion.get_db() as conn:
+            resultado = importacion_analistas.importar_analistas(conn, registros)
+        insertados += len(resultado['insertados'])
+        errores += len(resultado['errores'])
+    salida.put(('importación', insertados, errores))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--procesos', type=int, default=8)
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--registros', type=int, default=200, help='altas por hilo')
+    parser.add_argument('--bloque', type=int, default=10, help='CODIGOS_BLOQUE')
+    parser.add_argument('--lotes', type=int, default=10, help='importaciones concurrentes')
+    args = parser.parse_args()
+    os.environ['CODIGOS_BLOQUE'] = str(args.bloque)
+
+    import app as aplicacion
+    import importacion_analistas
+
+    contexto = multiprocessing.get_context('fork')
+    with tempfile.TemporaryDirectory() as directorio:
+        database = os.path.join(directorio, 'estres.db')
+        aplicacion.DATABASE = database
+        sys.stdout, stdout = io.StringIO(), sys.stdout
+        aplicacion.init_db()
+        aplicacion.cerrar_pool()
+        sys.stdout = stdout
+
+        total = args.procesos * args.hilos * args.registros
+        filas_lote = 500
+        salida = contexto.Queue()
+        procesos = [contexto.Process(target=registrar,
+                                     args=(database, p, args.hilos, args.registros, salida))
+                    for p in range(args.procesos)]
+        procesos.append(contexto.Process(target=importar,
+                                         args=(database, args.lotes, filas_lote, total, salida)))
+        inicio = time.perf_counter()
+        for p in procesos:
+            p.start()
+        resultados = [salida.get() for _ in procesos]
+        for p in procesos:
+            p.join()
+        duracion = time.perf_counter() - inicio
+
+        with aplicacion.get_db() as conn:
+            filas, distintos = conn.execute('''
+                SELECT COUNT(*), COUNT(DISTINCT codigo) FROM analistas WHERE rol = 'analista'
+            ''').fetchone()
+            siguiente = conn.execute("SELECT siguiente FROM secuencias WHERE nombre = 'analistas'").fetchone()[0]
+        aplicacion.cerrar_pool()
+
+    registros = [r for r in resultados if r[0] != 'importación']
+    importacion = next(r for r in resultados if r[0] == 'importación')
+    fallidos = sum(r[1] for r in registros)
+    bloques = sum(r[3] for r in registros)
+    esperados = total + args.lotes * filas_lote
+
+    print(f'{args.procesos} procesos x {args.hilos} hilos x {args.registros} altas '
+          f'+ {args.lotes} importaciones de {filas_lote} filas')
+    print(f'altas individuales:  {total:,} ({fallidos} fallidas) en {duracion:.2f} s, '
+          f'{total / duracion:,.0f} altas/s')
+    print(f'importación:         {importacion[1]:,} insertados, {importacion[2]} errores')
+    print(f'bloques reservados:  {bloques:,} (bloque de {args.bloque}; '
+          f'{bloques / max(total, 1):.3f} escrituras a la secuencia por alta)')
+    print(f'analistas en la BD:  {filas:,} de {esperados:,} esperados, {distintos:,} códigos distintos')
+    consumidos = siguiente - importacion_analistas.PRIMER_CODIGO_AUTOMATICO
+    print(f'números consumidos:  {consumidos:,} (hueco por bloques sin agotar: {consumidos - filas:,})')
+
+    # Referencia: con E + randbelow(900) la probabilidad de que la k-ésima alta
+    # choque con un código ya usado es (k-1)/900; a partir de 900 es segura
+    colisiones = sum(min(k, 900) / 900 for k in range(total))
+    print(f'E + randbelow(900):  ~{colisiones:,.0f} de {total:,} altas habrían chocado')
+
+    ok = fallidos == 0 and filas == distintos == esperados and importacion[2] == 0
+    print('OK' if ok else 'FALLÓ')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Bitácora de la aplicación: logging con niveles, formato JSON y escritura asíncrona.
+
+Las rutas solo encolan el registro (QueueHandler); un hilo aparte
+(QueueListener) lo formatea y lo escribe, así que una salida lenta (pipe,
+disco, terminal) no agrega latencia a las peticiones. Los mensajes DEBUG se
+muestrean: con LOG_NIVEL=DEBUG solo pasa la fracción LOG_MUESTREO_DEBUG.
+
+Variables de entorno: LOG_NIVEL (INFO), LOG_FORMATO (json | texto) y
+LOG_MUESTREO_DEBUG (0.01).
+
+Uso en los módulos:
+    logger = logging.getLogger(__name__)
+    logger.info('Analista guardado', extra={'codigo': codigo})
+
+Los campos de `extra` salen como claves del JSON.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+NIVEL = os.environ.get('LOG_NIVEL', 'INFO').upper()
+FORMATO = os.environ.get('LOG_FORMATO', 'json')
+MUESTREO_DEBUG = float(os.environ.get('LOG_MUESTREO_DEBUG', 0.01))
+
+# Atributos propios de LogRecord; el resto viene de `extra`
+_ATRIBUTOS_ESTANDAR = (frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None)))
+                       | {'message', 'asctime'})
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro"""
+
+    def format(self, record):
+        ts = datetime.fromtimestamp(record.created, timezone.utc)
+        salida = {
+            'ts': ts.isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_ESTANDAR:
+                salida[clave] = valor
+        if record.exc_info:
+            salida['excepcion'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            salida['excepcion'] = record.exc_text
+        return json.dumps(salida, ensure_ascii=False, default=str)
+
+
+class FiltroMuestreo(logging.Filter):
+    """Deja pasar todos los registros INFO o mayores y una fracción de los DEBUG"""
+
+    def __init__(self, tasa):
+        super().__init__()
+        self.tasa = tasa
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.tasa
+
+
+class _ManejadorCola(logging.handlers.QueueHandler):
+    """Encola el registro con el mensaje ya resuelto; el formato final lo
+    aplica el hilo del listener"""
+
+    def prepare(self, record):
+        # Los args y la excepción se resuelven en el hilo que registra: pueden
+        # cambiar o liberarse antes de que el listener los procese
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = _formato_base.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_formato_base = logging.Formatter()
+_listener = None
+
+
+def _detener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configurar(nivel=NIVEL, formato=FORMATO, muestreo_debug=MUESTREO_DEBUG, destino=None):
+    """Instalar la bitácora en el logger raíz (se puede llamar de nuevo para cambiarla)"""
+    global _listener
+    raiz = logging.getLogger()
+    for manejador in [m for m in raiz.handlers if isinstance(m, _ManejadorCola)]:
+        raiz.removeHandler(manejador)
+    _detener()
+
+    salida = logging.StreamHandler(destino or sys.stderr)
+    if formato == 'json':
+        salida.setFormatter(FormatoJSON())
+    else:
+        salida.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    cola = queue.SimpleQueue()
+    manejador = _ManejadorCola(cola)
+    manejador.addFilter(FiltroMuestreo(muestreo_debug))
+    raiz.addHandler(manejador)
+    raiz.setLevel(nivel)
+
+    _listener = logging.handlers.QueueListener(cola, salida)
+    _listener.start()
+    return manejador
+
+
+def _reiniciar_en_hijo():
+    # El hilo del listener no sobrevive a fork(): cada worker arranca el suyo
+    # con una cola nueva (lo que quedara en la cola heredada se descarta)
+    global _listener
+    if _listener is None:
+        return
+    cola = queue.SimpleQueue()
+    for manejador in logging.getLogger().handlers:
+        if isinstance(manejador, _ManejadorCola):
+            manejador.queue = cola
+    _listener = logging.handlers.QueueListener(cola, *_listener.handlers)
+    _listener.start()
+
+
+os.register_at_fork(after_in_child=_reiniciar_en_hijo)
+atexit.register(_detener)
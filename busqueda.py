@@ -0,0 +1,218 @@
+"""Búsqueda de texto completo de clientes y analistas (SQLite FTS5).
+
+`clientes_fts` y `analistas_fts` son índices FTS5 de contenido externo: no
+copian las filas, solo indexan nombre, apellidos, RFC, teléfono (y código del
+analista). Los triggers los actualizan en la misma transacción que inserta,
+modifica o borra en `clientes` / `analistas`, igual que estadisticas.py
+(índices, vistas y triggers se crean en la migración 1 de migraciones.py). El
+tokenizador unicode61 con remove_diacritics 2 ignora acentos y mayúsculas
+("Núñez" = "nunez").
+
+El contenido se lee de la vista `<índice>_contenido`, que antepone
+MARCA_IDENTIFICADOR al RFC y al código: un prefijo de identificador se busca
+como "0gutm"*, que solo recorre identificadores (uno por persona) y no las
+listas de los apellidos que empiezan igual.
+
+`<índice>_nombres` guarda los valores distintos de nombre y apellidos con
+cuántas veces aparecen (también por triggers) y tiene su propio índice FTS5,
+de unos cuantos miles de términos aunque haya millones de clientes. De ahí
+salen, sin tocar el índice grande:
+
+  - Prefijos: "herna" se busca como ("hernandez" OR "hernani" ...). FTS5
+    resuelve un prefijo largo ("herna"*) armando en memoria la lista completa
+    de coincidencias; las opciones exactas se recorren sin materializarla. Los
+    prefijos de 2 y 3 letras usan los índices de prefijo de FTS5.
+  - Tolerancia a errores: si la consulta no llena el límite, cada término de
+    al menos MIN_LARGO_CORRECCION letras se amplía con los términos a
+    distancia de Levenshtein 1 (2 si tiene 8 letras o más), completos o por
+    prefijo ("admn" -> "administrador"). Esos resultados van después.
+
+Orden: se leen las VENTANA_RANKING coincidencias más recientes y se ordenan
+por puntaje (peso de la columna, término completo o prefijo). No se usa bm25:
+necesita cuántas filas contienen cada término y recorre la lista completa de
+"hernandez" (cientos de miles de filas) en cada consulta.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+MAX_RESULTADOS = 50
+MAX_TERMINOS = 6
+MAX_EXPANSIONES = 30
+MIN_LARGO_CORRECCION = 4
+MAX_CANDIDATOS = 5
+VENTANA_RANKING = 100
+MARCA_IDENTIFICADOR = '0'
+COLUMNAS_NOMBRE = ('nombre', 'apellido_paterno', 'apellido_materno')
+
+# nombre -> (tabla, columnas indexadas, pesos, columnas con MARCA_IDENTIFICADOR)
+INDICES = {
+    'clientes': ('clientes', ('nombre', 'apellido_paterno', 'apellido_materno', 'rfc', 'telefono'),
+                 (2.0, 2.0, 1.0, 4.0, 4.0), ('rfc',)),
+    'analistas': ('analistas', ('codigo', 'nombre', 'apellido_paterno', 'apellido_materno', 'rfc', 'telefono'),
+                  (5.0, 2.0, 2.0, 1.0, 4.0, 4.0), ('codigo', 'rfc')),
+}
+
+
+def reconstruir(conn, nombre):
+    """Volver a indexar toda la tabla (tras una carga hecha sin los triggers)"""
+    tabla = INDICES[nombre][0]
+    fts = f'{nombre}_fts'
+    nombres = f'{nombre}_nombres'
+    conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+    conn.execute(f'DELETE FROM {nombres}')
+    conn.execute(f'''
+        INSERT INTO {nombres} (valor, veces)
+        SELECT valor, count(*) FROM (
+            {' UNION ALL '.join(f'SELECT {c} AS valor FROM {tabla}' for c in COLUMNAS_NOMBRE)}
+        )
+        WHERE valor <> ''
+        GROUP BY valor
+    ''')
+
+
+_PALABRA = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=8192)
+def _tokens(texto):
+    """Términos como los guarda el índice: minúsculas y sin acentos"""
+    texto = (texto or '').lower()
+    if not texto.isascii():
+        descompuesto = unicodedata.normalize('NFKD', texto)
+        texto = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return tuple(_PALABRA.findall(texto))
+
+
+def terminos(texto):
+    """Términos de la consulta (a lo más MAX_TERMINOS)"""
+    return list(_tokens(texto)[:MAX_TERMINOS])
+
+
+def distancia(a, b, maximo):
+    """Distancia de Levenshtein entre a y b, o maximo + 1 si la rebasa"""
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior = actual
+    return anterior[-1]
+
+
+def _vocabulario(conn, nombre, desde, hasta):
+    return conn.execute(f'''
+        SELECT term, doc FROM {nombre}_nombres_vocab WHERE term >= ? AND term < ?
+    ''', (desde, hasta)).fetchall()
+
+
+def _expansiones(conn, nombre, termino):
+    """Nombres que empiezan con `termino`, o None si conviene el prefijo de FTS5"""
+    if len(termino) <= 3 or any(c.isdigit() for c in termino):
+        return None   # índice de prefijo de 2/3 letras, o identificador / teléfono
+    filas = _vocabulario(conn, nombre, termino, termino + '\U0010ffff')
+    return [term for term, _ in filas] if len(filas) <= MAX_EXPANSIONES else None
+
+
+def _corregir(conn, nombre, termino):
+    """Nombres a distancia 1 (2 desde 8 letras) de `termino` o cuyo prefijo del
+    mismo largo lo está; los más cercanos y frecuentes primero"""
+    if any(c.isdigit() for c in termino):
+        return []   # RFC, teléfono o código: se buscan solo por prefijo
+    maximo = 2 if len(termino) >= 8 else 1
+    candidatos = []
+    distancias = {}
+    for term, doc in _vocabulario(conn, nombre, termino[0], chr(ord(termino[0]) + 1)):
+        if len(term) < len(termino) - maximo:
+            continue
+        d = distancia(termino, term, maximo)
+        if len(term) > len(termino):
+            prefijo = term[:len(termino)]
+            if prefijo not in distancias:
+                distancias[prefijo] = distancia(termino, prefijo, maximo)
+            d = min(d, distancias[prefijo])
+        # Distancia 0 es un prefijo exacto: ya lo cubre la consulta sin corregir
+        if 0 < d <= maximo:
+            candidatos.append((d, -doc, term))
+    candidatos.sort()
+    return [term for _, _, term in candidatos[:MAX_CANDIDATOS]]
+
+
+def _expresion(grupos):
+    """MATCH con AND entre términos; cada uno es un OR de sus opciones"""
+    partes = []
+    for termino, expansiones, correcciones in grupos:
+        if expansiones is None:
+            opciones = [f'"{termino}"*']
+        else:
+            opciones = [f'"{e}"' for e in expansiones]
+        opciones.append(f'"{MARCA_IDENTIFICADOR}{termino}"*')
+        opciones += [f'"{c}"' for c in correcciones]
+        partes.append('(' + ' OR '.join(opciones) + ')')
+    return ' AND '.join(partes)
+
+
+def _consultar(conn, nombre, expresion, filtro, parametros, excluir=()):
+    """Las VENTANA_RANKING coincidencias más recientes: (id, columnas indexadas...)"""
+    tabla, columnas, _, _ = INDICES[nombre]
+    fts = f'{nombre}_fts'
+    condiciones = [f'{fts} MATCH ?'] + ([filtro] if filtro else [])
+    if excluir:
+        condiciones.append(f'{fts}.rowid NOT IN ({", ".join("?" * len(excluir))})')
+    return conn.execute(f'''
+        SELECT t.id, {', '.join(f't.{c}' for c in columnas)}
+        FROM {fts}
+        JOIN {tabla} t ON t.id = {fts}.rowid
+        WHERE {' AND '.join(condiciones)}
+        ORDER BY {fts}.rowid DESC
+        LIMIT ?
+    ''', (expresion, *parametros, *excluir, VENTANA_RANKING)).fetchall()
+
+
+def _ordenar(nombre, filas, lista, limite):
+    """Ids por puntaje: cada término suma el peso de la mejor columna donde aparece
+    (la mitad si solo como prefijo); los empates quedan por recencia"""
+    pesos = INDICES[nombre][2]
+
+    def puntaje(fila):
+        total = 0.0
+        for termino in lista:
+            mejor = 0.0
+            for valor, peso in zip(fila[1:], pesos):
+                tokens = _tokens(valor)
+                if termino in tokens:
+                    mejor = max(mejor, peso)
+                elif peso / 2 > mejor and any(token.startswith(termino) for token in tokens):
+                    mejor = peso / 2
+            total += mejor
+        return total
+
+    return [fila[0] for fila in sorted(filas, key=puntaje, reverse=True)[:limite]]
+
+
+def buscar(conn, nombre, texto, limite=20, filtro=None, parametros=()):
+    """Ids de `nombre` ('clientes' o 'analistas') ordenados por relevancia.
+
+    `filtro` es una condición SQL adicional sobre la tabla de contenido (alias
+    t), p. ej. 't.analista_id = ?'. Regresa (ids, corregida): corregida indica
+    que se agregaron resultados con términos corregidos.
+    """
+    limite = max(1, min(limite, MAX_RESULTADOS))
+    lista = terminos(texto)
+    if not lista:
+        return [], False
+    grupos = [(t, _expansiones(conn, nombre, t), ()) for t in lista]
+    ids = _ordenar(nombre, _consultar(conn, nombre, _expresion(grupos), filtro, parametros), lista, limite)
+    if len(ids) >= limite:
+        return ids, False
+
+    grupos = [(t, expansiones, _corregir(conn, nombre, t) if len(t) >= MIN_LARGO_CORRECCION else ())
+              for t, expansiones, _ in grupos]
+    if not any(correcciones for _, _, correcciones in grupos):
+        return ids, False
+    extra = _consultar(conn, nombre, _expresion(grupos), filtro, parametros, ids)
+    return ids + _ordenar(nombre, extra, lista, limite - len(ids)), bool(extra)
@@ -0,0 +1,136 @@
+"""Caché de lectura de solicitudes (con su cliente y su analista) y de analistas.
+
+Cada proceso guarda en un LRU acotado, con expiración, los objetos que las
+rutas leen una y otra vez: la solicitud con el perfil del cliente en cada
+vista de evaluación o resultado y en los trabajos derivados de la decisión,
+y el analista por código en el login y en el filtro ?analista= de los listados.
+La vigencia entre workers la da la BD: `cache_versiones` tiene un contador
+por tabla y partición (id % PARTICIONES), y los triggers sobre analistas,
+clientes y creditos lo incrementan en la misma transacción que cambia o
+borra la fila (tabla, filas y triggers: migración 6 de migraciones.py).
+Cualquier escritura (rutas, importaciones, la cola de trabajos, otro worker)
+invalida así las entradas que dependían de esa partición, y solo esas.
+
+Cada entrada guarda la suma de los contadores de las particiones de las
+filas de las que salió (a lo más tres). Los contadores solo crecen, así que
+la suma cambia si cambia cualquiera de ellos: validar una entrada es una
+consulta por llave primaria. En un fallo, la carga y la lectura de la suma
+se hacen en una misma transacción de lectura, de modo que una escritura que
+llegue en medio no puede dejar datos viejos con la versión nueva. Las
+escrituras del propio proceso además llaman a invalidar() para sacar de
+inmediato la entrada afectada.
+
+Las inserciones no cambian los contadores: no se guardan ausencias, así que
+una fila nueva no puede tener una entrada vieja.
+
+Los clientes no tienen entrada propia: se leen dentro de la solicitud (que
+ya depende de su partición) o en los resultados de búsqueda, cuyo enlace al
+último crédito cambia con un INSERT, que no mueve los contadores.
+"""
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_MAX = int(os.environ.get('CACHE_LECTURA_MAX', 10_000))
+CACHE_TTL = float(os.environ.get('CACHE_LECTURA_TTL_S', 300))
+CACHE_ACTIVA = os.environ.get('CACHE_LECTURA', '1') != '0'
+
+# Fijo: los triggers de la migración 6 lo llevan escrito; cambiarlo requiere una migración nueva
+PARTICIONES = 64
+
+
+def _version(conn, particiones):
+    """Suma de los contadores de las particiones (tabla, partición)"""
+    if not particiones:
+        return 0
+    condicion = ' OR '.join(['(entidad = ? AND particion = ?)'] * len(particiones))
+    return conn.execute(f'SELECT total(version) FROM cache_versiones WHERE {condicion}',
+                        [valor for particion in particiones for valor in particion]).fetchone()[0]
+
+
+class CacheLectura:
+    """LRU con TTL de objetos leídos de la BD, validados contra cache_versiones"""
+
+    def __init__(self, max_entradas=CACHE_MAX, ttl=CACHE_TTL, activa=CACHE_ACTIVA):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.activa = activa
+        # (tipo, clave) -> (expira, particiones, version, valor)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, conn, tipo, clave, cargar, dependencias):
+        """Valor de cargar(conn) para (tipo, clave), de la caché si sigue vigente.
+
+        `dependencias(valor)` da los pares (tabla, id) de las filas de las que
+        salió el valor. Se regresa una copia superficial: quien la modifique
+        (p. ej. calificar_si_falta) no altera la entrada guardada.
+        """
+        # Con escrituras sin confirmar en la conexión, lo leído podría no
+        # llegar a existir si la transacción se revierte
+        if not self.activa or conn.in_transaction:
+            return cargar(conn)
+        llave = (tipo, clave)
+        with self._lock:
+            entrada = self._entradas.get(llave)
+        if entrada is not None:
+            expira, particiones, version, valor = entrada
+            if expira > time.monotonic() and _version(conn, particiones) == version:
+                with self._lock:
+                    if llave in self._entradas:
+                        self._entradas.move_to_end(llave)
+                    self.aciertos += 1
+                return copy.copy(valor)
+        with self._lock:
+            self.fallos += 1
+        conn.execute('BEGIN')
+        try:
+            valor = cargar(conn)
+            if valor is not None:
+                particiones = tuple((tabla, id_ % PARTICIONES) for tabla, id_ in dependencias(valor)
+                                    if id_ is not None)
+                version = _version(conn, particiones)
+        finally:
+            conn.commit()
+        if valor is None:
+            return None
+        with self._lock:
+            self._entradas[llave] = (time.monotonic() + self.ttl, particiones, version, valor)
+            self._entradas.move_to_end(llave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return copy.copy(valor)
+
+    def invalidar(self, tipo, clave=None):
+        """Sacar (tipo, clave), o todas las entradas del tipo si no hay clave"""
+        with self._lock:
+            if clave is not None:
+                llaves = [(tipo, clave)] if (tipo, clave) in self._entradas else []
+            else:
+                llaves = [llave for llave in self._entradas if llave[0] == tipo]
+            for llave in llaves:
+                del self._entradas[llave]
+            self.invalidaciones += len(llaves)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._entradas),
+            'max_entradas': self.max_entradas,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'invalidaciones': self.invalidaciones,
+            'proporcion_aciertos': round(self.aciertos / consultas, 4) if consultas else None,
+        }
+
+    def __len__(self):
+        return len(self._entradas)
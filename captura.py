@@ -0,0 +1,188 @@
+"""Alta idempotente de solicitudes desde el formulario de nueva_solicitud.
+
+Al abrir el formulario se le asigna un número de solicitud (secuencia
+`solicitudes`, repartida por bloques como los códigos de analista) que viaja
+oculto en el POST y sirve de llave de idempotencia: creditos.numero_solicitud
+tiene un índice UNIQUE. Un reenvío del mismo formulario (doble clic, reintento
+en una conexión lenta, Atrás y Enviar) encuentra el crédito ya creado y
+regresa ese id sin escribir nada ni encolar otra vez la calificación.
+
+Todo el alta va en una transacción BEGIN IMMEDIATE: buscar el número,
+insertar o actualizar el cliente por RFC (INSERT ... ON CONFLICT (rfc) DO
+UPDATE) e insertar el crédito. SQLite serializa las transacciones de
+escritura, así que de dos envíos simultáneos el segundo espera y ve el
+crédito del primero; el índice UNIQUE es la red de seguridad.
+
+El perfil de un cliente solo lo actualiza el analista al que pertenece: si
+el RFC ya es cliente de otro analista el alta se rechaza
+(ClienteDeOtroAnalistaError) sin tocar nada.
+
+La huella (sha256 de los datos normalizados) distingue un reenvío del mismo
+formulario de un número reutilizado con otros datos o por otro analista.
+"""
+import hashlib
+import json
+
+import modelos
+import rfcs
+
+SECUENCIA = 'solicitudes'
+PREFIJO = 'SOL-'
+PLAZO_POR_DEFECTO = 12
+
+# campo del formulario -> (tipo, obligatorio, mínimo, máximo)
+CAMPOS_CLIENTE = {
+    'nombre': (str, True, None, None),
+    'apellido_paterno': (str, True, None, None),
+    'apellido_materno': (str, False, None, None),
+    'estado_civil': (str, True, None, None),
+    'dependientes': (int, False, 0, 20),
+    'nivel_estudios': (str, True, None, None),
+    'zona': (str, True, None, None),
+    'antiguedad_domicilio': (float, False, 0, 100),
+    'ocupacion': (str, True, None, None),
+    'antiguedad_empleo': (float, False, 0, 70),
+    'ingreso_mensual': (float, True, 1, None),
+    'pagos_minimos': (float, False, 0, None),
+    'fico_score': (int, True, 300, 850),
+    'ultima_calificacion': (str, True, None, None),
+    'mop_6': (str, False, None, None),
+    'mop_12': (str, False, None, None),
+    'num_consultas': (int, False, 0, 50),
+}
+
+# Columnas de clientes que una nueva solicitud del mismo analista con el mismo RFC actualiza
+_ACTUALIZABLES = (*CAMPOS_CLIENTE, 'fecha_nacimiento', 'tdsr', 'direccion')
+
+
+class NumeroSolicitudEnUsoError(ValueError):
+    """El número de solicitud ya se usó con otros datos o por otro analista"""
+
+    def __init__(self, numero, credito_id):
+        super().__init__(f'El número de solicitud {numero} ya se usó con otros datos')
+        self.numero = numero
+        self.credito_id = credito_id
+
+
+class ClienteDeOtroAnalistaError(ValueError):
+    """El RFC ya es cliente de otro analista; su perfil no se sobrescribe"""
+
+    def __init__(self, rfc):
+        super().__init__(f'El RFC {rfc} ya está registrado como cliente de otro analista')
+        self.rfc = rfc
+
+
+def _valor(formulario, campo, tipo, obligatorio, minimo, maximo, errores):
+    crudo = str(formulario.get(campo) or '').strip()
+    if not crudo:
+        if obligatorio:
+            errores.append(f'{campo}: obligatorio')
+        return None
+    if tipo is str:
+        return crudo
+    try:
+        valor = tipo(float(crudo))
+    except ValueError:
+        errores.append(f'{campo}: valor no numérico')
+        return None
+    if (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo):
+        errores.append(f'{campo}: fuera de rango')
+        return None
+    return valor
+
+
+def validar(formulario, tasa_por_defecto):
+    """Convertir y validar el formulario; regresa (datos, errores)"""
+    errores = []
+    cliente = {campo: _valor(formulario, campo, *reglas, errores)
+               for campo, reglas in CAMPOS_CLIENTE.items()}
+
+    # El RFC lo llena el JS del formulario: se valida aquí de todos modos
+    cliente['rfc'] = str(formulario.get('rfc') or '').strip().upper()
+    errores.extend(f'rfc: {e}' for e in rfcs.validar_rfc(cliente['rfc']))
+    nacimiento = rfcs.parsear_fecha(formulario.get('fecha_nacimiento'))
+    if nacimiento is None:
+        errores.append('fecha_nacimiento: obligatoria')
+    cliente['fecha_nacimiento'] = nacimiento.isoformat() if nacimiento else None
+    # TDSR (%) del lado del servidor: el campo del formulario es de solo lectura
+    if cliente['ingreso_mensual']:
+        cliente['tdsr'] = round(100 * (cliente['pagos_minimos'] or 0) / cliente['ingreso_mensual'], 2)
+    else:
+        cliente['tdsr'] = None
+    domicilio = [str(formulario.get(campo) or '').strip()
+                 for campo in ('colonia', 'municipio', 'estado', 'codigo_postal')]
+    cliente['direccion'] = ', '.join(parte for parte in domicilio if parte)
+
+    credito = {
+        'monto': _valor(formulario, 'monto_solicitado', float, True, 1, None, errores),
+        'plazo': _valor(formulario, 'plazo', int, False, 1, None, errores) or PLAZO_POR_DEFECTO,
+        'tasa_interes': _valor(formulario, 'tasa_interes', float, False, 0, 100, errores)
+                        or tasa_por_defecto,
+        **{validacion: int(bool(formulario.get(validacion))) for validacion in modelos.VALIDACIONES},
+    }
+    return {'cliente': cliente, 'credito': credito}, errores
+
+
+def huella(datos):
+    """sha256 de los datos normalizados de un envío"""
+    return hashlib.sha256(json.dumps(datos, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _existente(conn, numero, analista_id, firma):
+    row = conn.execute('SELECT id, analista_id, huella_envio FROM creditos WHERE numero_solicitud = ?',
+                       (numero,)).fetchone()
+    if row is None:
+        return None
+    if row[1] != analista_id or row[2] != firma:
+        raise NumeroSolicitudEnUsoError(numero, row[0])
+    return row[0]
+
+
+def registrar(conn, numero, analista_id, datos, al_crear=None):
+    """Dar de alta la solicitud `numero` una sola vez; regresa (credito_id, creada).
+
+    Si el número ya está registrado con la misma huella y analista regresa
+    ese crédito con creada=False. `al_crear(conn, credito_id)` corre dentro
+    de la transacción solo cuando el crédito es nuevo (p. ej. para encolar
+    trabajos). Lanza NumeroSolicitudEnUsoError si el número se usó con otros datos
+    y ClienteDeOtroAnalistaError si el RFC es cliente de otro analista.
+    """
+    firma = huella(datos)
+    # Camino rápido del reenvío: una lectura por índice, sin tomar el candado
+    credito_id = _existente(conn, numero, analista_id, firma)
+    if credito_id is not None:
+        return credito_id, False
+
+    cliente, credito = datos['cliente'], datos['credito']
+    columnas = ('rfc', 'analista_id', *_ACTUALIZABLES)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        credito_id = _existente(conn, numero, analista_id, firma)
+        if credito_id is not None:
+            conn.commit()
+            return credito_id, False
+        # Con el RFC de otro analista el WHERE del UPDATE no se cumple y
+        # RETURNING no regresa fila; un cliente heredado sin analista se asigna
+        fila = conn.execute(f'''
+            INSERT INTO clientes ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})
+            ON CONFLICT (rfc) DO UPDATE SET
+                analista_id = excluded.analista_id,
+                {', '.join(f'{c} = excluded.{c}' for c in _ACTUALIZABLES)}
+            WHERE clientes.analista_id IS NULL OR clientes.analista_id = excluded.analista_id
+            RETURNING id
+        ''', (cliente['rfc'], analista_id, *(cliente[c] for c in _ACTUALIZABLES))).fetchone()
+        if fila is None:
+            raise ClienteDeOtroAnalistaError(cliente['rfc'])
+        cliente_id = fila[0]
+        columnas_credito = ('cliente_id', 'analista_id', 'numero_solicitud', 'huella_envio', *credito)
+        credito_id = conn.execute(f'''
+            INSERT INTO creditos ({', '.join(columnas_credito)})
+            VALUES ({', '.join('?' * len(columnas_credito))})
+        ''', (cliente_id, analista_id, numero, firma, *credito.values())).lastrowid
+        if al_crear is not None:
+            al_crear(conn, credito_id)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return credito_id, True
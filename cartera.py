@@ -0,0 +1,283 @@
+"""Instantáneas de la cartera para los tableros de riesgo.
+
+Un trabajo de la cola (app.instantanea_cartera, cada CARTERA_INTERVALO_S)
+copia creditos + clientes en una sola transacción de lectura y escribe una
+instantánea por columnas: un archivo .npy por columna con el tipo más chico
+que alcanza (estado en uint8, scores y FICO en float32 con NaN para nulos),
+más meta.json. Se escribe en un directorio temporal y se publica con un
+rename, así que un lector nunca ve una instantánea a medias.
+
+Los tableros (panel_admin, todas_solicitudes, /api/cartera) no consultan la
+tabla viva: abren la instantánea más reciente con np.load(mmap_mode='r'),
+de modo que los workers comparten las páginas del caché del sistema
+operativo, y calculan los agregados con numpy (bincount, histogram) una vez
+por instantánea y proceso.
+
+Sin compresión a propósito: un .npz comprimido no se puede mapear en
+memoria y habría que descomprimirlo completo en cada worker.
+
+Uso fuera de la aplicación: `python cartera.py [db] [directorio]`.
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO = os.environ.get('CARTERA_DIR', '')
+INTERVALO = float(os.environ.get('CARTERA_INTERVALO_S', 300))
+CONSERVAR = int(os.environ.get('CARTERA_CONSERVAR', 2))
+TAMANO_LOTE = 50_000
+PREFIJO = 'instantanea-'
+# Veces que el lector vuelve a listar si la más reciente desaparece al abrirla
+INTENTOS_APERTURA = 3
+
+# Código de cada estado en la columna `estado`; cualquier otro es "pendiente"
+ESTADOS = ('pendiente', 'aprobado', 'rechazado', 'zona_gris')
+# Banda de score total que se revisa como zona gris
+ZONA_GRIS = (200, 300)
+LIMITES_FICO = np.arange(300, 851, 50)
+LIMITES_TDSR = np.array([0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, np.inf])
+
+# columna -> (expresión SQL, dtype); los nulos quedan como NaN o -1
+COLUMNAS = {
+    'id': ('cr.id', np.int64),
+    'analista_id': ('COALESCE(cr.analista_id, -1)', np.int32),
+    'estado': ("CASE cr.estado WHEN 'aprobado' THEN 1 WHEN 'rechazado' THEN 2 "
+               "WHEN 'zona_gris' THEN 3 ELSE 0 END", np.uint8),
+    'monto': ('cr.monto', np.float64),
+    'monto_aprobado': ('cr.monto_aprobado', np.float64),
+    'plazo': ('cr.plazo', np.float32),
+    'tasa_interes': ('cr.tasa_interes', np.float32),
+    'score_total': ('cr.score_total', np.float32),
+    'fico_score': ('c.fico_score', np.float32),
+    'tdsr': ('c.tdsr', np.float32),
+}
+
+
+def directorio(database):
+    """Directorio de las instantáneas: CARTERA_DIR o uno junto a la BD"""
+    return DIRECTORIO or f'{database}-cartera'
+
+
+def generar(conn, destino):
+    """Escribir una instantánea nueva en `destino`; regresa su meta.json como dict"""
+    inicio = time.perf_counter()
+    os.makedirs(destino, exist_ok=True)
+    expresiones = ', '.join(expresion for expresion, _ in COLUMNAS.values())
+    bloques = {nombre: [] for nombre in COLUMNAS}
+    # Una transacción de lectura: todas las columnas ven el mismo estado de la BD
+    propia = not conn.in_transaction
+    if propia:
+        conn.execute('BEGIN')
+    try:
+        cursor = conn.execute(f'''
+            SELECT {expresiones} FROM creditos cr LEFT JOIN clientes c ON c.id = cr.cliente_id
+            ORDER BY cr.id
+        ''')
+        while True:
+            filas = cursor.fetchmany(TAMANO_LOTE)
+            if not filas:
+                break
+            # None -> NaN al convertir a float64; cada lote pasa enseguida a su tipo
+            lote = np.array(filas, dtype=np.float64)
+            for i, (nombre, (_, dtype)) in enumerate(COLUMNAS.items()):
+                bloques[nombre].append(lote[:, i].astype(dtype))
+        analistas = conn.execute('SELECT id, codigo, estado FROM analistas').fetchall()
+    finally:
+        if propia:
+            conn.commit()
+    columnas = {nombre: np.concatenate(partes) if partes else np.empty(0, dtype)
+                for (nombre, partes), (_, dtype) in zip(bloques.items(), COLUMNAS.values())}
+
+    temporal = tempfile.mkdtemp(prefix='.tmp-', dir=destino)
+    try:
+        for nombre, valores in columnas.items():
+            np.save(os.path.join(temporal, f'{nombre}.npy'), valores)
+        meta = {
+            'generada': time.time(),
+            'filas': len(columnas['id']),
+            'columnas': list(COLUMNAS),
+            'analistas': {str(id_): codigo for id_, codigo, _ in analistas},
+            'analistas_activos': sum(1 for *_, estado in analistas if estado == 'aprobado'),
+            'duracion_s': round(time.perf_counter() - inicio, 3),
+        }
+        with open(os.path.join(temporal, 'meta.json'), 'w', encoding='utf-8') as archivo:
+            json.dump(meta, archivo)
+        nombre = f'{PREFIJO}{time.time_ns():020d}'
+        os.rename(temporal, os.path.join(destino, nombre))
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+    _purgar(destino)
+    logger.info('Instantánea de cartera generada', extra={
+        'instantanea': nombre, 'filas': meta['filas'], 'duracion_s': meta['duracion_s']})
+    return meta
+
+
+def _instantaneas(destino):
+    try:
+        return sorted(n for n in os.listdir(destino) if n.startswith(PREFIJO))
+    except FileNotFoundError:
+        return []
+
+
+def _publicadas(destino):
+    # Sin meta.json no es una instantánea publicada por generar() (p. ej. una
+    # copia a medias hecha a mano): se ignora en lugar de fallar al abrirla
+    return [n for n in _instantaneas(destino) if os.path.exists(os.path.join(destino, n, 'meta.json'))]
+
+
+def _purgar(destino):
+    # Un lector que tenga abiertas las anteriores conserva sus mmap: en
+    # POSIX el archivo borrado sigue existiendo mientras esté mapeado
+    for nombre in _instantaneas(destino)[:-CONSERVAR]:
+        shutil.rmtree(os.path.join(destino, nombre), ignore_errors=True)
+
+
+class Instantanea:
+    """Columnas de una instantánea, mapeadas en memoria de solo lectura"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.nombre = os.path.basename(ruta)
+        with open(os.path.join(ruta, 'meta.json'), encoding='utf-8') as archivo:
+            self.meta = json.load(archivo)
+        self.columnas = {nombre: np.load(os.path.join(ruta, f'{nombre}.npy'), mmap_mode='r')
+                         for nombre in self.meta['columnas']}
+
+    def __getitem__(self, columna):
+        return self.columnas[columna]
+
+    def __len__(self):
+        return self.meta['filas']
+
+
+def _histograma(valores, limites):
+    presentes = valores[~np.isnan(valores)]
+    conteos, _ = np.histogram(presentes, bins=limites)
+    return {
+        'limites': [float(x) if np.isfinite(x) else None for x in limites],
+        'conteos': conteos.tolist(),
+        'sin_dato': int(len(valores) - len(presentes)),
+    }
+
+
+def agregados(instantanea):
+    """Métricas de riesgo de la cartera, vectorizadas sobre las columnas"""
+    estado = np.asarray(instantanea['estado'])
+    monto = np.nan_to_num(instantanea['monto'])
+    monto_aprobado = np.asarray(instantanea['monto_aprobado'])
+    n = len(ESTADOS)
+    # Solo lo aprobado es exposición: por el monto aprobado, o el solicitado si falta
+    exposicion = np.where(estado == ESTADOS.index('aprobado'),
+                          np.where(np.isnan(monto_aprobado), monto, monto_aprobado), 0)
+
+    conteos = np.bincount(estado, minlength=n)
+    solicitado = np.bincount(estado, weights=monto, minlength=n)
+    expuesto = np.bincount(estado, weights=exposicion, minlength=n)
+    por_estado = {
+        nombre: {'solicitudes': int(conteos[i]), 'monto_solicitado': round(float(solicitado[i]), 2),
+                 'exposicion': round(float(expuesto[i]), 2)}
+        for i, nombre in enumerate(ESTADOS)
+    }
+
+    # Una fila por analista: ids densos (AUTOINCREMENT), así que bincount
+    # sobre id * n + estado arma la matriz analista x estado en una pasada
+    analista = np.asarray(instantanea['analista_id']).astype(np.int64)
+    validos = analista >= 0
+    matriz = np.bincount(analista[validos] * n + estado[validos],
+                         minlength=(int(analista.max(initial=0)) + 1) * n).reshape(-1, n)
+    ids = np.flatnonzero(matriz.sum(axis=1))
+    codigos = instantanea.meta['analistas']
+    por_analista = []
+    for id_, fila in zip(ids.tolist(), matriz[ids].tolist()):
+        decididas = fila[1] + fila[2] + fila[3]
+        por_analista.append({
+            'analista_id': id_, 'codigo': codigos.get(str(id_), ''),
+            'total': sum(fila), **dict(zip(ESTADOS, fila)),
+            'tasa_aprobacion': round(100 * fila[1] / decididas, 1) if decididas else None,
+        })
+    por_analista.sort(key=lambda a: a['total'], reverse=True)
+
+    score = np.asarray(instantanea['score_total'])
+    en_banda = (score >= ZONA_GRIS[0]) & (score <= ZONA_GRIS[1])
+    banda = np.bincount(estado[en_banda], minlength=n)
+
+    decididas = int(conteos[1:].sum())
+    return {
+        'instantanea': instantanea.nombre,
+        'generada': instantanea.meta['generada'],
+        'generada_texto': time.strftime('%d/%m/%Y %H:%M', time.localtime(instantanea.meta['generada'])),
+        'total_solicitudes': len(instantanea),
+        'aprobadas': int(conteos[1]),
+        'rechazadas': int(conteos[2]),
+        'tasa_aprobacion': round(100 * int(conteos[1]) / decididas, 1) if decididas else None,
+        'analistas_activos': instantanea.meta['analistas_activos'],
+        'por_estado': por_estado,
+        'por_analista': por_analista,
+        'fico': _histograma(np.asarray(instantanea['fico_score']), LIMITES_FICO),
+        'tdsr': _histograma(np.asarray(instantanea['tdsr']), LIMITES_TDSR),
+        'zona_gris': {'score_min': ZONA_GRIS[0], 'score_max': ZONA_GRIS[1],
+                      'total': int(en_banda.sum()), **dict(zip(ESTADOS, banda.tolist()))},
+    }
+
+
+class LectorCartera:
+    """Instantánea más reciente y sus agregados, calculados una vez por instantánea.
+
+    `obtener_directorio` es un callable (la BD puede cambiar en pruebas).
+    """
+
+    def __init__(self, obtener_directorio):
+        self._obtener_directorio = obtener_directorio
+        self._lock = threading.Lock()
+        self._actual = (None, None)
+
+    def agregados(self):
+        """Agregados de la instantánea más reciente; None si aún no hay ninguna.
+
+        Si la más reciente desaparece entre listar y abrir (la purgó otro
+        proceso) se vuelve a listar, hasta INTENTOS_APERTURA veces; después se
+        regresan los agregados que ya se tenían.
+        """
+        destino = self._obtener_directorio()
+        for _ in range(INTENTOS_APERTURA):
+            nombres = _publicadas(destino)
+            if not nombres:
+                return None
+            ruta = os.path.join(destino, nombres[-1])
+            instantanea, datos = self._actual
+            if instantanea is not None and instantanea.ruta == ruta:
+                return datos
+            with self._lock:
+                instantanea, datos = self._actual
+                if instantanea is not None and instantanea.ruta == ruta:
+                    return datos
+                try:
+                    instantanea = Instantanea(ruta)
+                except FileNotFoundError:
+                    continue
+                datos = agregados(instantanea)
+                self._actual = (instantanea, datos)
+                return datos
+        logger.warning('No se pudo abrir la instantánea de cartera más reciente', extra={'destino': destino})
+        return self._actual[1]
+
+
+if __name__ == '__main__':
+    import sqlite3
+
+    database = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('DATABASE', 'creditos.db')
+    destino = sys.argv[2] if len(sys.argv) > 2 else directorio(database)
+    conexion = sqlite3.connect(database)
+    resultado = generar(conexion, destino)
+    conexion.close()
+    print(f"{resultado['filas']:,} créditos en {destino} ({resultado['duracion_s']} s)")
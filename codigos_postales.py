@@ -0,0 +1,268 @@
+"""Índice de códigos postales para /api/validar_cp.
+
+El catálogo de SEPOMEX (CPdescarga.txt: texto separado por '|', latin-1, una
+fila por asentamiento) se compila una vez a un archivo binario compacto. Ese
+archivo se abre con mmap de solo lectura, de modo que todos los workers
+comparten las mismas páginas del caché del sistema operativo y arrancar solo
+cuesta abrir el archivo.
+
+Formato del índice (little-endian, cada arreglo alineado a 8 bytes):
+    encabezado  '<4sIIII'  magia, versión, n_cp, n_colonias, n_cadenas
+    cps         uint32[n_cp]        códigos postales ordenados
+    estado      uint32[n_cp]        id de cadena
+    municipio   uint32[n_cp]        id de cadena
+    zona        uint8[n_cp]         índice en ZONAS
+    col_inicio  uint32[n_cp + 1]    rango de cada CP dentro de `colonias`
+    colonias    uint32[n_colonias]  id de cadena
+    desplaz     uint32[n_cadenas + 1]
+    cadenas     bytes UTF-8 concatenados
+
+Los arreglos se leen como memoryview sobre el mmap, sin copiarlos; la
+búsqueda exacta y por prefijo es bisect (en C) sobre `cps`.
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+CATALOGO = os.environ.get('CATALOGO_CP', '')
+INDICE = os.environ.get('CATALOGO_CP_INDICE', '')
+
+MAGIA = b'CPIX'
+VERSION = 1
+_ENCABEZADO = struct.Struct('<4sIIII')
+# Los arreglos se guardan little-endian y se leen con el orden nativo
+_U32 = 'I'
+
+# Valores del select "zona" de nueva_solicitud.html
+ZONAS = ('', 'Urbana', 'Semiurbana', 'Rural')
+_ZONA_SEPOMEX = {'urbano': 1, 'urbana': 1, 'semiurbano': 2, 'semiurbana': 2, 'rural': 3}
+
+# Columnas del catálogo que se usan
+_COLUMNAS = ('d_codigo', 'd_asenta', 'D_mnpio', 'd_estado', 'd_zona')
+
+
+class CatalogoInvalidoError(ValueError):
+    pass
+
+
+def leer_catalogo(ruta):
+    """Filas (cp, colonia, municipio, estado, zona) del archivo de SEPOMEX"""
+    with open(ruta, encoding='latin-1', newline='') as archivo:
+        encabezado = None
+        for linea in archivo:
+            campos = linea.rstrip('\r\n').split('|')
+            if encabezado is None:
+                # La primera línea del archivo oficial es un aviso, no el encabezado
+                if 'd_codigo' in campos:
+                    encabezado = {nombre: i for i, nombre in enumerate(campos)}
+                    faltantes = [c for c in _COLUMNAS if c not in encabezado]
+                    if faltantes:
+                        raise CatalogoInvalidoError(f'Faltan columnas: {", ".join(faltantes)}')
+                    indices = [encabezado[c] for c in _COLUMNAS]
+                continue
+            if len(campos) <= max(indices):
+                continue
+            cp, colonia, municipio, estado, zona = (campos[i].strip() for i in indices)
+            if len(cp) == 5 and cp.isdigit():
+                yield int(cp), colonia, municipio, estado, zona
+    if encabezado is None:
+        raise CatalogoInvalidoError('No se encontró el encabezado d_codigo|d_asenta|...')
+
+
+def _alinear(bloques, tamano):
+    relleno = -tamano % 8
+    if relleno:
+        bloques.append(b'\0' * relleno)
+    return tamano + relleno
+
+
+def compilar(catalogo, destino):
+    """Compilar el catálogo de texto al índice binario (escritura atómica)"""
+    cadenas, ids = [], {}
+
+    def id_cadena(texto):
+        indice = ids.get(texto)
+        if indice is None:
+            indice = ids[texto] = len(cadenas)
+            cadenas.append(texto)
+        return indice
+
+    por_cp = {}
+    for cp, colonia, municipio, estado, zona in leer_catalogo(catalogo):
+        datos = por_cp.get(cp)
+        if datos is None:
+            datos = por_cp[cp] = (id_cadena(estado), id_cadena(municipio), Counter(), [])
+        datos[2][_ZONA_SEPOMEX.get(zona.lower(), 0)] += 1
+        datos[3].append(id_cadena(colonia))
+
+    cps = array(_U32, sorted(por_cp))
+    estado, municipio, zona = array(_U32), array(_U32), array('B')
+    col_inicio, colonias = array(_U32, [0]), array(_U32)
+    for cp in cps:
+        id_estado, id_municipio, zonas, ids_colonias = por_cp[cp]
+        estado.append(id_estado)
+        municipio.append(id_municipio)
+        # Un CP puede abarcar asentamientos de distinta zona: se toma la mayoritaria
+        zona.append(zonas.most_common(1)[0][0])
+        colonias.extend(ids_colonias)
+        col_inicio.append(len(colonias))
+
+    codificadas = [c.encode('utf-8') for c in cadenas]
+    desplaz = array(_U32, [0])
+    for cadena in codificadas:
+        desplaz.append(desplaz[-1] + len(cadena))
+
+    bloques = [_ENCABEZADO.pack(MAGIA, VERSION, len(cps), len(colonias), len(cadenas))]
+    tamano = _alinear(bloques, _ENCABEZADO.size)
+    for arreglo in (cps, estado, municipio, zona, col_inicio, colonias, desplaz):
+        datos = arreglo.tobytes()
+        bloques.append(datos)
+        tamano = _alinear(bloques, tamano + len(datos))
+    bloques.append(b''.join(codificadas))
+
+    directorio = os.path.dirname(os.path.abspath(destino))
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as salida:
+            for bloque in bloques:
+                salida.write(bloque)
+        os.replace(temporal, destino)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+    return len(cps)
+
+
+class IndiceCP:
+    """Índice de solo lectura sobre el archivo compilado (mmap)"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, 'rb') as archivo:
+            self._mmap = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, version, n_cp, n_col, n_str = _ENCABEZADO.unpack_from(self._mmap, 0)
+        if magia != MAGIA or version != VERSION:
+            self._mmap.close()
+            raise CatalogoInvalidoError(f'{ruta} no es un índice de códigos postales v{VERSION}')
+        if sys.byteorder != 'little' or struct.calcsize(_U32) != 4:
+            self._mmap.close()
+            raise CatalogoInvalidoError('El índice requiere una plataforma little-endian')
+
+        self._vista = memoryview(self._mmap)
+        posicion = _ENCABEZADO.size + (-_ENCABEZADO.size % 8)
+
+        def arreglo(formato, cuenta):
+            nonlocal posicion
+            tamano = cuenta * struct.calcsize(formato)
+            vista = self._vista[posicion:posicion + tamano].cast(formato)
+            posicion += tamano + (-tamano % 8)
+            return vista
+
+        self.cps = arreglo(_U32, n_cp)
+        self._estado = arreglo(_U32, n_cp)
+        self._municipio = arreglo(_U32, n_cp)
+        self._zona = arreglo('B', n_cp)
+        self._col_inicio = arreglo(_U32, n_cp + 1)
+        self._colonias = arreglo(_U32, n_col)
+        self._desplaz = arreglo(_U32, n_str + 1)
+        self._cadenas = self._vista[posicion:]
+
+    def __len__(self):
+        return len(self.cps)
+
+    def _cadena(self, indice):
+        inicio, fin = self._desplaz[indice], self._desplaz[indice + 1]
+        return str(self._cadenas[inicio:fin], 'utf-8')
+
+    def _posicion(self, codigo_postal):
+        try:
+            cp = int(codigo_postal)
+        except (TypeError, ValueError):
+            return None
+        i = bisect_left(self.cps, cp)
+        if i < len(self.cps) and self.cps[i] == cp:
+            return i
+        return None
+
+    def _registro(self, i, con_colonias=True):
+        registro = {
+            'codigo_postal': f'{self.cps[i]:05d}',
+            'estado': self._cadena(self._estado[i]),
+            'municipio': self._cadena(self._municipio[i]),
+            'zona': ZONAS[self._zona[i]],
+        }
+        if con_colonias:
+            inicio, fin = self._col_inicio[i], self._col_inicio[i + 1]
+            registro['colonias'] = [self._cadena(c) for c in self._colonias[inicio:fin].tolist()]
+        return registro
+
+    def buscar(self, codigo_postal):
+        """Datos de un código postal de 5 dígitos, o None"""
+        if not (isinstance(codigo_postal, str) and len(codigo_postal) == 5 and codigo_postal.isdigit()):
+            return None
+        i = self._posicion(codigo_postal)
+        return self._registro(i) if i is not None else None
+
+    def por_prefijo(self, prefijo, limite=20):
+        """Códigos postales que empiezan con `prefijo` (1 a 5 dígitos), en orden"""
+        if not (prefijo and len(prefijo) <= 5 and prefijo.isdigit()):
+            return []
+        escala = 10 ** (5 - len(prefijo))
+        inicio = bisect_left(self.cps, int(prefijo) * escala)
+        fin = bisect_left(self.cps, (int(prefijo) + 1) * escala)
+        return [self._registro(i, con_colonias=False) for i in range(inicio, min(fin, inicio + limite))]
+
+    def cerrar(self):
+        # Las vistas deben soltarse antes de cerrar el mmap
+        for vista in (self.cps, self._estado, self._municipio, self._zona, self._col_inicio,
+                      self._colonias, self._desplaz, self._cadenas, self._vista):
+            vista.release()
+        self._mmap.close()
+
+
+def ruta_indice(catalogo, indice=None):
+    return indice or os.path.splitext(catalogo)[0] + '.cpidx'
+
+
+def cargar(catalogo=None, indice=None):
+    """Abrir el índice, compilándolo si falta o si el catálogo es más reciente.
+
+    Regresa None si no hay catálogo configurado ni índice compilado.
+    """
+    catalogo = catalogo if catalogo is not None else CATALOGO
+    indice = indice or INDICE
+    if not catalogo and not indice:
+        return None
+    destino = ruta_indice(catalogo, indice)
+    if catalogo and os.path.exists(catalogo):
+        if not os.path.exists(destino) or os.path.getmtime(destino) < os.path.getmtime(catalogo):
+            compilar(catalogo, destino)
+    if not os.path.exists(destino):
+        return None
+    return IndiceCP(destino)
+
+
+_indice = None
+_indice_cargado = False
+_lock = threading.Lock()
+
+
+def obtener_indice():
+    """Índice del proceso; se abre la primera vez que se usa.
+
+    servidor.py lo abre antes de crear los workers para que lo hereden ya
+    mapeado en memoria.
+    """
+    global _indice, _indice_cargado
+    if not _indice_cargado:
+        with _lock:
+            if not _indice_cargado:
+                _indice = cargar()
+                _indice_cargado = True
+    return _indice
@@ -0,0 +1,194 @@
+"""Pool de conexiones SQLite por proceso.
+
+Cada hilo reutiliza la misma conexión mientras la tenga tomada (las llamadas
+anidadas a get_db() comparten conexión en lugar de abrir otra), y al terminar
+el bloque `with` más externo la transacción se confirma y la conexión regresa
+al pool en vez de quedar abierta.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# PRAGMAs que se aplican a cada conexión al abrirla. WAL permite que los
+# lectores no se bloqueen mientras hay un escritor activo.
+PRAGMAS_POR_DEFECTO = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))),
+    ('cache_size', int(os.environ.get('DB_CACHE_SIZE', -16000))),    # negativo = KiB
+    ('mmap_size', int(os.environ.get('DB_MMAP_SIZE', 128 * 1024 * 1024))),
+)
+
+
+class PoolAgotadoError(sqlite3.OperationalError):
+    """No se liberó ninguna conexión dentro del tiempo de espera"""
+
+
+class PoolConexiones:
+    """Pool acotado de conexiones SQLite con reutilización por hilo.
+
+    `factory` es la clase de conexión que se pasa a sqlite3.connect (p. ej.
+    metricas.ConexionMedida).
+    """
+
+    def __init__(self, database, max_conexiones=8, timeout=30.0, pragmas=PRAGMAS_POR_DEFECTO,
+                 factory=sqlite3.Connection):
+        self.database = database
+        self.max_conexiones = max_conexiones
+        self.timeout = timeout
+        self.pragmas = pragmas
+        self.factory = factory
+        self.pid = os.getpid()
+
+        self._condicion = threading.Condition()
+        self._libres = []
+        self._abiertas = 0
+        self._cerrado = False
+        self._local = threading.local()
+
+        # Contadores
+        self.aciertos = 0
+        self.fallos = 0
+        self.esperas = 0
+        self.tiempo_espera = 0.0
+
+    def _abrir(self):
+        conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False,
+                               factory=self.factory)
+        conn.row_factory = sqlite3.Row
+        for nombre, valor in self.pragmas:
+            conn.execute(f'PRAGMA {nombre} = {valor}')
+        return conn
+
+    def adquirir(self):
+        """Obtener una conexión; si el hilo ya tiene una, se reutiliza"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is not None:
+            local.profundidad += 1
+            with self._condicion:
+                self.aciertos += 1
+            return conn
+
+        abrir_nueva = False
+        with self._condicion:
+            if self._cerrado:
+                raise sqlite3.ProgrammingError('El pool de conexiones está cerrado')
+
+            if not self._libres and self._abiertas >= self.max_conexiones:
+                self.esperas += 1
+                inicio = time.perf_counter()
+                limite = inicio + self.timeout
+                while not self._libres and self._abiertas >= self.max_conexiones:
+                    restante = limite - time.perf_counter()
+                    if restante <= 0 or self._cerrado:
+                        self.tiempo_espera += time.perf_counter() - inicio
+                        raise PoolAgotadoError(
+                            f'Sin conexiones libres tras {self.timeout}s '
+                            f'({self.max_conexiones} en uso)'
+                        )
+                    self._condicion.wait(restante)
+                self.tiempo_espera += time.perf_counter() - inicio
+
+            if self._libres:
+                conn = self._libres.pop()
+                self.aciertos += 1
+            else:
+                self._abiertas += 1
+                self.fallos += 1
+                abrir_nueva = True
+
+        if abrir_nueva:
+            try:
+                conn = self._abrir()
+            except Exception:
+                with self._condicion:
+                    self._abiertas -= 1
+                    self._condicion.notify()
+                raise
+
+        local.conn = conn
+        local.profundidad = 1
+        return conn
+
+    def liberar(self, conn):
+        """Regresar la conexión al pool cuando el hilo ya no la usa"""
+        local = self._local
+        local.profundidad -= 1
+        if local.profundidad > 0:
+            return
+        local.conn = None
+
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._condicion:
+            if self._cerrado:
+                self._abiertas -= 1
+                conn.close()
+            else:
+                self._libres.append(conn)
+            self._condicion.notify()
+
+    @contextmanager
+    def conexion(self):
+        """Context manager: commit al salir sin errores, rollback si hay excepción.
+
+        Solo el bloque más externo del hilo confirma o revierte. Un bloque
+        anidado no confirma: su trabajo queda en la transacción del de afuera.
+        Si falla, revierte solo lo suyo: hasta un SAVEPOINT si ya había una
+        transacción abierta al entrar, o la transacción completa si la abrió él.
+        """
+        conn = self.adquirir()
+        profundidad = self._local.profundidad
+        try:
+            if profundidad == 1:
+                with conn:
+                    yield conn
+            elif conn.in_transaction:
+                punto = f'anidado_{profundidad}'
+                conn.execute(f'SAVEPOINT {punto}')
+                try:
+                    yield conn
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.execute(f'ROLLBACK TO {punto}')
+                        conn.execute(f'RELEASE {punto}')
+                    raise
+                if conn.in_transaction:
+                    conn.execute(f'RELEASE {punto}')
+            else:
+                try:
+                    yield conn
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    raise
+        finally:
+            self.liberar(conn)
+
+    def cerrar(self):
+        """Cerrar las conexiones libres; las que estén en uso se cierran al liberarse"""
+        with self._condicion:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+            self._abiertas -= len(libres)
+            self._condicion.notify_all()
+        for conn in libres:
+            conn.close()
+
+    def estadisticas(self):
+        with self._condicion:
+            return {
+                'database': self.database,
+                'max_conexiones': self.max_conexiones,
+                'abiertas': self._abiertas,
+                'libres': len(self._libres),
+                'en_uso': self._abiertas - len(self._libres),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'esperas': self.esperas,
+                'tiempo_espera_s': round(self.tiempo_espera, 6),
+            }
@@ -0,0 +1,229 @@
+"""NIPs de analista con hash, caché de verificaciones y límite de intentos.
+
+Los NIPs se guardan con PBKDF2 (formato de werkzeug, el mismo que usan las
+contraseñas de administrador) y un costo configurable. Como cada verificación
+cuesta decenas de milisegundos de CPU, el login de analistas se protege con:
+
+- CacheVerificaciones: recuerda por un tiempo las verificaciones exitosas
+  (acotada en tamaño, con TTL); un analista que vuelve a entrar no paga el KDF.
+- LimitadorTokens: un token bucket por código y otro por IP, consultados antes
+  de calcular el hash. Una ráfaga de intentos contra un código o desde una IP
+  se corta sin gastar CPU.
+
+Ambos viven en memoria de cada proceso: con N workers el límite efectivo es
+hasta N veces el configurado.
+
+Los NIPs heredados en texto plano se siguen aceptando y se convierten a hash
+en el siguiente login exitoso; `python credenciales.py [db]` los migra todos.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+ITERACIONES = int(os.environ.get('NIP_HASH_ITERACIONES', 50_000))
+# Las altas masivas usan un costo menor (miles de hashes por archivo); esos
+# NIPs se recalculan con ITERACIONES en el primer login exitoso
+ITERACIONES_LOTE = int(os.environ.get('NIP_HASH_ITERACIONES_LOTE', 1_000))
+
+_PREFIJOS_HASH = ('pbkdf2:', 'scrypt:')
+
+
+def hashear_nip(nip, iteraciones=None):
+    return generate_password_hash(str(nip), method=f'pbkdf2:sha256:{iteraciones or ITERACIONES}')
+
+
+def hashear_nips(nips, iteraciones=None):
+    """Hash de una lista de NIPs; pbkdf2_hmac libera el GIL, así que usa todos los núcleos"""
+    nips = list(nips)
+    if len(nips) < 64:
+        return [hashear_nip(nip, iteraciones) for nip in nips]
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as ejecutor:
+        return list(ejecutor.map(lambda nip: hashear_nip(nip, iteraciones), nips, chunksize=256))
+
+
+def es_hash(guardado):
+    return str(guardado or '').startswith(_PREFIJOS_HASH)
+
+
+def necesita_rehash(guardado):
+    """True si el NIP está en texto plano o con un costo distinto al configurado"""
+    if not es_hash(guardado):
+        return True
+    metodo = guardado.split('$', 1)[0].split(':')
+    return metodo[:2] != ['pbkdf2', 'sha256'] or metodo[2:] != [str(ITERACIONES)]
+
+
+class CacheVerificaciones:
+    """Verificaciones exitosas recientes, acotada (LRU) y con expiración.
+
+    La clave es un HMAC con un secreto aleatorio del proceso sobre el código,
+    el hash guardado y el NIP: no se guarda el NIP, y si el NIP cambia en la
+    BD la entrada anterior deja de coincidir.
+    """
+
+    def __init__(self, max_entradas=10_000, ttl=300.0):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._secreto = secrets.token_bytes(32)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _clave(self, codigo, guardado, nip):
+        mensaje = '\0'.join((codigo, guardado, nip)).encode()
+        return hmac.new(self._secreto, mensaje, hashlib.sha256).digest()
+
+    def contiene(self, codigo, guardado, nip):
+        clave = self._clave(codigo, guardado, nip)
+        ahora = time.monotonic()
+        with self._lock:
+            expira = self._entradas.get(clave)
+            if expira is not None and expira > ahora:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return True
+            if expira is not None:
+                del self._entradas[clave]
+            self.fallos += 1
+            return False
+
+    def agregar(self, codigo, guardado, nip):
+        clave = self._clave(codigo, guardado, nip)
+        with self._lock:
+            self._entradas[clave] = time.monotonic() + self.ttl
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+class LimitadorTokens:
+    """Token bucket por clave: `capacidad` intentos seguidos y uno nuevo cada
+    `1 / por_segundo` segundos. Guarda a lo más `max_claves` buckets (LRU)."""
+
+    def __init__(self, capacidad, por_segundo, max_claves=50_000):
+        self.capacidad = capacidad
+        self.por_segundo = por_segundo
+        self.max_claves = max_claves
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.rechazados = 0
+
+    def _tokens(self, clave, ahora):
+        tokens, ultimo = self._buckets.get(clave, (self.capacidad, ahora))
+        return min(self.capacidad, tokens + (ahora - ultimo) * self.por_segundo)
+
+    def _guardar(self, clave, tokens, ahora):
+        self._buckets.pop(clave, None)
+        # Un bucket lleno equivale a no tenerlo
+        if tokens < self.capacidad:
+            self._buckets[clave] = (tokens, ahora)
+            if len(self._buckets) > self.max_claves:
+                self._buckets.popitem(last=False)
+
+    def permitir(self, clave):
+        return permitir_todos((self, clave))
+
+
+def permitir_todos(*pares):
+    """Consumir un token de cada (limitador, clave) solo si todos tienen uno.
+
+    Se revisan todos los buckets antes de consumir: un bucket que rechaza no
+    gasta los demás. Los locks se toman en un orden fijo.
+    """
+    ahora = time.monotonic()
+    limitadores = sorted({id(limitador): limitador for limitador, _ in pares}.values(), key=id)
+    with ExitStack() as pila:
+        for limitador in limitadores:
+            pila.enter_context(limitador._lock)
+        tokens = [limitador._tokens(clave, ahora) for limitador, clave in pares]
+        permitido = all(disponibles >= 1 for disponibles in tokens)
+        for (limitador, clave), disponibles in zip(pares, tokens):
+            if permitido:
+                disponibles -= 1
+            elif disponibles < 1:
+                limitador.rechazados += 1
+            limitador._guardar(clave, disponibles, ahora)
+        return permitido
+
+
+cache_verificaciones = CacheVerificaciones(
+    max_entradas=int(os.environ.get('NIP_CACHE_MAX', 10_000)),
+    ttl=float(os.environ.get('NIP_CACHE_TTL_S', 300)),
+)
+limite_por_codigo = LimitadorTokens(
+    capacidad=int(os.environ.get('LOGIN_INTENTOS_CODIGO', 5)),
+    por_segundo=float(os.environ.get('LOGIN_RECARGA_CODIGO_S', 1 / 60)),
+)
+limite_por_ip = LimitadorTokens(
+    capacidad=int(os.environ.get('LOGIN_INTENTOS_IP', 20)),
+    por_segundo=float(os.environ.get('LOGIN_RECARGA_IP_S', 1 / 6)),
+)
+
+
+def permitir_intento(codigo, ip):
+    """Consumir un intento de login del código y de la IP, solo si ambos lo permiten.
+
+    Un código bloqueado no gasta el presupuesto de la IP, que puede ser la de
+    toda una oficina detrás de un NAT.
+    """
+    return permitir_todos((limite_por_ip, ip), (limite_por_codigo, codigo))
+
+
+def verificar_nip(codigo, guardado, nip):
+    """Comparar el NIP recibido contra el guardado (hash o texto plano heredado)"""
+    guardado = str(guardado or '').strip()
+    if not nip or not guardado:
+        return False
+    if not es_hash(guardado):
+        return hmac.compare_digest(guardado.encode(), str(nip).encode())
+    if cache_verificaciones.contiene(codigo, guardado, nip):
+        return True
+    if check_password_hash(guardado, nip):
+        cache_verificaciones.agregar(codigo, guardado, nip)
+        return True
+    return False
+
+
+def migrar_nips(conn, tamano_lote=1_000, iteraciones=None):
+    """Convertir a hash todos los NIPs en texto plano; regresa cuántos cambió"""
+    total = 0
+    ultimo_id = 0
+    while True:
+        filas = conn.execute('''
+            SELECT id, nip FROM analistas
+            WHERE id > ? AND nip NOT LIKE 'pbkdf2:%' AND nip NOT LIKE 'scrypt:%'
+            ORDER BY id LIMIT ?
+        ''', (ultimo_id, tamano_lote)).fetchall()
+        if not filas:
+            return total
+        ids = [fila[0] for fila in filas]
+        hashes = hashear_nips((str(fila[1]).strip() for fila in filas), iteraciones)
+        conn.executemany('UPDATE analistas SET nip = ? WHERE id = ?', zip(hashes, ids))
+        conn.commit()
+        total += len(ids)
+        ultimo_id = ids[-1]
+
+
+if __name__ == '__main__':
+    import sqlite3
+
+    ruta = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('DATABASE', 'creditos.db')
+    conexion = sqlite3.connect(ruta)
+    inicio = time.perf_counter()
+    migrados = migrar_nips(conexion)
+    conexion.close()
+    print(f"✅ {migrados} NIPs convertidos a hash en {time.perf_counter() - inicio:.2f}s")
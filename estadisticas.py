@@ -0,0 +1,29 @@
+"""Estadísticas por analista mantenidas de forma incremental.
+
+`estadisticas_analista` guarda por analista los totales por estado y los
+montos. Los triggers sobre `creditos` la actualizan dentro de la misma
+transacción que inserta, cambia de estado o borra un crédito, así que
+cualquier escritura (rutas, importaciones, procesos por lote) la deja
+consistente sin que el código tenga que acordarse. Leer las estadísticas de
+un analista es leer una fila. La tabla y los triggers se crean en la
+migración 1 (migraciones.py).
+"""
+
+COLUMNAS = ('total', 'pendientes', 'aprobadas', 'rechazadas', 'zona_gris',
+            'monto_solicitado', 'monto_aprobado')
+
+
+def obtener(conn, analista_id=None):
+    """Estadísticas de un analista, o de todos si analista_id es None"""
+    if analista_id is None:
+        row = conn.execute(f'''
+            SELECT {', '.join(f'SUM({c})' for c in COLUMNAS)} FROM estadisticas_analista
+        ''').fetchone()
+    else:
+        row = conn.execute(f'''
+            SELECT {', '.join(COLUMNAS)} FROM estadisticas_analista WHERE analista_id = ?
+        ''', (analista_id,)).fetchone()
+    datos = dict(zip(COLUMNAS, row or ()))
+    datos = {c: datos.get(c) or 0 for c in COLUMNAS}
+    datos['tasa_aprobacion'] = round(100 * datos['aprobadas'] / datos['total'], 1) if datos['total'] else 0
+    return datos
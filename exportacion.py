@@ -0,0 +1,204 @@
+"""Exportación de solicitudes en CSV o XLSX como flujo (streaming).
+
+Las filas se leen del cursor de SQLite en lotes con fetchmany y se escriben al
+cliente conforme se generan, de modo que la memoria no crece con el número de
+filas y el encabezado sale de inmediato.
+"""
+import csv
+import io
+import zipfile
+import zlib
+from xml.sax.saxutils import escape
+
+import solicitudes
+
+TAMANO_LOTE = 1000
+TAMANO_BLOQUE = 64 * 1024
+
+ENCABEZADOS = (
+    'Número', 'Fecha solicitud', 'Analista', 'Cliente', 'RFC', 'Monto solicitado',
+    'Monto aprobado', 'Plazo (meses)', 'Tasa (%)', 'Estado', 'FICO', 'TDSR (%)',
+)
+
+
+def iterar_filas(conn, filtros, tamano_lote=TAMANO_LOTE):
+    """Filas a exportar, de la solicitud más reciente a la más antigua"""
+    condiciones, params = solicitudes.construir_where(filtros)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    cursor = conn.execute(
+        f'SELECT {solicitudes.COLUMNAS} {solicitudes.FROM} {where} '
+        f'ORDER BY cr.fecha_solicitud DESC, cr.id DESC',
+        params,
+    )
+    try:
+        while True:
+            lote = cursor.fetchmany(tamano_lote)
+            if not lote:
+                break
+            for row in lote:
+                nombre = ' '.join(p for p in (row['nombre'], row['apellido_paterno'],
+                                              row['apellido_materno']) if p)
+                monto_aprobado = row['monto_aprobado']
+                if monto_aprobado is None and row['estado'] == 'aprobado':
+                    monto_aprobado = row['monto']
+                yield (
+                    f"S-{row['id']:05d}",
+                    row['fecha_solicitud'] or '',
+                    row['analista_codigo'] or '',
+                    nombre,
+                    row['rfc'] or '',
+                    row['monto'],
+                    monto_aprobado,
+                    row['plazo'],
+                    row['tasa_interes'],
+                    row['estado'] or 'pendiente',
+                    row['fico_score'],
+                    row['tdsr'],
+                )
+    finally:
+        cursor.close()
+
+
+def generar_csv(filas):
+    """Bloques de texto CSV (UTF-8 con BOM para que Excel respete los acentos)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(ENCABEZADOS)
+    # El encabezado sale de inmediato para que el primer byte llegue sin esperar filas
+    yield buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+
+    for fila in filas:
+        escritor.writerow(['' if v is None else v for v in fila])
+        if buffer.tell() >= TAMANO_BLOQUE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def comprimir_gzip(bloques, nivel=6):
+    """Comprimir en gzip un flujo de bloques sin juntarlo en memoria"""
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    primero = True
+    for bloque in bloques:
+        datos = compresor.compress(bloque)
+        if primero:
+            # Vaciar el primer bloque para no retrasar el primer byte
+            datos += compresor.flush(zlib.Z_SYNC_FLUSH)
+            primero = False
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
+class _SalidaEnBloques:
+    """Archivo de solo escritura que acumula bytes hasta que se recogen"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def recoger(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Solicitudes" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _celda(valor):
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f'<c t="n"><v>{valor}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(str(valor))}</t></is></c>'
+
+
+def _fila_xml(valores):
+    return '<row>' + ''.join(_celda(v) for v in valores) + '</row>'
+
+
+def generar_xlsx(filas):
+    """Bloques de un libro XLSX con una sola hoja escrita en flujo.
+
+    zipfile admite salidas no posicionables (usa descriptores de datos), así que
+    cada entrada se escribe y se entrega al cliente sin armar el archivo completo.
+    """
+    salida = _SalidaEnBloques()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        libro.writestr('_rels/.rels', _RELS)
+        libro.writestr('xl/workbook.xml', _WORKBOOK)
+        libro.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja:
+            hoja.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetData>' + _fila_xml(ENCABEZADOS)
+            ).encode('utf-8'))
+            yield salida.recoger()
+
+            partes, tamano = [], 0
+            for fila in filas:
+                xml = _fila_xml(fila)
+                partes.append(xml)
+                tamano += len(xml)
+                if tamano >= TAMANO_BLOQUE:
+                    hoja.write(''.join(partes).encode('utf-8'))
+                    partes, tamano = [], 0
+                    datos = salida.recoger()
+                    if datos:
+                        yield datos
+
+            partes.append('</sheetData></worksheet>')
+            hoja.write(''.join(partes).encode('utf-8'))
+    yield salida.recoger()
@@ -0,0 +1,234 @@
+"""Alta masiva de analistas y cambio de estado por lote.
+
+Todo el lote se valida en memoria, los duplicados contra la BD se buscan con
+una consulta por lote (json_each) y las escrituras van en una sola
+transacción con executemany. Las filas con errores se reportan y se omiten;
+el resto del lote se guarda.
+"""
+import csv
+import io
+import json
+import re
+import sqlite3
+
+import credenciales
+import rfcs
+import secuencias
+
+MAX_FILAS = 100_000
+ESTADOS = ('aprobado', 'rechazado', 'pendiente')
+
+_NIP = re.compile(r'^\d{4}$')
+_TELEFONO = re.compile(r'^\+?[\d\s-]{8,15}$')
+_CODIGO = re.compile(r'^[A-Z0-9]{2,20}$')
+_CODIGO_AUTOMATICO = re.compile(r'^E(\d+)$')
+
+# Los códigos automáticos (E<n>) salen de esta secuencia y empiezan arriba del
+# rango E100-E999 que usaba el registro individual con códigos aleatorios
+SECUENCIA = 'analistas'
+PRIMER_CODIGO_AUTOMATICO = 1000
+
+_SQL_EXISTENTES = '''
+    SELECT 'codigo', codigo FROM analistas WHERE codigo IN (SELECT value FROM json_each(?))
+    UNION ALL
+    SELECT 'rfc', rfc FROM analistas WHERE rfc IN (SELECT value FROM json_each(?))
+'''
+
+_SQL_INSERTAR = '''
+    INSERT INTO analistas (codigo, nombre, apellido_paterno, apellido_materno,
+                           rfc, telefono, nip, estado, rol, fecha_registro)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'analista', datetime('now'))
+'''
+
+
+class ArchivoInvalidoError(ValueError):
+    pass
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+def leer_registros(contenido, nombre_archivo=''):
+    """Lista de dicts a partir de un archivo CSV (con encabezado) o JSON (lista)"""
+    if isinstance(contenido, bytes):
+        try:
+            contenido = contenido.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            contenido = contenido.decode('latin-1')
+    contenido = contenido.lstrip('\ufeff')
+
+    if nombre_archivo.lower().endswith('.json') or contenido.lstrip().startswith('['):
+        try:
+            registros = json.loads(contenido)
+        except ValueError as e:
+            raise ArchivoInvalidoError(f'JSON inválido: {e}') from e
+        if not isinstance(registros, list) or not all(isinstance(r, dict) for r in registros):
+            raise ArchivoInvalidoError('El JSON debe ser una lista de objetos')
+    else:
+        lector = csv.DictReader(io.StringIO(contenido))
+        if not lector.fieldnames:
+            raise ArchivoInvalidoError('El CSV no tiene encabezado')
+        lector.fieldnames = [c.strip().lower() for c in lector.fieldnames]
+        registros = list(lector)
+
+    if len(registros) > MAX_FILAS:
+        raise ArchivoInvalidoError(f'Máximo {MAX_FILAS} filas por archivo')
+    return registros
+
+
+def _validar(registro):
+    """(fila normalizada, errores) de un registro del archivo"""
+    errores = []
+    nombre = _texto(registro.get('nombre'))
+    apellido_paterno = _texto(registro.get('apellido_paterno'))
+    apellido_materno = _texto(registro.get('apellido_materno'))
+    if not apellido_paterno and registro.get('nombre_completo'):
+        # Mismo criterio que el formulario de registro: "Nombre Paterno Materno"
+        partes = _texto(registro['nombre_completo']).split(' ', 2) + ['', '']
+        nombre, apellido_paterno, apellido_materno = partes[:3]
+    if not nombre:
+        errores.append('nombre obligatorio')
+
+    rfc = _texto(registro.get('rfc')).upper()
+    errores.extend(f'rfc: {e}' for e in rfcs.validar_rfc(rfc))
+
+    nip = _texto(registro.get('nip'))
+    if not _NIP.match(nip):
+        errores.append('nip: se esperan 4 dígitos')
+
+    telefono = _texto(registro.get('telefono'))
+    if telefono and not _TELEFONO.match(telefono):
+        errores.append('telefono inválido')
+
+    codigo = _texto(registro.get('codigo')).upper()
+    if codigo and not _CODIGO.match(codigo):
+        errores.append('codigo inválido')
+    automatico = _CODIGO_AUTOMATICO.match(codigo)
+    if automatico and int(automatico.group(1)) >= PRIMER_CODIGO_AUTOMATICO:
+        errores.append(f'codigo: E{PRIMER_CODIGO_AUTOMATICO} en adelante los asigna el sistema')
+
+    estado = _texto(registro.get('estado')).lower() or 'pendiente'
+    if estado not in ESTADOS:
+        errores.append(f'estado debe ser uno de: {", ".join(ESTADOS)}')
+
+    fila = {
+        'codigo': codigo, 'nombre': nombre, 'apellido_paterno': apellido_paterno,
+        'apellido_materno': apellido_materno, 'rfc': rfc, 'telefono': telefono,
+        'nip': nip, 'estado': estado,
+    }
+    return fila, errores
+
+
+def _existentes(conn, codigos, lista_rfc):
+    codigos_json = json.dumps(sorted(set(codigos)))
+    rfc_json = json.dumps(sorted(set(lista_rfc)))
+    existentes = {'codigo': set(), 'rfc': set()}
+    for campo, valor in conn.execute(_SQL_EXISTENTES, (codigos_json, rfc_json)):
+        existentes[campo].add(valor)
+    return existentes
+
+
+def importar_analistas(conn, registros):
+    """Validar e insertar un lote de analistas en la transacción de `conn`.
+
+    No confirma: el lote va en un SAVEPOINT y el commit lo hace el llamador
+    (el bloque get_db() de la petición).
+
+    Regresa {'insertados': [(fila, codigo)], 'errores': [(fila, [mensajes])]},
+    con filas numeradas desde 1 como en la hoja de cálculo (sin encabezado).
+    """
+    validas, errores = [], []
+    vistos_codigo, vistos_rfc = {}, {}
+    for numero, registro in enumerate(registros, start=1):
+        fila, mensajes = _validar(registro)
+        if fila['rfc'] in vistos_rfc:
+            mensajes.append(f'rfc repetido en la fila {vistos_rfc[fila["rfc"]]}')
+        if fila['codigo'] and fila['codigo'] in vistos_codigo:
+            mensajes.append(f'codigo repetido en la fila {vistos_codigo[fila["codigo"]]}')
+        if mensajes:
+            errores.append((numero, mensajes))
+            continue
+        vistos_rfc[fila['rfc']] = numero
+        if fila['codigo']:
+            vistos_codigo[fila['codigo']] = numero
+        validas.append((numero, fila))
+
+    existentes = _existentes(conn, vistos_codigo, vistos_rfc)
+    por_insertar = []
+    for numero, fila in validas:
+        mensajes = []
+        if fila['rfc'] in existentes['rfc']:
+            mensajes.append('rfc ya registrado')
+        if fila['codigo'] in existentes['codigo']:
+            mensajes.append('codigo ya registrado')
+        if mensajes:
+            errores.append((numero, mensajes))
+        else:
+            por_insertar.append((numero, fila))
+
+    # El hash se calcula antes de abrir la transacción de escritura
+    hashes = credenciales.hashear_nips((f['nip'] for _, f in por_insertar),
+                                       credenciales.ITERACIONES_LOTE)
+    for (_, fila), nip in zip(por_insertar, hashes):
+        fila['nip'] = nip
+
+    # Todo el lote en un SAVEPOINT dentro de la transacción del llamador, que
+    # es quien confirma. Los códigos se reservan dentro: si el lote se
+    # deshace, la reserva también y no se queman números
+    sin_codigo = [fila for _, fila in por_insertar if not fila['codigo']]
+
+    def asignar_codigos():
+        if sin_codigo:
+            inicio = secuencias.reservar(conn, SECUENCIA, len(sin_codigo))
+            for numero, fila in enumerate(sin_codigo, start=inicio):
+                fila['codigo'] = f'E{numero}'
+        return [
+            (f['codigo'], f['nombre'], f['apellido_paterno'], f['apellido_materno'],
+             f['rfc'], f['telefono'], f['nip'], f['estado'])
+            for _, f in por_insertar
+        ]
+
+    # Un SAVEPOINT fuera de transacción confirmaría al liberarse
+    if not conn.in_transaction:
+        conn.execute('BEGIN')
+    conn.execute('SAVEPOINT importacion')
+    try:
+        try:
+            conn.executemany(_SQL_INSERTAR, asignar_codigos())
+            insertados = [(numero, fila['codigo']) for numero, fila in por_insertar]
+        except sqlite3.IntegrityError:
+            # Algún alta concurrente ganó la carrera: se deshace el lote (con su
+            # reserva) y se reintenta fila por fila para reportar cuál falló
+            conn.execute('ROLLBACK TO importacion')
+            insertados = []
+            for (numero, fila), params in zip(por_insertar, asignar_codigos()):
+                try:
+                    conn.execute(_SQL_INSERTAR, params)
+                    insertados.append((numero, fila['codigo']))
+                except sqlite3.IntegrityError as e:
+                    errores.append((numero, [f'duplicado: {e}']))
+    except BaseException:
+        conn.execute('ROLLBACK TO importacion')
+        conn.execute('RELEASE importacion')
+        raise
+    conn.execute('RELEASE importacion')
+
+    errores.sort()
+    return {'insertados': insertados, 'errores': errores}
+
+
+def cambiar_estado(conn, codigos, estado):
+    """Cambiar el estado de los analistas indicados en la transacción de `conn`.
+
+    Regresa {'actualizados': [codigos], 'errores': [(codigo, mensaje)]}.
+    """
+    if estado not in ESTADOS:
+        raise ValueError(f'Estado inválido: {estado}')
+    normalizados = list(dict.fromkeys(_texto(c).upper() for c in codigos if _texto(c)))
+    existentes = _existentes(conn, normalizados, [])['codigo']
+    actualizados = [c for c in normalizados if c in existentes]
+    errores = [(c, 'código no encontrado') for c in normalizados if c not in existentes]
+    conn.executemany('UPDATE analistas SET estado = ? WHERE codigo = ?',
+                     [(estado, c) for c in actualizados])
+    return {'actualizados': actualizados, 'errores': errores}
@@ -0,0 +1,377 @@
+"""Instrumentación por petición y exposición en formato de texto de Prometheus.
+
+Por cada petición se registra:
+  - la latencia por ruta, método y código de respuesta;
+  - cuántas consultas hizo a la BD y cuánto tiempo pasó en ella: las
+    conexiones del pool son ConexionMedida, que mide cada execute y fetch
+    mientras hay una petición en curso en el hilo;
+  - el tiempo de render de cada plantilla (señales de Flask).
+
+Cada proceso acumula en memoria. Con varios workers (servidor.py) cada uno
+vuelca su estado a METRICAS_DIR/<pid>.json como mucho cada
+METRICAS_INTERVALO_S, y el endpoint suma los archivos de todos.
+
+Perfiles: con PERFIL_MUESTREO > 0 esa fracción de peticiones se perfila con
+cProfile; un administrador también puede pedirlo para una petición con
+?perfilar=1. Cada perfil se guarda en PERFIL_DIR como
+<ms>_<ruta>_<pid>.prof (se abre con pstats o snakeviz).
+"""
+import bisect
+import contextvars
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask import before_render_template, request, session, template_rendered
+
+logger = logging.getLogger(__name__)
+
+ACTIVAS = os.environ.get('METRICAS_ACTIVAS', '1') != '0'
+DIRECTORIO = os.environ.get('METRICAS_DIR')
+INTERVALO_VOLCADO = float(os.environ.get('METRICAS_INTERVALO_S', 5))
+TOKEN = os.environ.get('METRICAS_TOKEN')
+PERFIL_MUESTREO = float(os.environ.get('PERFIL_MUESTREO', 0))
+PERFIL_DIR = os.environ.get('PERFIL_DIR') or os.path.join(tempfile.gettempdir(), 'perfiles-credito')
+
+LIMITES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(nombres, valores, extra=''):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+class Histograma:
+    """Histograma con etiquetas; cada serie es [conteo por cubeta..., +Inf, suma]"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas, limites):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(limites)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [0] * (len(self.limites) + 1) + [0.0]
+            serie[indice] += 1
+            serie[-1] += valor
+
+    def instantanea(self):
+        with self._lock:
+            return [[list(etiquetas), list(serie)] for etiquetas, serie in self._series.items()]
+
+    def exportar(self, series):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} histogram']
+        for etiquetas, serie in sorted(series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.limites + ('+Inf',), serie):
+                acumulado += conteo
+                le = _etiquetas(self.etiquetas, etiquetas, f'le="{limite}"')
+                lineas.append(f'{self.nombre}_bucket{le} {acumulado}')
+            nombres = _etiquetas(self.etiquetas, etiquetas)
+            lineas.append(f'{self.nombre}_sum{nombres} {serie[-1]:.6f}')
+            lineas.append(f'{self.nombre}_count{nombres} {acumulado}')
+        return lineas
+
+
+class Medidor:
+    """Valor leído al momento de exportar (gauge o counter que ya lleva otro objeto)"""
+
+    def __init__(self, nombre, ayuda, funcion, tipo='gauge'):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.funcion = funcion
+        self.tipo = tipo
+        self.etiquetas = ()
+
+    def instantanea(self):
+        try:
+            return [[[], [float(self.funcion())]]]
+        except Exception:
+            logger.debug('Medidor sin valor', exc_info=True, extra={'metrica': self.nombre})
+            return []
+
+    def exportar(self, series):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} {self.tipo}']
+        for serie in series.values():
+            lineas.append(f'{self.nombre} {serie[0]:g}')
+        return lineas
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = {}
+        self._proximo_volcado = 0.0
+
+    def histograma(self, nombre, ayuda, etiquetas, limites):
+        return self._metricas.setdefault(nombre, Histograma(nombre, ayuda, etiquetas, limites))
+
+    def medidor(self, nombre, ayuda, funcion, tipo='gauge'):
+        return self._metricas.setdefault(nombre, Medidor(nombre, ayuda, funcion, tipo))
+
+    def instantanea(self):
+        return {nombre: metrica.instantanea() for nombre, metrica in self._metricas.items()}
+
+    def volcar(self, directorio):
+        """Escribir el estado de este proceso para que otros lo sumen"""
+        ruta = os.path.join(directorio, f'{os.getpid()}.json')
+        temporal = f'{ruta}.{threading.get_ident()}.tmp'
+        with open(temporal, 'w') as f:
+            json.dump(self.instantanea(), f)
+        os.replace(temporal, ruta)
+
+    def volcar_si_toca(self, directorio, intervalo=INTERVALO_VOLCADO):
+        ahora = time.monotonic()
+        if ahora >= self._proximo_volcado:
+            self._proximo_volcado = ahora + intervalo
+            self.volcar(directorio)
+
+    def _instantaneas(self, directorio):
+        """La de este proceso más las volcadas por los demás. De los procesos
+        que ya terminaron solo se cuentan los histogramas: los medidores
+        describen un estado que ya no existe."""
+        yield self.instantanea()
+        if not directorio or not os.path.isdir(directorio):
+            return
+        propio = f'{os.getpid()}.json'
+        for nombre in os.listdir(directorio):
+            if not nombre.endswith('.json') or nombre == propio:
+                continue
+            try:
+                with open(os.path.join(directorio, nombre)) as f:
+                    datos = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not _proceso_vivo(int(nombre[:-5])):
+                datos = {n: s for n, s in datos.items()
+                         if isinstance(self._metricas.get(n), Histograma)}
+            yield datos
+
+    def exportar(self, directorio=None):
+        """Texto de exposición de Prometheus sumando todos los procesos"""
+        sumas = {nombre: {} for nombre in self._metricas}
+        for datos in self._instantaneas(directorio):
+            for nombre, series in datos.items():
+                if nombre not in sumas:
+                    continue
+                for etiquetas, serie in series:
+                    etiquetas = tuple(etiquetas)
+                    actual = sumas[nombre].get(etiquetas)
+                    sumas[nombre][etiquetas] = serie if actual is None else [a + b for a, b in zip(actual, serie)]
+        lineas = []
+        for nombre, metrica in self._metricas.items():
+            lineas.extend(metrica.exportar(sumas[nombre]))
+        return '\n'.join(lineas) + '\n'
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+registro = Registro()
+latencia = registro.histograma(
+    'credito_peticion_duracion_segundos', 'Duración de las peticiones',
+    ('ruta', 'metodo', 'codigo'), LIMITES_SEGUNDOS)
+consultas_bd = registro.histograma(
+    'credito_peticion_consultas_bd', 'Consultas a la BD por petición', ('ruta',), LIMITES_CONSULTAS)
+tiempo_bd = registro.histograma(
+    'credito_peticion_bd_segundos', 'Tiempo en execute/fetch de la BD por petición', ('ruta',),
+    LIMITES_SEGUNDOS)
+render = registro.histograma(
+    'credito_plantilla_render_segundos', 'Tiempo de render por plantilla', ('plantilla',),
+    LIMITES_SEGUNDOS)
+
+
+class _Medicion:
+    __slots__ = ('inicio', 'consultas', 'segundos_bd', 'codigo', 'perfil', 'renders')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.segundos_bd = 0.0
+        self.codigo = 500
+        self.perfil = None
+        self.renders = []
+
+
+# Medición de la petición en curso en este hilo (None fuera de peticiones)
+_medicion = contextvars.ContextVar('medicion', default=None)
+
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que suma consultas y tiempo a la petición en curso"""
+
+    def _medir(self, metodo, *args, contar=False):
+        medicion = _medicion.get()
+        if medicion is None:
+            return metodo(*args)
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args)
+        finally:
+            medicion.segundos_bd += time.perf_counter() - inicio
+            medicion.consultas += contar
+
+    def execute(self, sql, parametros=()):
+        return self._medir(super().execute, sql, parametros, contar=True)
+
+    def executemany(self, sql, parametros):
+        return self._medir(super().executemany, sql, parametros, contar=True)
+
+    def executescript(self, script):
+        return self._medir(super().executescript, script, contar=True)
+
+    # Para un SELECT, SQLite hace casi todo el trabajo al recorrer los resultados
+    def fetchone(self):
+        return self._medir(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._medir(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._medir(super().fetchall)
+
+
+class ConexionMedida(sqlite3.Connection):
+    """Conexión cuyos cursores son CursorMedido (factory de sqlite3.connect)"""
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    # Connection.execute y compañía no pasan por cursor(): se redirigen aquí
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+_config = {'directorio': DIRECTORIO, 'muestreo_perfil': PERFIL_MUESTREO, 'perfil_dir': PERFIL_DIR}
+
+
+def configurar(directorio=None, muestreo_perfil=None, perfil_dir=None, limpiar=False):
+    """Cambiar la configuración; con limpiar=True se borran los volcados de
+    una ejecución anterior (lo hace servidor.py antes de crear los workers)"""
+    if directorio is not None:
+        os.makedirs(directorio, exist_ok=True)
+        _config['directorio'] = directorio
+        if limpiar:
+            for nombre in os.listdir(directorio):
+                if nombre.endswith('.json'):
+                    os.remove(os.path.join(directorio, nombre))
+    if muestreo_perfil is not None:
+        _config['muestreo_perfil'] = muestreo_perfil
+    if perfil_dir is not None:
+        _config['perfil_dir'] = perfil_dir
+
+
+def token_valido():
+    """La petición trae `Authorization: Bearer <METRICAS_TOKEN>` (para el scraper)"""
+    cabecera = request.headers.get('Authorization', '')
+    return bool(TOKEN) and hmac.compare_digest(cabecera, f'Bearer {TOKEN}')
+
+
+def exportar():
+    return registro.exportar(_config['directorio'])
+
+
+def _iniciar_peticion():
+    medicion = _Medicion()
+    muestreo = _config['muestreo_perfil']
+    # La sesión solo se consulta si se pidió el perfil: cargarla cuesta una lectura
+    if (muestreo and random.random() < muestreo) or (
+            'perfilar' in request.args and session.get('user_type') == 'admin'):
+        medicion.perfil = cProfile.Profile()
+        try:
+            medicion.perfil.enable()
+        except ValueError:  # otro perfilador activo en el hilo
+            medicion.perfil = None
+    _medicion.set(medicion)
+
+
+def _registrar_respuesta(response):
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.codigo = response.status_code
+    return response
+
+
+def _terminar_peticion(exc):
+    medicion = _medicion.get()
+    if medicion is None:
+        return
+    _medicion.set(None)
+    duracion = time.perf_counter() - medicion.inicio
+    ruta = request.endpoint or 'sin_ruta'
+    latencia.observar(duracion, ruta, request.method, str(500 if exc is not None else medicion.codigo))
+    consultas_bd.observar(medicion.consultas, ruta)
+    tiempo_bd.observar(medicion.segundos_bd, ruta)
+    if medicion.perfil is not None:
+        medicion.perfil.disable()
+        _guardar_perfil(medicion.perfil, ruta, duracion)
+    if _config['directorio']:
+        registro.volcar_si_toca(_config['directorio'])
+
+
+def _guardar_perfil(perfil, ruta, duracion):
+    directorio = _config['perfil_dir']
+    os.makedirs(directorio, exist_ok=True)
+    ruta_archivo = os.path.join(directorio, f'{int(time.time() * 1000)}_{ruta}_{os.getpid()}.prof')
+    perfil.dump_stats(ruta_archivo)
+    logger.info('Perfil guardado', extra={
+        'ruta': ruta, 'archivo': ruta_archivo, 'duracion_ms': round(duracion * 1000, 3),
+    })
+
+
+def _antes_de_render(sender, template, context, **extra):
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.renders.append(time.perf_counter())
+
+
+def _despues_de_render(sender, template, context, **extra):
+    medicion = _medicion.get()
+    if medicion is not None and medicion.renders:
+        render.observar(time.perf_counter() - medicion.renders.pop(), template.name or '?')
+
+
+def instrumentar(app):
+    """Registrar los hooks de medición en la aplicación (no hace nada si
+    METRICAS_ACTIVAS=0)"""
+    if not ACTIVAS:
+        return
+    app.before_request(_iniciar_peticion)
+    app.after_request(_registrar_respuesta)
+    app.teardown_request(_terminar_peticion)
+    before_render_template.connect(_antes_de_render, app)
+    template_rendered.connect(_despues_de_render, app)
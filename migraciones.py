@@ -0,0 +1,654 @@
+"""Migraciones versionadas del esquema.
+
+`PRAGMA user_version` guarda la última versión aplicada. Al arrancar,
+aplicar() compara ese número (una lectura del encabezado del archivo) con la
+última de MIGRACIONES y, si está al día, no ejecuta ningún DDL. La tabla
+`migraciones` guarda cuándo se aplicó cada versión y cuánto tardó.
+
+Cada migración se aplica con BEGIN IMMEDIATE y sube user_version en la misma
+transacción: si falla, no queda a medias y el error detiene el arranque. Si
+dos procesos arrancan a la vez, el segundo espera el bloqueo, ve la versión
+ya aplicada y no repite nada.
+
+SQLite no construye un índice por partes: CREATE INDEX toma el bloqueo de
+escritura mientras recorre la tabla. Para que `creditos` no quede bloqueada
+más que lo indispensable:
+
+  - Indices: un índice por transacción; los escritores esperan (busy_timeout)
+    lo que tarda uno, no todos juntos.
+  - Relleno: los UPDATE de datos van por lotes de rowid, cada lote en su
+    propia transacción, con una pausa entre lotes para que entren los
+    escritores que esperan. La condición del UPDATE excluye las filas ya
+    rellenadas, así que si se interrumpe se puede repetir.
+
+Las migraciones nuevas se agregan al final de MIGRACIONES con la versión
+siguiente; las ya publicadas no se modifican.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from werkzeug.security import generate_password_hash
+
+import credenciales
+
+logger = logging.getLogger(__name__)
+
+# Lotes cortos y pausa breve: un escritor espera ~10 ms, no lo que tarda el
+# UPDATE completo (benchmarks/bench_migraciones.py)
+TAMANO_LOTE = int(os.environ.get('MIGRACIONES_LOTE', 1_000))
+PAUSA_LOTES = float(os.environ.get('MIGRACIONES_PAUSA_S', 0.005))
+
+ESQUEMA = '''
+    CREATE TABLE IF NOT EXISTS migraciones (
+        version INTEGER PRIMARY KEY,
+        descripcion TEXT NOT NULL,
+        aplicada TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        duracion_ms REAL
+    )
+'''
+
+
+def version_actual(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+@contextmanager
+def transaccion(conn):
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK si hay excepción)"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def agregar_columnas(conn, tabla, columnas):
+    """Agregar a una tabla existente las columnas que le falten"""
+    existentes = {row[1] for row in conn.execute(f'PRAGMA table_info({tabla})')}
+    for nombre, tipo in columnas:
+        if nombre not in existentes:
+            conn.execute(f'ALTER TABLE {tabla} ADD COLUMN {nombre} {tipo}')
+
+
+class Migracion:
+    """Pasos (SQL o funciones que reciben la conexión) en una sola transacción"""
+
+    def __init__(self, version, descripcion, *pasos):
+        self.version = version
+        self.descripcion = descripcion
+        self.pasos = pasos
+
+    def _registrar(self, conn, inicio):
+        conn.execute('INSERT INTO migraciones (version, descripcion, duracion_ms) VALUES (?, ?, ?)',
+                     (self.version, self.descripcion, (time.perf_counter() - inicio) * 1e3))
+        conn.execute(f'PRAGMA user_version = {int(self.version)}')
+
+    def aplicar(self, conn):
+        """Aplicar la migración; False si otro proceso ya la aplicó"""
+        inicio = time.perf_counter()
+        with transaccion(conn):
+            if version_actual(conn) >= self.version:
+                return False
+            for paso in self.pasos:
+                if isinstance(paso, str):
+                    conn.execute(paso)
+                else:
+                    paso(conn)
+            self._registrar(conn, inicio)
+        return True
+
+
+class Indices(Migracion):
+    """CREATE INDEX IF NOT EXISTS, uno por transacción; la versión sube con el último"""
+
+    def aplicar(self, conn):
+        inicio = time.perf_counter()
+        for numero, sql in enumerate(self.pasos, 1):
+            with transaccion(conn):
+                if version_actual(conn) >= self.version:
+                    return False
+                conn.execute(sql)
+                if numero == len(self.pasos):
+                    self._registrar(conn, inicio)
+        return True
+
+
+class Relleno(Migracion):
+    """UPDATE {tabla} SET {asignaciones} WHERE {condicion}, por lotes de rowid.
+
+    La condición debe ser falsa para las filas ya actualizadas: es lo que hace
+    repetible la migración y evita reescribir filas que no cambian.
+    """
+
+    def __init__(self, version, descripcion, tabla, asignaciones, condicion, lote=None):
+        super().__init__(version, descripcion)
+        self.tabla = tabla
+        self.asignaciones = asignaciones
+        self.condicion = condicion
+        self.lote = lote or TAMANO_LOTE
+
+    def aplicar(self, conn):
+        inicio = time.perf_counter()
+        if version_actual(conn) >= self.version:
+            return False
+        # NOT INDEXED: sin él, el planificador puede preferir un índice de la
+        # condición (p. ej. estado) y recorrer toda la tabla en cada lote
+        sql = f'''
+            UPDATE {self.tabla} NOT INDEXED SET {self.asignaciones}
+            WHERE rowid > ? AND rowid <= ? AND ({self.condicion})
+        '''
+        maximo = conn.execute(f'SELECT MAX(rowid) FROM {self.tabla}').fetchone()[0] or 0
+        desde = conn.execute(f'SELECT MIN(rowid) - 1 FROM {self.tabla}').fetchone()[0] or 0
+        actualizadas = 0
+        while True:
+            hasta = desde + self.lote
+            with transaccion(conn):
+                if version_actual(conn) >= self.version:
+                    return False
+                if hasta >= maximo:
+                    # Último lote: incluye lo insertado después de leer el máximo
+                    actualizadas += conn.execute(sql, (desde, 2 ** 63 - 1)).rowcount
+                    self._registrar(conn, inicio)
+                    break
+                actualizadas += conn.execute(sql, (desde, hasta)).rowcount
+            desde = hasta
+            time.sleep(PAUSA_LOTES)
+        logger.info('Relleno terminado', extra={'version': self.version, 'tabla': self.tabla,
+                                                'filas': actualizadas})
+        return True
+
+
+# --- Versión 1: el esquema que creaba init_db (idempotente sobre BD existentes)
+#
+# Todo el DDL de las migraciones publicadas va escrito aquí y no se arma con
+# constantes de los módulos (scoring, estadisticas, busqueda, sesiones...):
+# si un módulo cambia su esquema, el cambio va en una migración nueva y una
+# BD nueva sigue pasando por exactamente los mismos pasos que una vieja.
+
+ESQUEMAS_BASE = (
+    '''
+    CREATE TABLE IF NOT EXISTS analistas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT UNIQUE NOT NULL,
+        nombre TEXT NOT NULL,
+        apellido_paterno TEXT,
+        apellido_materno TEXT,
+        rfc TEXT UNIQUE NOT NULL,
+        telefono TEXT,
+        nip TEXT NOT NULL,
+        estado TEXT DEFAULT 'pendiente',
+        rol TEXT DEFAULT 'analista',
+        fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS administradores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        email TEXT,
+        fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS clientes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL,
+        apellido_paterno TEXT,
+        apellido_materno TEXT,
+        rfc TEXT UNIQUE NOT NULL,
+        telefono TEXT,
+        direccion TEXT,
+        fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        analista_id INTEGER,
+        FOREIGN KEY (analista_id) REFERENCES analistas (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS creditos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cliente_id INTEGER NOT NULL,
+        analista_id INTEGER NOT NULL,
+        monto REAL NOT NULL,
+        plazo INTEGER NOT NULL,
+        tasa_interes REAL NOT NULL,
+        estado TEXT DEFAULT 'pendiente',
+        fecha_solicitud TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        fecha_aprobacion TIMESTAMP,
+        observaciones TEXT,
+        FOREIGN KEY (cliente_id) REFERENCES clientes (id),
+        FOREIGN KEY (analista_id) REFERENCES analistas (id)
+    )
+    ''',
+)
+
+
+# Columnas agregadas sobre las tablas heredadas: las de los listados de
+# solicitudes y las de entrada y resultados del motor de scoring
+_COLUMNAS_BASE = (
+    ('clientes', (
+        ('fecha_nacimiento', 'TEXT'),
+        ('ocupacion', 'TEXT'),
+        ('fico_score', 'INTEGER'),
+        ('tdsr', 'REAL'),
+        ('estado_civil', 'TEXT'),
+        ('dependientes', 'INTEGER'),
+        ('nivel_estudios', 'TEXT'),
+        ('zona', 'TEXT'),
+        ('antiguedad_domicilio', 'REAL'),
+        ('antiguedad_empleo', 'REAL'),
+        ('ingreso_mensual', 'REAL'),
+        ('pagos_minimos', 'REAL'),
+        ('ultima_calificacion', 'TEXT'),
+        ('mop_6', 'TEXT'),
+        ('mop_12', 'TEXT'),
+        ('num_consultas', 'INTEGER'),
+    )),
+    ('creditos', (
+        ('monto_aprobado', 'REAL'),
+        ('score_cualitativo', 'INTEGER'),
+        ('score_historial', 'INTEGER'),
+        ('score_cuantitativo', 'INTEGER'),
+        ('score_total', 'INTEGER'),
+        ('recomendacion', 'TEXT'),
+    )),
+)
+
+
+def _columnas_base(conn):
+    for tabla, columnas in _COLUMNAS_BASE:
+        agregar_columnas(conn, tabla, columnas)
+
+
+# Historial de reglas, secuencias, sesiones y cola de trabajos
+ESQUEMAS_MODULOS = (
+    '''
+    CREATE TABLE IF NOT EXISTS reglas_negocio (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        reglas TEXT NOT NULL,
+        modificado_por TEXT,
+        fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS secuencias (
+        nombre TEXT PRIMARY KEY,
+        siguiente INTEGER NOT NULL
+    )
+    ''',
+    # Códigos automáticos de analista: E1000 o arriba del mayor E<n> existente
+    '''
+    INSERT OR IGNORE INTO secuencias (nombre, siguiente)
+    SELECT 'analistas', MAX(COALESCE(MAX(CAST(SUBSTR(codigo, 2) AS INTEGER)), 0) + 1, 1000)
+    FROM analistas WHERE codigo GLOB 'E[0-9]*'
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sesiones (
+        id TEXT PRIMARY KEY,
+        datos TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        expira REAL NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_sesiones_expira ON sesiones (expira)',
+    '''
+    CREATE TABLE IF NOT EXISTS configuracion (
+        clave TEXT PRIMARY KEY,
+        valor TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS trabajos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        datos TEXT NOT NULL,
+        referencia TEXT,
+        estado TEXT NOT NULL DEFAULT 'pendiente',
+        intentos INTEGER NOT NULL DEFAULT 0,
+        max_intentos INTEGER NOT NULL,
+        disponible_en REAL NOT NULL,
+        creado REAL NOT NULL,
+        iniciado REAL,
+        terminado REAL,
+        resultado TEXT,
+        error TEXT
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos (estado, disponible_en)',
+    'CREATE INDEX IF NOT EXISTS idx_trabajos_terminado ON trabajos (terminado)',
+    'CREATE INDEX IF NOT EXISTS idx_trabajos_referencia ON trabajos (referencia)',
+)
+
+# Totales por analista (estadisticas.py): una fila de creditos suma o resta
+# su contribución con un UPSERT
+_SUMAR_ESTADISTICAS = '''
+        INSERT INTO estadisticas_analista (analista_id, total, pendientes, aprobadas, rechazadas,
+                                           zona_gris, monto_solicitado, monto_aprobado)
+        VALUES ({f}.analista_id, {s} 1,
+                {s} ({f}.estado IS NULL OR {f}.estado NOT IN ('aprobado', 'rechazado', 'zona_gris')),
+                {s} ({f}.estado = 'aprobado'), {s} ({f}.estado = 'rechazado'), {s} ({f}.estado = 'zona_gris'),
+                {s} COALESCE({f}.monto, 0),
+                {s} COALESCE({f}.monto_aprobado, CASE WHEN {f}.estado = 'aprobado' THEN {f}.monto END, 0))
+        ON CONFLICT (analista_id) DO UPDATE SET
+            total = total + excluded.total, pendientes = pendientes + excluded.pendientes,
+            aprobadas = aprobadas + excluded.aprobadas, rechazadas = rechazadas + excluded.rechazadas,
+            zona_gris = zona_gris + excluded.zona_gris,
+            monto_solicitado = monto_solicitado + excluded.monto_solicitado,
+            monto_aprobado = monto_aprobado + excluded.monto_aprobado;
+'''
+_MAS_NEW = _SUMAR_ESTADISTICAS.format(f='NEW', s='+1 *')
+_MENOS_OLD = _SUMAR_ESTADISTICAS.format(f='OLD', s='-1 *')
+
+ESQUEMAS_ESTADISTICAS = (
+    '''
+    CREATE TABLE IF NOT EXISTS estadisticas_analista (
+        analista_id INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        pendientes INTEGER NOT NULL DEFAULT 0,
+        aprobadas INTEGER NOT NULL DEFAULT 0,
+        rechazadas INTEGER NOT NULL DEFAULT 0,
+        zona_gris INTEGER NOT NULL DEFAULT 0,
+        monto_solicitado REAL NOT NULL DEFAULT 0,
+        monto_aprobado REAL NOT NULL DEFAULT 0
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_insert AFTER INSERT ON creditos
+    BEGIN {_MAS_NEW} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_delete AFTER DELETE ON creditos
+    BEGIN {_MENOS_OLD} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_update
+    AFTER UPDATE OF estado, monto, monto_aprobado, analista_id ON creditos
+    WHEN OLD.estado IS NOT NEW.estado OR OLD.monto IS NOT NEW.monto
+      OR OLD.monto_aprobado IS NOT NEW.monto_aprobado OR OLD.analista_id IS NOT NEW.analista_id
+    BEGIN {_MENOS_OLD} {_MAS_NEW} END
+    ''',
+)
+
+_LLENAR_ESTADISTICAS = '''
+    INSERT INTO estadisticas_analista (analista_id, total, pendientes, aprobadas, rechazadas,
+                                       zona_gris, monto_solicitado, monto_aprobado)
+    SELECT analista_id, COUNT(*),
+           SUM(estado IS NULL OR estado NOT IN ('aprobado', 'rechazado', 'zona_gris')),
+           SUM(estado = 'aprobado'), SUM(estado = 'rechazado'), SUM(estado = 'zona_gris'),
+           SUM(COALESCE(monto, 0)),
+           SUM(COALESCE(monto_aprobado, CASE WHEN estado = 'aprobado' THEN monto END, 0))
+    FROM creditos GROUP BY analista_id
+'''
+
+
+def _estadisticas(conn):
+    existia = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'estadisticas_analista'"
+    ).fetchone()
+    for sql in ESQUEMAS_ESTADISTICAS:
+        conn.execute(sql)
+    if not existia:
+        conn.execute(_LLENAR_ESTADISTICAS)
+
+
+# Índices FTS5 de clientes y analistas (busqueda.py): el contenido se lee de
+# una vista que antepone '0' a RFC y código; <índice>_nombres cuenta los
+# nombres y apellidos distintos y tiene su propio índice FTS5.
+# {tabla}: clientes o analistas; {columnas}: las indexadas, en orden;
+# {valores}: las mismas con el prefijo {f} (NEW, OLD o vacío) y la marca '0'
+_CONTAR_NOMBRES = '''
+        INSERT INTO {tabla}_nombres (valor, veces) SELECT NEW.nombre, 1 WHERE NEW.nombre <> ''
+        ON CONFLICT (valor) DO UPDATE SET veces = veces + 1;
+        INSERT INTO {tabla}_nombres (valor, veces) SELECT NEW.apellido_paterno, 1 WHERE NEW.apellido_paterno <> ''
+        ON CONFLICT (valor) DO UPDATE SET veces = veces + 1;
+        INSERT INTO {tabla}_nombres (valor, veces) SELECT NEW.apellido_materno, 1 WHERE NEW.apellido_materno <> ''
+        ON CONFLICT (valor) DO UPDATE SET veces = veces + 1;
+'''
+_DESCONTAR_NOMBRES = '''
+        UPDATE {tabla}_nombres SET veces = veces - 1 WHERE valor = OLD.nombre;
+        UPDATE {tabla}_nombres SET veces = veces - 1 WHERE valor = OLD.apellido_paterno;
+        UPDATE {tabla}_nombres SET veces = veces - 1 WHERE valor = OLD.apellido_materno;
+        DELETE FROM {tabla}_nombres WHERE veces <= 0;
+'''
+_INDEXAR = '''
+        INSERT INTO {tabla}_fts (rowid, {columnas}) VALUES (NEW.id, {nuevos});''' + _CONTAR_NOMBRES
+_DESINDEXAR = '''
+        INSERT INTO {tabla}_fts ({tabla}_fts, rowid, {columnas}) VALUES ('delete', OLD.id, {viejos});''' \
+    + _DESCONTAR_NOMBRES
+
+_ESQUEMAS_BUSQUEDA = (
+    '''
+    CREATE VIEW IF NOT EXISTS {tabla}_fts_contenido (id, {columnas}) AS
+    SELECT id, {valores} FROM {tabla}
+    ''',
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {tabla}_fts USING fts5(
+        {columnas}, content='{tabla}_fts_contenido', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS {tabla}_nombres (
+        id INTEGER PRIMARY KEY,
+        valor TEXT UNIQUE NOT NULL,
+        veces INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {tabla}_nombres_fts USING fts5(
+        valor, content='{tabla}_nombres', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    'CREATE VIRTUAL TABLE IF NOT EXISTS {tabla}_nombres_vocab USING fts5vocab({tabla}_nombres_fts, row)',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_{tabla}_nombres_insert AFTER INSERT ON {tabla}_nombres
+    BEGIN INSERT INTO {tabla}_nombres_fts (rowid, valor) VALUES (NEW.id, NEW.valor); END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_{tabla}_nombres_delete AFTER DELETE ON {tabla}_nombres
+    BEGIN INSERT INTO {tabla}_nombres_fts ({tabla}_nombres_fts, rowid, valor) VALUES ('delete', OLD.id, OLD.valor); END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_{tabla}_fts_insert AFTER INSERT ON {tabla}
+    BEGIN ''' + _INDEXAR + ''' END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_{tabla}_fts_delete AFTER DELETE ON {tabla}
+    BEGIN ''' + _DESINDEXAR + ''' END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_{tabla}_fts_update AFTER UPDATE OF {columnas} ON {tabla}
+    BEGIN ''' + _DESINDEXAR + _INDEXAR + ''' END
+    ''',
+)
+
+_LLENAR_BUSQUEDA = (
+    "INSERT INTO {tabla}_fts ({tabla}_fts) VALUES ('rebuild')",
+    '''
+    INSERT INTO {tabla}_nombres (valor, veces)
+    SELECT valor, count(*) FROM (
+        SELECT nombre AS valor FROM {tabla} UNION ALL
+        SELECT apellido_paterno AS valor FROM {tabla} UNION ALL
+        SELECT apellido_materno AS valor FROM {tabla}
+    )
+    WHERE valor <> ''
+    GROUP BY valor
+    ''',
+)
+
+# tabla -> (columnas indexadas, columnas del contenido con la marca '0', sus valores en NEW/OLD)
+_INDICES_BUSQUEDA = {
+    'clientes': ('nombre, apellido_paterno, apellido_materno, rfc, telefono',
+                 "nombre, apellido_paterno, apellido_materno, '0' || rfc, telefono",
+                 "{f}.nombre, {f}.apellido_paterno, {f}.apellido_materno, '0' || {f}.rfc, {f}.telefono"),
+    'analistas': ('codigo, nombre, apellido_paterno, apellido_materno, rfc, telefono',
+                  "'0' || codigo, nombre, apellido_paterno, apellido_materno, '0' || rfc, telefono",
+                  "'0' || {f}.codigo, {f}.nombre, {f}.apellido_paterno, {f}.apellido_materno, "
+                  "'0' || {f}.rfc, {f}.telefono"),
+}
+
+
+def _busqueda(conn):
+    for tabla, (columnas, valores, con_fila) in _INDICES_BUSQUEDA.items():
+        existia = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                               (f'{tabla}_fts',)).fetchone()
+        partes = {'tabla': tabla, 'columnas': columnas, 'valores': valores,
+                  'nuevos': con_fila.format(f='NEW'), 'viejos': con_fila.format(f='OLD')}
+        for sql in _ESQUEMAS_BUSQUEDA:
+            conn.execute(sql.format(**partes))
+        if not existia:
+            for sql in _LLENAR_BUSQUEDA:
+                conn.execute(sql.format(**partes))
+
+
+def _normalizar_analistas(conn):
+    """Códigos y datos heredados de analistas como los guarda guardar_analista: el
+    login busca el código por igualdad exacta y modelos.Analista no limpia al leer.
+
+    Código y RFC son UNIQUE: con UPDATE OR IGNORE solo se salta la fila que
+    choca con otra ya normalizada (se reporta para corregirla a mano) y el
+    resto de la tabla se normaliza igual.
+    """
+    for columna in ('codigo', 'rfc'):
+        conn.execute(f'''
+            UPDATE OR IGNORE analistas SET {columna} = UPPER(TRIM({columna}))
+            WHERE {columna} <> UPPER(TRIM({columna}))
+        ''')
+        chocan = conn.execute(f'''
+            SELECT id, {columna} FROM analistas WHERE {columna} <> UPPER(TRIM({columna}))
+        ''').fetchall()
+        if chocan:
+            logger.warning('Analistas sin normalizar por duplicado', extra={
+                'columna': columna, 'analistas': [{'id': id_, columna: valor} for id_, valor in chocan]})
+    conn.execute('''
+        UPDATE analistas SET
+            apellido_paterno = COALESCE(apellido_paterno, ''),
+            apellido_materno = COALESCE(apellido_materno, ''),
+            telefono = COALESCE(telefono, ''),
+            nip = TRIM(nip),
+            estado = LOWER(TRIM(COALESCE(estado, 'pendiente'))),
+            rol = TRIM(COALESCE(rol, 'analista')),
+            fecha_registro = COALESCE(fecha_registro, CURRENT_TIMESTAMP)
+        WHERE apellido_paterno IS NULL OR apellido_materno IS NULL OR telefono IS NULL
+           OR nip <> TRIM(nip) OR estado IS NULL OR estado <> LOWER(TRIM(estado))
+           OR rol IS NULL OR rol <> TRIM(rol) OR fecha_registro IS NULL
+    ''')
+
+
+def _administrador_por_defecto(conn):
+    """Administrador admin/admin123 y su analista RAG123 (NIP 1234) en una BD nueva"""
+    if conn.execute('SELECT COUNT(*) FROM administradores').fetchone()[0]:
+        return
+    conn.execute('INSERT INTO administradores (username, password, email) VALUES (?, ?, ?)',
+                 ('admin', generate_password_hash('admin123'), 'admin@sistema.com'))
+    conn.execute('''
+        INSERT OR IGNORE INTO analistas (codigo, nombre, apellido_paterno, apellido_materno,
+                                         rfc, telefono, nip, estado, rol)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ('RAG123', 'Administrador', 'Sistema', '', 'ADMIN123456RF',
+          '5555555555', credenciales.hashear_nip('1234'), 'aprobado', 'admin'))
+    logger.info('Administrador por defecto creado')
+
+
+# --- Versiones 4 y 5: datos de la evaluación que las plantillas ya mostraban
+
+COLUMNAS_DECISION = [
+    ('justificacion', 'TEXT'),
+    ('motivo_rechazo', 'TEXT'),
+] + [(validacion, 'INTEGER NOT NULL DEFAULT 0')
+     for validacion in ('firma_solicitud', 'validacion_id', 'validacion_domicilio', 'validacion_ingresos',
+                        'comprobante_ingresos', 'validacion_csf', 'validacion_carta_sic')]
+
+# tomar_decision guardaba "[motivo] justificación" en observaciones
+_CON_MOTIVO = "estado = 'rechazado' AND observaciones GLOB '[[]?*] *'"
+
+
+# --- Versión 6: contadores por tabla y partición (id % 64) de cache_lectura.py
+
+ESQUEMAS_CACHE = (
+    '''
+    CREATE TABLE IF NOT EXISTS cache_versiones (
+        entidad TEXT NOT NULL,
+        particion INTEGER NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (entidad, particion)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    WITH RECURSIVE particiones (n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM particiones WHERE n < 63)
+    INSERT OR IGNORE INTO cache_versiones (entidad, particion)
+    SELECT entidad, n FROM particiones,
+        (SELECT 'analistas' AS entidad UNION ALL SELECT 'clientes' UNION ALL SELECT 'creditos')
+    ''',
+) + tuple(
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_cache_{tabla}_{evento.lower()} AFTER {evento} ON {tabla}
+    BEGIN
+        UPDATE cache_versiones SET version = version + 1
+        WHERE entidad = '{tabla}' AND particion = OLD.id % 64;
+    END
+    '''
+    for tabla in ('analistas', 'clientes', 'creditos') for evento in ('UPDATE', 'DELETE')
+)
+
+
+MIGRACIONES = (
+    Migracion(1, 'Esquema base', *ESQUEMAS_BASE, _columnas_base, *ESQUEMAS_MODULOS,
+              _estadisticas, _busqueda, _normalizar_analistas, _administrador_por_defecto),
+    Indices(2, 'Índices de paginación de solicitudes',
+            'CREATE INDEX IF NOT EXISTS idx_creditos_analista_estado_fecha '
+            'ON creditos (analista_id, estado, fecha_solicitud)',
+            'CREATE INDEX IF NOT EXISTS idx_creditos_estado_fecha ON creditos (estado, fecha_solicitud)',
+            'CREATE INDEX IF NOT EXISTS idx_creditos_analista_fecha ON creditos (analista_id, fecha_solicitud)',
+            'CREATE INDEX IF NOT EXISTS idx_creditos_fecha ON creditos (fecha_solicitud)'),
+    Indices(3, 'Índices de analistas por fecha y de créditos por cliente',
+            'CREATE INDEX IF NOT EXISTS idx_analistas_fecha_registro ON analistas (fecha_registro)',
+            'CREATE INDEX IF NOT EXISTS idx_creditos_cliente ON creditos (cliente_id)'),
+    Migracion(4, 'Validaciones, justificación y motivo de rechazo en creditos',
+              lambda conn: agregar_columnas(conn, 'creditos', COLUMNAS_DECISION)),
+    Relleno(5, 'Justificación y motivo de rechazo desde observaciones', 'creditos',
+            asignaciones=f'''
+                motivo_rechazo = CASE WHEN {_CON_MOTIVO}
+                    THEN substr(observaciones, 2, instr(observaciones, ']') - 2) END,
+                justificacion = CASE WHEN {_CON_MOTIVO}
+                    THEN substr(observaciones, instr(observaciones, ']') + 2) ELSE observaciones END
+            ''',
+            condicion=f"justificacion IS NULL AND observaciones <> '' "
+                      "AND estado IN ('aprobado', 'rechazado', 'zona_gris')"),
+    Migracion(6, 'Versiones de la caché de lectura', *ESQUEMAS_CACHE),
+    Migracion(7, 'Número de solicitud único (envíos idempotentes de nueva_solicitud)',
+              lambda conn: agregar_columnas(conn, 'creditos', [('numero_solicitud', 'TEXT'),
+                                                               ('huella_envio', 'TEXT')]),
+              'CREATE UNIQUE INDEX IF NOT EXISTS idx_creditos_numero_solicitud '
+              'ON creditos (numero_solicitud) WHERE numero_solicitud IS NOT NULL',
+              "INSERT OR IGNORE INTO secuencias (nombre, siguiente) VALUES ('solicitudes', 1)"),
+)
+VERSION = MIGRACIONES[-1].version
+
+
+def aplicar(conn, migraciones=MIGRACIONES):
+    """Aplicar las migraciones pendientes y regresar la versión resultante.
+
+    Con la BD al día es una sola lectura de PRAGMA user_version. Un error se
+    registra y se propaga: la aplicación no debe arrancar con un esquema a medias.
+    """
+    actual = version_actual(conn)
+    pendientes = [m for m in migraciones if m.version > actual]
+    if not pendientes:
+        return actual
+    conn.execute(ESQUEMA)
+    for migracion in pendientes:
+        datos = {'version': migracion.version, 'descripcion': migracion.descripcion}
+        try:
+            aplicada = migracion.aplicar(conn)
+        except Exception:
+            logger.exception('Falló la migración', extra=datos)
+            raise
+        if aplicada:
+            logger.info('Migración aplicada', extra=datos)
+    return version_actual(conn)
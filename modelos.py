@@ -0,0 +1,114 @@
+"""Modelos de dominio: analistas, clientes y solicitudes (créditos).
+
+Dataclasses con __slots__: una instancia ocupa bastante menos que un dict con
+las mismas llaves y los campos quedan tipados. Las plantillas los leen igual
+que antes (solicitud.cliente.nombre); el código de Python usa atributos.
+
+Los datos se normalizan al escribir (guardar_analista, importacion_analistas
+y la migración 1 de migraciones.py), así que construir un modelo desde una fila es
+solo copiar columnas, sin strip()/upper() en cada lectura.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+# Columnas de analistas en el orden de los campos de Analista
+COLUMNAS_ANALISTA = ('id, codigo, nombre, apellido_paterno, apellido_materno, rfc, '
+                     'telefono, nip, estado, rol, fecha_registro')
+
+# Estados con decisión tomada; cualquier otro se muestra como "En Proceso"
+ESTADOS_DECISION = ('aprobado', 'rechazado', 'zona_gris')
+
+# Documentos verificados al capturar la solicitud (columnas 0/1 de creditos)
+VALIDACIONES = ('firma_solicitud', 'validacion_id', 'validacion_domicilio', 'validacion_ingresos',
+                'comprobante_ingresos', 'validacion_csf', 'validacion_carta_sic')
+
+
+@dataclass(slots=True)
+class Analista:
+    id: int
+    codigo: str
+    nombre: str
+    apellido_paterno: str
+    apellido_materno: str
+    rfc: str
+    telefono: str
+    nip: str = field(repr=False)
+    estado: str
+    rol: str
+    fecha_registro: str
+
+    @classmethod
+    def desde_fila(cls, fila):
+        """Fila de SELECT COLUMNAS_ANALISTA FROM analistas"""
+        return cls(*fila)
+
+
+@dataclass(slots=True)
+class Cliente:
+    id: int
+    nombre: str
+    apellido_paterno: str
+    apellido_materno: str
+    rfc: str
+    telefono: str
+    edad: Optional[int]
+    ocupacion: str
+    fico_score: Optional[int]
+    tdsr: Optional[float]
+    estado_civil: str
+    dependientes: Optional[int]
+    nivel_estudios: str
+    zona: str
+    antiguedad_domicilio: Optional[float]
+    antiguedad_empleo: Optional[float]
+    ingreso_mensual: Optional[float]
+    pagos_minimos: Optional[float]
+
+
+@dataclass(slots=True)
+class Solicitud:
+    """Un crédito con los datos de su cliente (ver solicitudes.fila_a_solicitud)"""
+    id: int
+    analista_id: Optional[int]
+    analista_codigo: str
+    monto_solicitado: Optional[float]
+    monto_aprobado: Optional[float]
+    plazo: Optional[int]
+    tasa_interes: Optional[float]
+    estado: str
+    fecha_solicitud: Optional[datetime]
+    fecha_decision: Optional[datetime]
+    observaciones: str
+    justificacion: str
+    motivo_rechazo: str
+    firma_solicitud: bool
+    validacion_id: bool
+    validacion_domicilio: bool
+    validacion_ingresos: bool
+    comprobante_ingresos: bool
+    validacion_csf: bool
+    validacion_carta_sic: bool
+    ultima_calificacion: Optional[str]
+    mop_6: Optional[str]
+    mop_12: Optional[str]
+    num_consultas: Optional[int]
+    score_cualitativo: Optional[int]
+    score_historial: Optional[int]
+    score_cuantitativo: Optional[int]
+    score_total: Optional[int]
+    recomendacion: Optional[str]
+    cliente: Optional[Cliente]
+
+    @property
+    def numero(self):
+        return f'S-{self.id:05d}'
+
+    @property
+    def decision(self):
+        """Estado con decisión tomada; None mientras está en proceso"""
+        return self.estado if self.estado in ESTADOS_DECISION else None
+
+    @property
+    def plazo_meses(self):
+        return self.plazo
@@ -0,0 +1,141 @@
+"""Compilación de plantillas, fragmentos en caché y archivos estáticos con huella.
+
+Tres piezas, todas instaladas por configurar(app):
+
+  - Bytecode: las plantillas compiladas se guardan en JINJA_CACHE_DIR
+    (FileSystemBytecodeCache de Jinja), así que un worker nuevo o un reinicio
+    las carga sin volver a compilar. create_app() llama a precompilar() antes
+    del fork, de modo que los workers heredan además las plantillas ya cargadas.
+
+  - Fragmentos: {% fragmento 'nombre', clave, ... %}...{% endfragmento %}
+    guarda el HTML renderizado de una sección en un LRU por proceso. Las
+    claves deben incluir todo aquello de lo que depende el contenido (versión
+    de las reglas, tipo de usuario); lo demás se considera estático. Si la
+    plantilla se vuelve a compilar, sus fragmentos anteriores dejan de usarse.
+
+  - Estáticos: asset('css/x.css') da la URL con ?v=<huella del contenido>.
+    Esas respuestas se sirven con Cache-Control inmutable por un año: cuando
+    el archivo cambia, cambia la URL.
+"""
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from flask import current_app, request, url_for
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+# Sin JINJA_CACHE_DIR Jinja usa un directorio privado del usuario en /tmp
+CACHE_DIR = os.environ.get('JINJA_CACHE_DIR')
+FRAGMENTOS_ACTIVOS = os.environ.get('PLANTILLAS_FRAGMENTOS', '1') != '0'
+FRAGMENTOS_MAX = int(os.environ.get('PLANTILLAS_FRAGMENTOS_MAX', 512))
+MAX_AGE_ESTATICOS = 365 * 24 * 3600
+
+
+class CacheFragmentos:
+    """LRU de HTML renderizado; clave = (compilación, nombre, claves...)"""
+
+    def __init__(self, max_entradas=FRAGMENTOS_MAX, activa=FRAGMENTOS_ACTIVOS):
+        self.max_entradas = max_entradas
+        self.activa = activa
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, renderizar):
+        if not self.activa:
+            return renderizar()
+        with self._lock:
+            html = self._entradas.get(clave)
+            if html is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return html
+            self.fallos += 1
+        # Se renderiza fuera del lock; si dos hilos coinciden, ambos guardan lo mismo
+        html = renderizar()
+        with self._lock:
+            self._entradas[clave] = html
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return html
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+class ExtensionFragmentos(Extension):
+    """Etiqueta {% fragmento 'nombre'[, clave...] %}...{% endfragmento %}"""
+
+    tags = {'fragmento'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragmentos=CacheFragmentos())
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        # Identifica esta compilación: si la plantilla cambia, cambia la clave
+        claves = [nodes.Const(f'{parser.name}:{lineno}:{uuid.uuid4().hex}'), parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            claves.append(parser.parse_expression())
+        cuerpo = parser.parse_statements(('name:endfragmento',), drop_needle=True)
+        llamada = self.call_method('_renderizar', [nodes.Tuple(claves, 'load')])
+        return nodes.CallBlock(llamada, [], [], cuerpo).set_lineno(lineno)
+
+    def _renderizar(self, clave, caller):
+        return self.environment.fragmentos.obtener(clave, caller)
+
+
+_huellas = {}   # ruta -> (mtime_ns, huella)
+
+
+def huella(ruta):
+    """Primeros 12 hex del SHA-256 del archivo estático; se recalcula si cambia su mtime"""
+    archivo = os.path.join(current_app.static_folder, ruta)
+    mtime = os.stat(archivo).st_mtime_ns
+    conocida = _huellas.get(ruta)
+    if conocida is None or conocida[0] != mtime:
+        with open(archivo, 'rb') as f:
+            conocida = _huellas[ruta] = (mtime, hashlib.sha256(f.read()).hexdigest()[:12])
+    return conocida[1]
+
+
+def asset(ruta):
+    """URL de un archivo de static/ con su huella (para caché inmutable)"""
+    return url_for('static', filename=ruta, v=huella(ruta))
+
+
+def _cabeceras_estaticos(response):
+    if request.endpoint == 'static' and 'v' in request.args and response.status_code in (200, 304):
+        response.cache_control.public = True
+        response.cache_control.max_age = MAX_AGE_ESTATICOS
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
+
+
+def precompilar(app):
+    """Cargar todas las plantillas en este proceso (y en la caché de bytecode)"""
+    entorno = app.jinja_env
+    nombres = entorno.list_templates(extensions=('html',))
+    for nombre in nombres:
+        entorno.get_template(nombre)
+    return len(nombres)
+
+
+def configurar(app, directorio=CACHE_DIR):
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directorio)
+    app.jinja_env.add_extension(ExtensionFragmentos)
+    app.jinja_env.globals['asset'] = asset
+    app.after_request(_cabeceras_estaticos)
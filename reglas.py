@@ -0,0 +1,147 @@
+"""Reglas de negocio versionadas con caché en memoria.
+
+Cada vez que un administrador guarda las reglas se inserta una versión nueva
+en `reglas_negocio`; la vigente es la de número mayor. Cada proceso guarda la
+versión vigente en memoria y solo consulta a la BD, como mucho una vez cada
+`intervalo` segundos, si el número de versión cambió. Así la evaluación y el
+scoring leen las reglas sin ir a la BD y un cambio llega a todos los workers
+en a lo más `intervalo` segundos, sin reiniciar.
+"""
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+import scoring
+
+INTERVALO_VERIFICACION = float(os.environ.get('REGLAS_INTERVALO_S', 5))
+
+# clave -> (etiqueta, tipo, mínimo, máximo)
+CAMPOS = {
+    'fico_aprobacion': ('Score FICO Mínimo', int, 300, 850),
+    'tdsr_aprobacion': ('TDSR Máximo (%)', float, 0, 100),
+    'score_aprobacion': ('Score Total Mínimo', int, 0, scoring.MAX_TOTAL),
+    'antiguedad_minima': ('Antigüedad Laboral Mínima (años)', float, 0, 50),
+    'fico_rechazo': ('FICO de Rechazo Automático', int, 300, 850),
+    'tdsr_rechazo': ('TDSR de Rechazo Automático (%)', float, 0, 100),
+    'score_rechazo': ('Score Total de Rechazo Automático', int, 0, scoring.MAX_TOTAL),
+    'tasa_base': ('Tasa Base (%)', float, 0, 100),
+    'tasa_premium': ('Tasa Premium (%)', float, 0, 100),
+    'tasa_subprime': ('Tasa Subprime (%)', float, 0, 100),
+    'tasa_sugerida': ('Tasa Sugerida en Aprobación (%)', float, 0, 100),
+    'cat_maximo': ('CAT Máximo (%)', float, 0, 200),
+}
+
+POR_DEFECTO = dict(
+    scoring.UMBRALES,
+    tasa_base=15.5,
+    tasa_premium=12.0,
+    tasa_subprime=22.0,
+    tasa_sugerida=26.5,
+    cat_maximo=35.0,
+    # Referencia para el analista: la recomendación automática no la exige
+    antiguedad_minima=2,
+)
+
+
+def validar(formulario):
+    """Convertir y validar los valores del formulario.
+
+    Regresa (reglas, errores); los campos ausentes conservan el valor por defecto.
+    """
+    reglas, errores = dict(POR_DEFECTO), []
+    for clave, (etiqueta, tipo, minimo, maximo) in CAMPOS.items():
+        crudo = (formulario.get(clave) or '').strip()
+        if not crudo:
+            continue
+        try:
+            valor = tipo(float(crudo))
+        except ValueError:
+            errores.append(f'{etiqueta}: valor no numérico')
+            continue
+        if not minimo <= valor <= maximo:
+            errores.append(f'{etiqueta}: debe estar entre {minimo} y {maximo}')
+            continue
+        reglas[clave] = valor
+
+    if reglas['fico_rechazo'] > reglas['fico_aprobacion']:
+        errores.append('El FICO de rechazo no puede ser mayor que el FICO mínimo')
+    if reglas['tdsr_rechazo'] < reglas['tdsr_aprobacion']:
+        errores.append('El TDSR de rechazo no puede ser menor que el TDSR máximo')
+    if reglas['score_rechazo'] > reglas['score_aprobacion']:
+        errores.append('El score de rechazo no puede ser mayor que el score mínimo')
+    return reglas, errores
+
+
+def version_vigente(conn):
+    return conn.execute('SELECT MAX(version) FROM reglas_negocio').fetchone()[0] or 0
+
+
+def cargar_vigentes(conn):
+    """(version, reglas) vigentes; versión 0 con los valores por defecto si no hay ninguna"""
+    row = conn.execute('''
+        SELECT version, reglas, modificado_por, fecha FROM reglas_negocio
+        ORDER BY version DESC LIMIT 1
+    ''').fetchone()
+    if row is None:
+        return 0, dict(POR_DEFECTO, modificado_por=None, fecha=None)
+    # Las claves nuevas que no existían al guardar la versión toman su valor por defecto
+    reglas = dict(POR_DEFECTO, **json.loads(row[1]))
+    reglas.update(modificado_por=row[2], fecha=row[3])
+    return row[0], reglas
+
+
+def guardar(conn, reglas, modificado_por=None):
+    """Insertar una versión nueva de las reglas y regresar su número"""
+    datos = {clave: reglas[clave] for clave in CAMPOS}
+    cursor = conn.execute(
+        'INSERT INTO reglas_negocio (reglas, modificado_por) VALUES (?, ?)',
+        (json.dumps(datos), modificado_por),
+    )
+    return cursor.lastrowid
+
+
+class CacheReglas:
+    """Reglas vigentes del proceso, verificadas contra la BD por intervalos.
+
+    `obtener_conexion` es un callable que regresa un context manager de
+    conexión (como app.get_db).
+    """
+
+    def __init__(self, obtener_conexion, intervalo=INTERVALO_VERIFICACION):
+        self._obtener_conexion = obtener_conexion
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        # (version, reglas, momento de la última verificación)
+        self._estado = (None, None, 0.0)
+        self.recargas = 0
+        self.verificaciones = 0
+
+    def obtener(self):
+        """Reglas vigentes como mapeo de solo lectura"""
+        version, reglas, verificado = self._estado
+        if reglas is not None and time.monotonic() - verificado < self.intervalo:
+            return reglas
+        return self._verificar()
+
+    def _verificar(self):
+        with self._lock:
+            version, reglas, verificado = self._estado
+            # Otro hilo pudo verificar mientras se esperaba el lock
+            if reglas is not None and time.monotonic() - verificado < self.intervalo:
+                return reglas
+            with self._obtener_conexion() as conn:
+                self.verificaciones += 1
+                if reglas is None or version_vigente(conn) != version:
+                    version, datos = cargar_vigentes(conn)
+                    reglas = MappingProxyType(dict(datos, version=version))
+                    self.recargas += 1
+            self._estado = (version, reglas, time.monotonic())
+            return reglas
+
+    def invalidar(self):
+        """Forzar la verificación en la siguiente lectura (p. ej. tras guardar)"""
+        with self._lock:
+            version, reglas, _ = self._estado
+            self._estado = (version, reglas, 0.0)
@@ -0,0 +1,189 @@
+"""Generación y validación de RFC de personas físicas.
+
+Las reglas del SAT (limpieza de nombres, palabras inconvenientes, dígito
+verificador) se precompilan al importar el módulo: expresiones regulares,
+tablas de traducción y conjuntos, de modo que procesar un lote de miles de
+registros es un ciclo de operaciones de cadena sin trabajo repetido.
+"""
+import json
+import re
+from datetime import date
+
+MAX_LOTE = 5000
+
+# Estructura: 4 letras, fecha AAMMDD, homoclave de 2 y dígito verificador
+_ESTRUCTURA = re.compile(
+    r'^[A-ZÑ&]{4}(\d{2})(0[1-9]|1[0-2])(0[1-9]|[12]\d|3[01])[A-Z\d]{2}[\dA]$'
+)
+_HOMOCLAVE = re.compile(r'^[A-Z\d]{2}[\dA]?$')
+_NO_LETRAS = re.compile(r'[^A-ZÑ& ]+')
+_ESPACIOS = re.compile(r'\s+')
+
+_SIN_ACENTOS = str.maketrans('ÁÉÍÓÚÀÈÌÒÙÄËÏÖÜÂÊÎÔÛ', 'AEIOUAEIOUAEIOUAEIOU')
+_VOCALES = frozenset('AEIOU')
+
+# Partículas que se omiten en nombres y apellidos
+_PARTICULAS = frozenset({
+    'DA', 'DAS', 'DE', 'DEL', 'DER', 'DI', 'DIE', 'DD', 'EL', 'LA', 'LOS', 'LAS',
+    'LE', 'LES', 'MAC', 'MC', 'VAN', 'VON', 'Y',
+})
+# Si el nombre es compuesto y empieza con alguno de estos se usa el segundo
+_NOMBRES_COMUNES = frozenset({'MARIA', 'MA', 'JOSE', 'J'})
+
+_INCONVENIENTES = frozenset({
+    'BUEI', 'BUEY', 'CACA', 'CACO', 'CAGA', 'CAGO', 'CAKA', 'CAKO', 'COGE', 'COJA',
+    'COJE', 'COJI', 'COJO', 'CULO', 'FETO', 'GUEY', 'JOTO', 'KACA', 'KACO', 'KAGA',
+    'KAGO', 'KOGE', 'KOJO', 'KAKA', 'KULO', 'MAME', 'MAMO', 'MEAR', 'MEAS', 'MEON',
+    'MION', 'MOCO', 'MULA', 'PEDA', 'PEDO', 'PENE', 'PUTA', 'PUTO', 'QULO', 'RATA', 'RUIN',
+})
+
+_VALORES_DIGITO = {c: i for i, c in enumerate('0123456789ABCDEFGHIJKLMN&OPQRSTUVWXYZ Ñ')}
+
+
+def _limpiar(texto):
+    """Mayúsculas sin acentos ni partículas, como lista de palabras"""
+    texto = _NO_LETRAS.sub(' ', (texto or '').upper().translate(_SIN_ACENTOS))
+    palabras = _ESPACIOS.split(texto.strip())
+    return [p for p in palabras if p and p not in _PARTICULAS]
+
+
+def _primera_vocal_interna(palabra):
+    for letra in palabra[1:]:
+        if letra in _VOCALES:
+            return letra
+    return 'X'
+
+
+def digito_verificador(rfc12):
+    """Dígito verificador de los primeros 12 caracteres del RFC"""
+    suma = sum(_VALORES_DIGITO.get(c, 0) * (13 - i) for i, c in enumerate(rfc12))
+    residuo = suma % 11
+    if residuo == 0:
+        return '0'
+    digito = 11 - residuo
+    return 'A' if digito == 10 else str(digito)
+
+
+def parsear_fecha(valor):
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(str(valor or '').strip()[:10])
+    except ValueError:
+        return None
+
+
+def calcular_edad(nacimiento, hoy=None):
+    hoy = hoy or date.today()
+    return hoy.year - nacimiento.year - ((hoy.month, hoy.day) < (nacimiento.month, nacimiento.day))
+
+
+def base_rfc(nombre, apellido_paterno, apellido_materno, nacimiento):
+    """Primeros 10 caracteres: 4 letras del nombre y la fecha AAMMDD"""
+    nombres = _limpiar(nombre)
+    paterno = ''.join(_limpiar(apellido_paterno)[:1])
+    materno = ''.join(_limpiar(apellido_materno)[:1])
+    if len(nombres) > 1 and nombres[0] in _NOMBRES_COMUNES:
+        nombres = nombres[1:]
+    nombre = nombres[0] if nombres else ''
+    if not paterno and materno:
+        paterno, materno = materno, ''
+    if not paterno or not nombre:
+        return None
+
+    if not materno:
+        letras = paterno[0] + _primera_vocal_interna(paterno) + nombre[:2]
+    elif len(paterno) <= 2:
+        letras = paterno[0] + materno[0] + nombre[:2]
+    else:
+        letras = paterno[0] + _primera_vocal_interna(paterno) + materno[0] + nombre[0]
+    letras = letras.ljust(4, 'X').replace('Ñ', 'X')
+    if letras in _INCONVENIENTES:
+        letras = letras[:3] + 'X'
+    return letras + nacimiento.strftime('%y%m%d')
+
+
+def validar_rfc(rfc):
+    """Lista de errores del RFC (vacía si es válido)"""
+    rfc = (rfc or '').strip().upper()
+    coincidencia = _ESTRUCTURA.match(rfc)
+    if not coincidencia:
+        return ['Estructura inválida (se esperan 4 letras, fecha AAMMDD y homoclave de 3)']
+    anio, mes, dia = (int(g) for g in coincidencia.groups())
+    errores = []
+    try:
+        date(2000 + anio, mes, dia)
+    except ValueError:
+        errores.append('La fecha del RFC no existe')
+    if digito_verificador(rfc[:12]) != rfc[12]:
+        errores.append('Dígito verificador incorrecto')
+    return errores
+
+
+def procesar_registro(registro, hoy=None):
+    """Generar (o validar, si trae `rfc`) el RFC de un registro.
+
+    Regresa un dict con rfc, edad, valido y errores.
+    """
+    errores = []
+    nacimiento = parsear_fecha(registro.get('fecha_nacimiento'))
+    edad = calcular_edad(nacimiento, hoy) if nacimiento else None
+
+    rfc = (registro.get('rfc') or '').strip().upper()
+    if not rfc:
+        homoclave = (registro.get('homoclave') or '').strip().upper()
+        if not nacimiento:
+            errores.append('Fecha de nacimiento inválida')
+        if not _HOMOCLAVE.match(homoclave):
+            errores.append('Homoclave inválida (2 o 3 caracteres alfanuméricos)')
+        base = base_rfc(registro.get('nombre'), registro.get('apellido_paterno'),
+                        registro.get('apellido_materno'), nacimiento) if nacimiento else None
+        if nacimiento and base is None:
+            errores.append('Nombre y al menos un apellido son obligatorios')
+        if errores:
+            return {'rfc': None, 'edad': edad, 'valido': False, 'errores': errores}
+        rfc = base + homoclave[:2]
+        rfc += homoclave[2:] or digito_verificador(rfc)
+    elif nacimiento and rfc[4:10] != nacimiento.strftime('%y%m%d'):
+        errores.append('La fecha del RFC no coincide con la fecha de nacimiento')
+
+    errores = validar_rfc(rfc) + errores
+    return {'rfc': rfc, 'edad': edad, 'valido': not errores, 'errores': errores}
+
+
+_SQL_DUPLICADOS = '''
+    SELECT j.value, 'clientes' FROM json_each(?) j JOIN clientes c ON c.rfc = j.value
+    UNION ALL
+    SELECT j.value, 'analistas' FROM json_each(?) j JOIN analistas a ON a.rfc = j.value
+'''
+
+
+def buscar_duplicados(conn, lista_rfc):
+    """{rfc: ['clientes', 'analistas', ...]} para los RFC que ya existen.
+
+    Una sola consulta por lote: la lista viaja como un arreglo JSON y se cruza
+    con los índices UNIQUE de clientes.rfc y analistas.rfc.
+    """
+    lista = json.dumps(sorted({r for r in lista_rfc if r}))
+    encontrados = {}
+    for rfc, tabla in conn.execute(_SQL_DUPLICADOS, (lista, lista)):
+        encontrados.setdefault(rfc, []).append(tabla)
+    return encontrados
+
+
+def procesar_lote(conn, registros, hoy=None):
+    """Generar/validar un lote y marcar duplicados en BD y dentro del propio lote"""
+    hoy = hoy or date.today()
+    resultados = [procesar_registro(r, hoy) for r in registros]
+    existentes = buscar_duplicados(conn, (r['rfc'] for r in resultados if r['valido']))
+
+    vistos = {}
+    for indice, resultado in enumerate(resultados):
+        resultado['indice'] = indice
+        rfc = resultado['rfc']
+        resultado['duplicado_en'] = list(existentes.get(rfc, ()))
+        if rfc and rfc in vistos:
+            resultado['duplicado_en'].append(f'lote:{vistos[rfc]}')
+        elif rfc:
+            vistos[rfc] = indice
+    return resultados
@@ -0,0 +1,303 @@
+"""Motor de scoring crediticio vectorizado.
+
+Calcula los tres componentes del score (cualitativo /210, historial /150,
+cuantitativo /90), el score total (/450) y la recomendación
+(aprobado / zona_gris / rechazado) sobre arreglos de solicitudes completos con
+NumPy, sin ciclos por fila. Lo mismo sirve para una sola solicitud en la
+pantalla de evaluación que para recalificar toda la cartera de `creditos`.
+
+Uso desde línea de comandos (recalificación nocturna):
+    python scoring.py [ruta_bd]
+"""
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+MAX_CUALITATIVO = 210
+MAX_HISTORIAL = 150
+MAX_CUANTITATIVO = 90
+MAX_TOTAL = MAX_CUALITATIVO + MAX_HISTORIAL + MAX_CUANTITATIVO
+
+# Umbrales por defecto de la recomendación automática; los vigentes se
+# administran en reglas_negocio (ver reglas.py)
+UMBRALES = {
+    'fico_rechazo': 600,        # FICO menor -> rechazo
+    'tdsr_rechazo': 40.0,       # TDSR mayor -> rechazo
+    'score_rechazo': 150,       # score total menor -> rechazo
+    'fico_aprobacion': 650,     # aprobación automática si se cumplen los tres
+    'tdsr_aprobacion': 35.0,
+    'score_aprobacion': 300,
+}
+
+RECOMENDACIONES = np.array(['rechazado', 'zona_gris', 'aprobado'])
+
+# --- Tablas de puntos -------------------------------------------------------
+# Rangos: `cortes` son los límites inferiores de cada tramo a partir del
+# segundo; `puntos` tiene un elemento más que `cortes`.
+
+RANGOS = {
+    # Cualitativo (210)
+    'edad': ((21, 26, 56, 66), (5, 15, 30, 20, 10)),
+    'dependientes': ((1, 3, 5), (20, 15, 10, 5)),
+    'antiguedad_domicilio': ((1, 3, 5), (5, 15, 22, 30)),
+    'antiguedad_empleo': ((1, 2, 5), (5, 15, 22, 30)),
+    # Historial (150)
+    'fico_score': ((550, 600, 650, 700, 750), (0, 15, 35, 50, 60, 70)),
+    'num_consultas': ((3, 6, 11), (15, 10, 5, 0)),
+    # Cuantitativo (90); para tdsr y la razón monto/ingreso menos es mejor
+    'ingreso_mensual': ((8000, 15000, 30000), (3, 7, 11, 15)),
+}
+
+# Tramos con límite superior inclusivo (valor <= corte)
+RANGOS_HASTA = {
+    'tdsr': ((20, 30, 35, 40), (50, 40, 28, 15, 0)),
+    'razon_monto_ingreso': ((0.25, 0.5, 1.0), (25, 18, 10, 0)),
+}
+
+CATEGORIAS = {
+    'estado_civil': {
+        'casado': 20, 'unión libre': 15, 'union libre': 15,
+        'soltero': 10, 'divorciado': 10, 'viudo': 10,
+    },
+    'nivel_estudios': {
+        'primaria': 5, 'secundaria': 10, 'preparatoria': 18,
+        'universidad': 25, 'posgrado': 30,
+    },
+    'zona': {'urbana': 20, 'semiurbana': 15, 'rural': 10},
+    'ocupacion': {
+        'empleado público': 30, 'empleado publico': 30, 'empleado privado': 25,
+        'profesionista independiente': 20, 'negocio propio': 18,
+        'comerciante': 15, 'agricultor': 12,
+    },
+    'ultima_calificacion': {
+        '1': 30, '2': 22, '3': 12, '4': 0, '9': 15, '96': 10, '97': 10, '98': 10,
+    },
+    'mop_6': {'1': 20, '2': 12, '3': 5, '4': 0, '5': 0},
+    'mop_12': {'1': 15, '2': 9, '3': 4, '4': 0, '5': 0},
+}
+
+# Puntos cuando el dato no se capturó
+FALTANTES = {'mop_6': 10, 'mop_12': 7}
+
+CAMPOS_CUALITATIVO = ('edad', 'estado_civil', 'dependientes', 'nivel_estudios', 'zona',
+                      'antiguedad_domicilio', 'ocupacion', 'antiguedad_empleo')
+CAMPOS_HISTORIAL = ('fico_score', 'ultima_calificacion', 'mop_6', 'mop_12', 'num_consultas')
+CAMPOS_CUANTITATIVO = ('tdsr', 'razon_monto_ingreso', 'ingreso_mensual')
+
+def _a_flotantes(valores):
+    """Convertir una secuencia con None/cadenas vacías a float64 con NaN"""
+    arreglo = np.asarray(valores, dtype=object)
+    vacios = np.equal(arreglo, None) | np.equal(arreglo, '')
+    arreglo = np.where(vacios, np.nan, arreglo)
+    return arreglo.astype(np.float64)
+
+
+def _puntos_rango(valores, cortes, puntos, faltante=0):
+    idx = np.searchsorted(np.asarray(cortes, dtype=np.float64), valores, side='right')
+    resultado = np.asarray(puntos, dtype=np.int32)[np.minimum(idx, len(puntos) - 1)]
+    return np.where(np.isnan(valores), faltante, resultado)
+
+
+def _puntos_rango_hasta(valores, cortes, puntos, faltante=0):
+    idx = np.searchsorted(np.asarray(cortes, dtype=np.float64), valores, side='left')
+    resultado = np.asarray(puntos, dtype=np.int32)[np.minimum(idx, len(puntos) - 1)]
+    return np.where(np.isnan(valores), faltante, resultado)
+
+
+class _TablaCategorias(dict):
+    """Valor crudo -> puntos; cada variante de escritura se normaliza una sola vez"""
+
+    def __init__(self, tabla, faltante):
+        super().__init__()
+        self._tabla = tabla
+        self._faltante = faltante
+
+    def __missing__(self, valor):
+        clave = '' if valor is None else str(valor).strip().lower()
+        puntos = self[valor] = self._tabla.get(clave, self._faltante)
+        return puntos
+
+
+def _puntos_categoria(valores, tabla, faltante=0):
+    """Puntos por categoría con un mapeo hash en C (sin ordenar como np.unique)"""
+    if isinstance(valores, np.ndarray):
+        valores = valores.tolist()
+    buscar = _TablaCategorias(tabla, faltante).__getitem__
+    return np.fromiter(map(buscar, valores), dtype=np.int32, count=len(valores))
+
+
+def _columna(datos, campo, n):
+    valores = datos.get(campo)
+    if valores is None:
+        return np.full(n, None, dtype=object)
+    return valores
+
+
+def _num(datos, campo, n):
+    valores = datos.get(campo)
+    if valores is None:
+        return np.full(n, np.nan)
+    arreglo = np.asarray(valores)
+    if arreglo.dtype.kind in 'fiu':
+        return arreglo.astype(np.float64, copy=False)
+    return _a_flotantes(arreglo)
+
+
+def _longitud(datos):
+    for valores in datos.values():
+        if valores is not None:
+            return len(valores)
+    return 0
+
+
+def calcular_scores(datos, umbrales=None):
+    """Calcular scores y recomendación para un lote de solicitudes.
+
+    `datos` es un dict campo -> arreglo (o lista) de la misma longitud. Campos
+    numéricos: edad, dependientes, antiguedad_domicilio, antiguedad_empleo,
+    fico_score, num_consultas, tdsr, ingreso_mensual, monto_solicitado.
+    Campos categóricos: estado_civil, nivel_estudios, zona, ocupacion,
+    ultima_calificacion, mop_6, mop_12. Los faltantes valen 0 puntos.
+    """
+    n = _longitud(datos)
+
+    numericos = {campo: _num(datos, campo, n) for campo in (
+        'edad', 'dependientes', 'antiguedad_domicilio', 'antiguedad_empleo',
+        'fico_score', 'num_consultas', 'tdsr', 'ingreso_mensual', 'monto_solicitado')}
+
+    ingreso_anual = numericos['ingreso_mensual'] * 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        numericos['razon_monto_ingreso'] = np.where(
+            ingreso_anual > 0, numericos['monto_solicitado'] / ingreso_anual, np.nan)
+
+    puntos = {}
+    for campo, (cortes, tabla) in RANGOS.items():
+        puntos[campo] = _puntos_rango(numericos[campo], cortes, tabla, FALTANTES.get(campo, 0))
+    for campo, (cortes, tabla) in RANGOS_HASTA.items():
+        puntos[campo] = _puntos_rango_hasta(numericos[campo], cortes, tabla, FALTANTES.get(campo, 0))
+    for campo, tabla in CATEGORIAS.items():
+        puntos[campo] = _puntos_categoria(_columna(datos, campo, n), tabla, FALTANTES.get(campo, 0))
+
+    cualitativo = sum(puntos[c] for c in CAMPOS_CUALITATIVO).astype(np.int32)
+    historial = sum(puntos[c] for c in CAMPOS_HISTORIAL).astype(np.int32)
+    cuantitativo = sum(puntos[c] for c in CAMPOS_CUANTITATIVO).astype(np.int32)
+    total = cualitativo + historial + cuantitativo
+
+    recomendacion = recomendar(numericos['fico_score'], numericos['tdsr'], total, umbrales)
+
+    return {
+        'score_cualitativo': cualitativo,
+        'score_historial': historial,
+        'score_cuantitativo': cuantitativo,
+        'score_total': total,
+        'recomendacion': recomendacion,
+    }
+
+
+def recomendar(fico, tdsr, score_total, umbrales=None):
+    """Recomendación (rechazado / zona_gris / aprobado) a partir de scores ya calculados"""
+    u = dict(UMBRALES, **(umbrales or {}))
+    fico = np.asarray(fico, dtype=np.float64)
+    tdsr = np.asarray(tdsr, dtype=np.float64)
+    total = np.asarray(score_total, dtype=np.float64)
+    # Las comparaciones con NaN son falsas: un dato faltante nunca aprueba
+    rechazo = ~(fico >= u['fico_rechazo']) | ~(tdsr <= u['tdsr_rechazo']) | (total < u['score_rechazo'])
+    aprobacion = (fico >= u['fico_aprobacion']) & (tdsr <= u['tdsr_aprobacion']) & (total >= u['score_aprobacion'])
+    return RECOMENDACIONES[np.where(rechazo, 0, np.where(aprobacion, 2, 1))]
+
+
+def calificar_solicitud(datos, umbrales=None):
+    """Scores de una sola solicitud (dict campo -> valor) como valores de Python"""
+    resultado = calcular_scores({k: [v] for k, v in datos.items()}, umbrales)
+    return {k: v[0].item() for k, v in resultado.items()}
+
+
+def edades(fechas_nacimiento, hoy=None):
+    """Edad en años cumplidos a partir de fechas 'YYYY-MM-DD' (NaN si falta)"""
+    hoy = np.datetime64(hoy or date.today(), 'D')
+    fechas = np.array([f if f else 'NaT' for f in fechas_nacimiento], dtype='datetime64[D]')
+    dias = (hoy - fechas).astype(np.float64)
+    return np.floor(dias / 365.2425)
+
+
+_SELECT_CARTERA = '''
+    SELECT cr.id, cr.monto, cl.fecha_nacimiento, cl.estado_civil, cl.dependientes,
+           cl.nivel_estudios, cl.zona, cl.antiguedad_domicilio, cl.ocupacion,
+           cl.antiguedad_empleo, cl.fico_score, cl.ultima_calificacion, cl.mop_6,
+           cl.mop_12, cl.num_consultas, cl.tdsr, cl.ingreso_mensual
+    FROM creditos cr
+    JOIN clientes cl ON cl.id = cr.cliente_id
+    WHERE cr.id > ?
+    ORDER BY cr.id
+    LIMIT ?
+'''
+
+
+def recalificar_cartera(conn, umbrales=None, tamano_lote=50_000):
+    """Recalcular y guardar los scores de todos los créditos por lotes.
+
+    Cada lote se lee con una consulta, se califica en una sola pasada
+    vectorizada y se escribe con executemany. Regresa el número de créditos.
+    """
+    ultimo_id, total = 0, 0
+    while True:
+        filas = conn.execute(_SELECT_CARTERA, (ultimo_id, tamano_lote)).fetchall()
+        if not filas:
+            break
+        (ids, montos, nacimientos, estado_civil, dependientes, nivel_estudios, zona,
+         antiguedad_domicilio, ocupacion, antiguedad_empleo, fico, ultima_calificacion,
+         mop_6, mop_12, num_consultas, tdsr, ingreso) = zip(*filas)
+
+        resultado = calcular_scores({
+            'edad': edades(nacimientos),
+            'estado_civil': estado_civil,
+            'dependientes': _a_flotantes(dependientes),
+            'nivel_estudios': nivel_estudios,
+            'zona': zona,
+            'antiguedad_domicilio': _a_flotantes(antiguedad_domicilio),
+            'ocupacion': ocupacion,
+            'antiguedad_empleo': _a_flotantes(antiguedad_empleo),
+            'fico_score': _a_flotantes(fico),
+            'ultima_calificacion': ultima_calificacion,
+            'mop_6': mop_6,
+            'mop_12': mop_12,
+            'num_consultas': _a_flotantes(num_consultas),
+            'tdsr': _a_flotantes(tdsr),
+            'ingreso_mensual': _a_flotantes(ingreso),
+            'monto_solicitado': _a_flotantes(montos),
+        }, umbrales)
+
+        conn.executemany(
+            '''UPDATE creditos SET score_cualitativo = ?, score_historial = ?,
+                   score_cuantitativo = ?, score_total = ?, recomendacion = ?
+               WHERE id = ?''',
+            zip(resultado['score_cualitativo'].tolist(),
+                resultado['score_historial'].tolist(),
+                resultado['score_cuantitativo'].tolist(),
+                resultado['score_total'].tolist(),
+                resultado['recomendacion'].tolist(),
+                ids),
+        )
+        conn.commit()
+        total += len(ids)
+        ultimo_id = ids[-1]
+    return total
+
+
+if __name__ == '__main__':
+    import sqlite3
+
+    import migraciones
+    import reglas
+
+    ruta = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('DATABASE', 'creditos.db')
+    conexion = sqlite3.connect(ruta)
+    inicio = time.perf_counter()
+    migraciones.aplicar(conexion)
+    _, vigentes = reglas.cargar_vigentes(conexion)
+    procesados = recalificar_cartera(conexion, vigentes)
+    conexion.close()
+    print(f"✅ {procesados} créditos recalificados en {time.perf_counter() - inicio:.2f}s")
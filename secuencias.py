@@ -0,0 +1,66 @@
+"""Secuencias en la BD y asignación de códigos por bloques.
+
+Cada secuencia es una fila de `secuencias` con el siguiente número libre.
+Reservar un bloque es una sola sentencia UPDATE ... RETURNING: SQLite
+serializa las escrituras, así que dos procesos nunca reciben el mismo rango y
+no hace falta reintentar. Cada proceso reserva un bloque de números y los
+reparte en memoria, de modo que la mayoría de los códigos no tocan la BD.
+
+Los números de un bloque que no se alcanzan a usar (p. ej. al reiniciar un
+worker) se pierden: los códigos son únicos y crecientes, no consecutivos.
+"""
+import os
+import threading
+
+TAMANO_BLOQUE = int(os.environ.get('CODIGOS_BLOQUE', 10))
+
+
+def reservar(conn, nombre, cantidad):
+    """Reservar `cantidad` números consecutivos y regresar el primero"""
+    row = conn.execute('''
+        UPDATE secuencias SET siguiente = siguiente + ?
+        WHERE nombre = ?
+        RETURNING siguiente - ?
+    ''', (cantidad, nombre, cantidad)).fetchone()
+    if row is None:
+        raise LookupError(f'La secuencia {nombre} no existe')
+    return row[0]
+
+
+class AsignadorCodigos:
+    """Códigos únicos `prefijo + número` repartidos desde bloques reservados.
+
+    `obtener_conexion` es un callable que regresa un context manager de
+    conexión (como app.get_db). Seguro entre hilos; tras un fork el proceso
+    hijo descarta el bloque heredado y reserva uno propio.
+    """
+
+    def __init__(self, obtener_conexion, nombre, prefijo, tamano_bloque=TAMANO_BLOQUE):
+        self._obtener_conexion = obtener_conexion
+        self.nombre = nombre
+        self.prefijo = prefijo
+        self.tamano_bloque = max(1, tamano_bloque)
+        self._lock = threading.Lock()
+        self._siguiente = self._limite = 0
+        self._pid = os.getpid()
+        self.bloques_reservados = 0
+
+    def siguiente(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._siguiente = self._limite = 0
+                self._pid = os.getpid()
+            if self._siguiente >= self._limite:
+                with self._obtener_conexion() as conn:
+                    # El bloque se reparte en memoria: su reserva debe quedar
+                    # confirmada aunque el llamador revierta lo suyo, y un
+                    # get_db() anidado no confirma al salir
+                    if conn.in_transaction:
+                        raise RuntimeError('siguiente() no puede reservar dentro de una transacción abierta')
+                    inicio = reservar(conn, self.nombre, self.tamano_bloque)
+                    conn.commit()
+                self._siguiente, self._limite = inicio, inicio + self.tamano_bloque
+                self.bloques_reservados += 1
+            numero = self._siguiente
+            self._siguiente += 1
+        return f'{self.prefijo}{numero}'
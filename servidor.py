@@ -0,0 +1,137 @@
+"""Servidor WSGI de producción.
+
+Abre el socket una sola vez, inicializa la base de datos en el proceso padre y
+después crea N workers con fork; cada worker atiende el mismo socket con
+waitress (WSGI en Python puro) usando un pool de hilos. Un proceso más
+trabaja la cola de trabajos en segundo plano (trabajos.py), así que ese
+trabajo no compite por el GIL con las peticiones.
+
+Uso:
+    python servidor.py --workers 4 --threads 8 --hilos-trabajos 2
+
+Variables de entorno equivalentes: PORT, HOST, WEB_CONCURRENCY, WEB_THREADS,
+TRABAJOS_HILOS (0 para no trabajar la cola en este servidor).
+"""
+import argparse
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+from waitress import serve
+
+import app as aplicacion
+import metricas
+import trabajos
+
+
+def crear_socket(host, port, backlog):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def ejecutar_worker(sock, threads, backlog):
+    """Cuerpo de cada proceso worker; no regresa"""
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    wsgi_app = aplicacion.create_app()
+    serve(wsgi_app, sockets=[sock], threads=threads, backlog=backlog, ident='sistema-credito')
+    sys.exit(0)
+
+
+def ejecutar_trabajos(hilos):
+    """Cuerpo del proceso de la cola de trabajos; no regresa"""
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    aplicacion.create_app()
+    aplicacion.cola_trabajos.ejecutar(hilos)
+    sys.exit(0)
+
+
+def lanzar(cuerpo, *args):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            cuerpo(*args)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor WSGI multi-proceso')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 2)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 8)))
+    parser.add_argument('--backlog', type=int, default=1024)
+    parser.add_argument('--hilos-trabajos', type=int, default=trabajos.HILOS)
+    args = parser.parse_args()
+
+    sock = crear_socket(args.host, args.port, args.backlog)
+
+    # Inicializar la BD una vez y cerrar las conexiones antes del fork: una
+    # conexión SQLite no debe cruzar procesos.
+    aplicacion.create_app()
+    aplicacion.cerrar_pool()
+
+    print(f"🚀 Sirviendo en http://{args.host}:{args.port} "
+          f"({args.workers} workers x {args.threads} hilos)", flush=True)
+
+    if args.workers <= 1 or not hasattr(os, 'fork'):
+        if args.hilos_trabajos > 0:
+            aplicacion.cola_trabajos.iniciar(args.hilos_trabajos)
+        serve(aplicacion.app, sockets=[sock], threads=args.threads,
+              backlog=args.backlog, ident='sistema-credito')
+        return
+
+    # Cada worker vuelca sus métricas a este directorio y /metricas las suma
+    temporal = None if metricas.DIRECTORIO else tempfile.mkdtemp(prefix='metricas-credito-')
+    metricas.configurar(directorio=metricas.DIRECTORIO or temporal, limpiar=True)
+
+    # pid -> (cuerpo, args) para reemplazar el proceso si muere
+    procesos = [(ejecutar_worker, (sock, args.threads, args.backlog))] * args.workers
+    if args.hilos_trabajos > 0:
+        procesos.append((ejecutar_trabajos, (args.hilos_trabajos,)))
+    workers = {lanzar(cuerpo, *argumentos): (cuerpo, argumentos) for cuerpo, argumentos in procesos}
+    detener = False
+
+    def terminar(signum, frame):
+        nonlocal detener
+        detener = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, terminar)
+    signal.signal(signal.SIGINT, terminar)
+
+    # Supervisar: si un worker muere inesperadamente se reemplaza
+    while workers:
+        try:
+            pid, estado = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        cuerpo, argumentos = workers.pop(pid, (None, None))
+        if not detener and cuerpo is not None:
+            print(f"⚠️ Worker {pid} terminó (estado {estado}); reiniciando", flush=True)
+            time.sleep(0.5)
+            workers[lanzar(cuerpo, *argumentos)] = (cuerpo, argumentos)
+
+    sock.close()
+    if temporal:
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
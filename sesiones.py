@@ -0,0 +1,281 @@
+"""Sesiones del lado del servidor.
+
+La cookie solo lleva `id.version` firmado; los datos viven en un almacén
+(por defecto la tabla `sesiones` de la misma BD) con una caché LRU en memoria
+de cada proceso delante. La versión cambia en cada escritura y viaja en la
+cookie, así que un worker sabe si su copia en caché es la vigente sin
+consultar la BD.
+
+Los datos se cargan la primera vez que una ruta o plantilla toca `session`;
+las peticiones que no la usan (estáticos, APIs públicas) no leen ni escriben
+nada. Las sesiones vencidas se borran por lotes cada SESION_LIMPIEZA_S.
+
+La clave de firma se toma de SECRET_KEY o, si no está definida, se genera una
+vez y se guarda en la tabla `configuracion`, de modo que todos los workers
+firman con la misma.
+"""
+import os
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import timedelta
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+
+INACTIVIDAD = timedelta(seconds=int(os.environ.get('SESION_INACTIVIDAD_S', 8 * 3600)))
+MAX_CACHE = int(os.environ.get('SESION_CACHE_MAX', 10_000))
+INTERVALO_LIMPIEZA = float(os.environ.get('SESION_LIMPIEZA_S', 300))
+
+# Llaves que definen quién es el usuario: si cambian (login, cambio de
+# usuario) la sesión se guarda con un id nuevo, contra la fijación de sesión
+CLAVES_PRIVILEGIO = ('user_type', 'user_id', 'admin_id')
+
+
+def _privilegio(datos):
+    return tuple(datos.get(clave) for clave in CLAVES_PRIVILEGIO)
+
+
+class AlmacenSesiones(ABC):
+    """Interfaz de almacenamiento; los datos llegan ya serializados (texto)"""
+
+    @abstractmethod
+    def cargar(self, sid):
+        """(datos, version, expira) o None"""
+
+    @abstractmethod
+    def guardar(self, sid, datos, expira):
+        """Guardar y regresar la nueva versión"""
+
+    @abstractmethod
+    def borrar(self, sid):
+        """Borrar la sesión si existe"""
+
+    @abstractmethod
+    def limpiar_expiradas(self, ahora):
+        """Borrar las sesiones vencidas y regresar cuántas fueron"""
+
+    @abstractmethod
+    def clave_secreta(self):
+        """Clave de firma compartida por todos los procesos"""
+
+
+class AlmacenSQLite(AlmacenSesiones):
+    """Tabla `sesiones`; `obtener_conexion` es un callable como app.get_db"""
+
+    def __init__(self, obtener_conexion, tamano_lote=5_000):
+        self._obtener_conexion = obtener_conexion
+        self.tamano_lote = tamano_lote
+
+    def cargar(self, sid):
+        with self._obtener_conexion() as conn:
+            row = conn.execute('SELECT datos, version, expira FROM sesiones WHERE id = ?',
+                               (sid,)).fetchone()
+        return tuple(row) if row else None
+
+    def guardar(self, sid, datos, expira):
+        with self._obtener_conexion() as conn:
+            return conn.execute('''
+                INSERT INTO sesiones (id, datos, version, expira) VALUES (?, ?, 1, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    datos = excluded.datos, expira = excluded.expira, version = version + 1
+                RETURNING version
+            ''', (sid, datos, expira)).fetchone()[0]
+
+    def borrar(self, sid):
+        with self._obtener_conexion() as conn:
+            conn.execute('DELETE FROM sesiones WHERE id = ?', (sid,))
+
+    def limpiar_expiradas(self, ahora):
+        # Por lotes, cada uno en su propia transacción, para no retener el
+        # candado de escritura mientras se borran miles de filas
+        total = 0
+        while True:
+            with self._obtener_conexion() as conn:
+                borradas = conn.execute('''
+                    DELETE FROM sesiones WHERE id IN (
+                        SELECT id FROM sesiones WHERE expira < ? LIMIT ?
+                    )
+                ''', (ahora, self.tamano_lote)).rowcount
+            total += borradas
+            if borradas < self.tamano_lote:
+                return total
+
+    def clave_secreta(self):
+        with self._obtener_conexion() as conn:
+            conn.execute('''
+                INSERT OR IGNORE INTO configuracion (clave, valor) VALUES ('secret_key', ?)
+            ''', (secrets.token_hex(32),))
+            row = conn.execute("SELECT valor FROM configuracion WHERE clave = 'secret_key'").fetchone()
+        return row[0]
+
+
+class SesionServidor(SessionMixin):
+    """Sesión que consulta el almacén solo cuando se lee o escribe"""
+
+    def __init__(self, cargar=None, sid=None, version=None):
+        self.sid = sid
+        self.version = version
+        self.expira = None
+        self.new = sid is None
+        self.modified = False
+        self.accessed = False
+        self._cargar = cargar
+        self._datos = None
+        # Privilegio con el que se cargó; save_session rota el id si cambia
+        self.privilegio = _privilegio({})
+
+    @property
+    def cargada(self):
+        return self._datos is not None
+
+    def _obtener(self):
+        self.accessed = True
+        if self._datos is None:
+            registro = self._cargar() if self._cargar else None
+            if registro is None:
+                # Cookie sin sesión vigente: se empieza una nueva
+                self.sid = self.version = None
+                self.new = True
+                self._datos = {}
+            else:
+                self._datos, self.version, self.expira = registro
+                self.privilegio = _privilegio(self._datos)
+        return self._datos
+
+    def __getitem__(self, clave):
+        return self._obtener()[clave]
+
+    def __setitem__(self, clave, valor):
+        self._obtener()[clave] = valor
+        self.modified = True
+
+    def __delitem__(self, clave):
+        del self._obtener()[clave]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._obtener())
+
+    def __len__(self):
+        return len(self._obtener())
+
+    def clear(self):
+        self._obtener().clear()
+        self.modified = True
+
+
+class InterfazSesiones(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, almacen, max_cache=MAX_CACHE, inactividad=INACTIVIDAD,
+                 intervalo_limpieza=INTERVALO_LIMPIEZA):
+        self.almacen = almacen
+        self.max_cache = max_cache
+        self.inactividad = inactividad
+        self.intervalo_limpieza = intervalo_limpieza
+        self._cache = OrderedDict()     # sid -> (version, datos serializados, expira)
+        self._lock = threading.Lock()
+        self._proxima_limpieza = time.time() + intervalo_limpieza
+        self.aciertos = 0
+        self.fallos = 0
+
+    def clave_secreta(self, app):
+        if not app.secret_key:
+            app.secret_key = self.almacen.clave_secreta()
+        return app.secret_key
+
+    def _firmante(self, app):
+        return Signer(self.clave_secreta(app), salt='sesion-servidor')
+
+    def _cargar(self, sid, version):
+        ahora = time.time()
+        with self._lock:
+            entrada = self._cache.get(sid)
+            if entrada is not None and entrada[0] == version and entrada[2] > ahora:
+                self._cache.move_to_end(sid)
+                self.aciertos += 1
+            else:
+                entrada = None
+                self.fallos += 1
+        if entrada is None:
+            entrada = self.almacen.cargar(sid)
+            if entrada is None or entrada[2] <= ahora:
+                return None
+            version, datos, expira = entrada[1], entrada[0], entrada[2]
+            self._guardar_en_cache(sid, version, datos, expira)
+        else:
+            version, datos, expira = entrada
+        return self.serializer.loads(datos), version, expira
+
+    def _guardar_en_cache(self, sid, version, datos, expira):
+        with self._lock:
+            self._cache[sid] = (version, datos, expira)
+            self._cache.move_to_end(sid)
+            while len(self._cache) > self.max_cache:
+                self._cache.popitem(last=False)
+
+    def _borrar(self, sid):
+        self.almacen.borrar(sid)
+        with self._lock:
+            self._cache.pop(sid, None)
+
+    def open_session(self, app, request):
+        valor = request.cookies.get(self.get_cookie_name(app))
+        if valor:
+            try:
+                sid, version = self._firmante(app).unsign(valor).decode().rsplit('.', 1)
+                version = int(version)
+            except (BadSignature, ValueError):
+                pass
+            else:
+                return SesionServidor(lambda: self._cargar(sid, version), sid, version)
+        return SesionServidor()
+
+    def save_session(self, app, session, response):
+        # Una sesión que nadie tocó no cuesta nada
+        if not session.cargada:
+            return
+        response.vary.add('Cookie')
+        nombre = self.get_cookie_name(app)
+        opciones = {
+            'domain': self.get_cookie_domain(app), 'path': self.get_cookie_path(app),
+            'secure': self.get_cookie_secure(app), 'samesite': self.get_cookie_samesite(app),
+            'httponly': self.get_cookie_httponly(app),
+        }
+
+        if not session:
+            if session.sid:
+                self._borrar(session.sid)
+            if session.sid or session.modified:
+                response.delete_cookie(nombre, **opciones)
+            return
+
+        ahora = time.time()
+        vigencia = app.permanent_session_lifetime if session.permanent else self.inactividad
+        duracion = vigencia.total_seconds()
+        # Sin cambios solo se reescribe para renovar la expiración, y no en
+        # cada petición sino cuando ya pasó la mitad del plazo
+        if not session.modified and session.expira and session.expira - ahora > duracion / 2:
+            return
+
+        sid = session.sid
+        if sid and _privilegio(session) != session.privilegio:
+            # Login o cambio de usuario: el id que se conocía antes (y que un
+            # tercero pudo haber fijado) deja de servir
+            self._borrar(sid)
+            sid = None
+        sid = sid or secrets.token_urlsafe(32)
+        datos = self.serializer.dumps(dict(session))
+        expira = ahora + duracion
+        version = self.almacen.guardar(sid, datos, expira)
+        self._guardar_en_cache(sid, version, datos, expira)
+        response.set_cookie(nombre, self._firmante(app).sign(f'{sid}.{version}').decode(),
+                            expires=self.get_expiration_time(app, session), **opciones)
+
+        if ahora >= self._proxima_limpieza:
+            self._proxima_limpieza = ahora + self.intervalo_limpieza
+            self.almacen.limpiar_expiradas(ahora)
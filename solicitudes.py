@@ -0,0 +1,324 @@
+"""Consultas de solicitudes de crédito (creditos + clientes).
+
+La paginación es por cursor (keyset): cada página continúa a partir de la
+pareja (fecha_solicitud, id) de la última fila vista, de modo que pedir la
+página N cuesta lo mismo que pedir la primera y nunca se recorren las filas
+anteriores con OFFSET.
+
+El total tampoco recorre las filas en cada página: sin filtro de fechas sale
+de estadisticas_analista (una fila por analista, mantenida por triggers); con
+fechas se cuenta una vez en la primera página y viaja en el cursor.
+"""
+import base64
+import binascii
+import math
+from datetime import date, datetime, timedelta
+
+import estadisticas
+from modelos import ESTADOS_DECISION, VALIDACIONES, Cliente, Solicitud
+
+POR_PAGINA = 20
+MAX_POR_PAGINA = 100
+
+# Valores de filtro usados por las plantillas -> valor guardado en creditos.estado
+ALIAS_ESTADO = {
+    'en_proceso': 'pendiente',
+    'pendiente': 'pendiente',
+    'aprobado': 'aprobado',
+    'aprobada': 'aprobado',
+    'rechazado': 'rechazado',
+    'rechazada': 'rechazado',
+    'zona_gris': 'zona_gris',
+}
+
+COLUMNAS = '''
+    cr.id, cr.cliente_id, cr.analista_id, cr.monto, cr.monto_aprobado, cr.plazo,
+    cr.tasa_interes, cr.estado, cr.fecha_solicitud, cr.fecha_aprobacion, cr.observaciones,
+    cr.justificacion, cr.motivo_rechazo, cr.firma_solicitud, cr.validacion_id,
+    cr.validacion_domicilio, cr.validacion_ingresos, cr.comprobante_ingresos,
+    cr.validacion_csf, cr.validacion_carta_sic,
+    cr.score_cualitativo, cr.score_historial, cr.score_cuantitativo, cr.score_total,
+    cr.recomendacion,
+    a.codigo AS analista_codigo,
+    cl.nombre, cl.apellido_paterno, cl.apellido_materno, cl.rfc, cl.telefono,
+    cl.fecha_nacimiento, cl.ocupacion, cl.fico_score, cl.tdsr,
+    cl.estado_civil, cl.dependientes, cl.nivel_estudios, cl.zona, cl.antiguedad_domicilio,
+    cl.antiguedad_empleo, cl.ingreso_mensual, cl.pagos_minimos,
+    cl.ultima_calificacion, cl.mop_6, cl.mop_12, cl.num_consultas
+'''
+
+FROM = '''
+    FROM creditos cr
+    LEFT JOIN clientes cl ON cl.id = cr.cliente_id
+    LEFT JOIN analistas a ON a.id = cr.analista_id
+'''
+
+
+def codificar_cursor(fecha, credito_id, total=None):
+    """Cursor opaco para la URL a partir de la última fila de una página.
+
+    `total` es el conteo de la primera página, si hubo que contar filas.
+    """
+    crudo = f'{fecha}|{credito_id}' if total is None else f'{fecha}|{credito_id}|{total}'
+    return base64.urlsafe_b64encode(crudo.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Regresa (fecha, id, total o None) o None si el cursor no es válido"""
+    if not token:
+        return None
+    try:
+        crudo = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        fecha, credito_id, *total = crudo.split('|')
+        if len(total) > 1:
+            return None
+        return fecha, int(credito_id), int(total[0]) if total else None
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def _parsear_fecha(valor):
+    try:
+        return date.fromisoformat(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def _a_datetime(valor):
+    if not valor or isinstance(valor, datetime):
+        return valor
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        return None
+
+
+def _calcular_edad(fecha_nacimiento):
+    nacimiento = _parsear_fecha(fecha_nacimiento)
+    if not nacimiento:
+        return None
+    hoy = date.today()
+    return hoy.year - nacimiento.year - ((hoy.month, hoy.day) < (nacimiento.month, nacimiento.day))
+
+
+def normalizar_filtros(estado=None, fecha_desde=None, fecha_hasta=None, analista_id=None):
+    """Limpiar los filtros recibidos por query string"""
+    return {
+        'estado': ALIAS_ESTADO.get((estado or '').strip().lower()),
+        'fecha_desde': _parsear_fecha(fecha_desde),
+        'fecha_hasta': _parsear_fecha(fecha_hasta),
+        'analista_id': analista_id,
+    }
+
+
+def construir_where(filtros):
+    """Condiciones WHERE (sobre el alias cr de creditos) y sus parámetros"""
+    condiciones, params = [], []
+    if filtros.get('analista_id') is not None:
+        condiciones.append('cr.analista_id = ?')
+        params.append(filtros['analista_id'])
+    if filtros.get('estado'):
+        condiciones.append('cr.estado = ?')
+        params.append(filtros['estado'])
+    if filtros.get('fecha_desde'):
+        condiciones.append('cr.fecha_solicitud >= ?')
+        params.append(filtros['fecha_desde'].isoformat())
+    if filtros.get('fecha_hasta'):
+        # fecha_hasta es inclusiva: todo el día
+        condiciones.append('cr.fecha_solicitud < ?')
+        params.append((filtros['fecha_hasta'] + timedelta(days=1)).isoformat())
+    return condiciones, params
+
+
+def fila_a_solicitud(row):
+    """Convertir una fila de la consulta en el modelo que usan rutas y plantillas"""
+    estado = row['estado'] or 'pendiente'
+    cliente = None
+    if row['rfc'] is not None:
+        cliente = Cliente(
+            id=row['cliente_id'],
+            nombre=row['nombre'] or '',
+            apellido_paterno=row['apellido_paterno'] or '',
+            apellido_materno=row['apellido_materno'] or '',
+            rfc=row['rfc'],
+            telefono=row['telefono'] or '',
+            edad=_calcular_edad(row['fecha_nacimiento']),
+            ocupacion=row['ocupacion'] or '',
+            fico_score=row['fico_score'],
+            tdsr=row['tdsr'],
+            estado_civil=row['estado_civil'] or '',
+            dependientes=row['dependientes'],
+            nivel_estudios=row['nivel_estudios'] or '',
+            zona=row['zona'] or '',
+            antiguedad_domicilio=row['antiguedad_domicilio'],
+            antiguedad_empleo=row['antiguedad_empleo'],
+            ingreso_mensual=row['ingreso_mensual'],
+            pagos_minimos=row['pagos_minimos'],
+        )
+
+    monto_aprobado = row['monto_aprobado']
+    if monto_aprobado is None and estado == 'aprobado':
+        monto_aprobado = row['monto']
+
+    return Solicitud(
+        id=row['id'],
+        analista_id=row['analista_id'],
+        analista_codigo=row['analista_codigo'] or '',
+        monto_solicitado=row['monto'],
+        monto_aprobado=monto_aprobado,
+        plazo=row['plazo'],
+        tasa_interes=row['tasa_interes'],
+        estado=estado,
+        fecha_solicitud=_a_datetime(row['fecha_solicitud']),
+        fecha_decision=_a_datetime(row['fecha_aprobacion']),
+        observaciones=row['observaciones'] or '',
+        justificacion=row['justificacion'] or '',
+        motivo_rechazo=row['motivo_rechazo'] or '',
+        **{validacion: bool(row[validacion]) for validacion in VALIDACIONES},
+        ultima_calificacion=row['ultima_calificacion'],
+        mop_6=row['mop_6'],
+        mop_12=row['mop_12'],
+        num_consultas=row['num_consultas'],
+        score_cualitativo=row['score_cualitativo'],
+        score_historial=row['score_historial'],
+        score_cuantitativo=row['score_cuantitativo'],
+        score_total=row['score_total'],
+        recomendacion=row['recomendacion'],
+        cliente=cliente,
+    )
+
+
+class Pagina:
+    """Página de resultados con la interfaz que esperan las plantillas
+    (items, total, page, pages, has_prev/has_next, prev_num/next_num, iter_pages).
+
+    Con paginación por cursor solo se puede navegar a la página anterior o a la
+    siguiente, así que iter_pages() produce únicamente esos números.
+    """
+
+    def __init__(self, items, page, por_pagina, total, has_prev, has_next,
+                 cursor_anterior, cursor_siguiente, args_filtros):
+        self.items = items
+        self.page = page
+        self.per_page = por_pagina
+        self.total = total
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.prev_num = page - 1 if has_prev else None
+        self.next_num = page + 1 if has_next else None
+        self.cursor_anterior = cursor_anterior
+        self.cursor_siguiente = cursor_siguiente
+        self._args_filtros = args_filtros
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return self.page + (1 if self.has_next else 0)
+        return max(1, math.ceil(self.total / self.per_page))
+
+    def iter_pages(self):
+        if self.has_prev:
+            yield self.prev_num
+        yield self.page
+        if self.has_next:
+            yield self.next_num
+
+    def args_para(self, numero):
+        """Argumentos de url_for para ir a la página `numero` (anterior o siguiente)"""
+        args = dict(self._args_filtros)
+        if numero == self.prev_num and self.cursor_anterior:
+            args.update(page=numero, cursor=self.cursor_anterior, dir='ant')
+        elif numero == self.next_num and self.cursor_siguiente:
+            args.update(page=numero, cursor=self.cursor_siguiente)
+        return args
+
+
+# Estado del filtro -> columna de estadisticas_analista
+_COLUMNA_ESTADO = {'pendiente': 'pendientes', 'aprobado': 'aprobadas',
+                   'rechazado': 'rechazadas', 'zona_gris': 'zona_gris'}
+
+
+def _con_fechas(filtros):
+    return bool(filtros.get('fecha_desde') or filtros.get('fecha_hasta'))
+
+
+def contar_solicitudes(conn, filtros):
+    """Total de solicitudes con los filtros.
+
+    Sin fechas es una lectura de estadisticas_analista (pendientes incluye
+    cualquier estado sin decisión, como en los tableros); con fechas se
+    cuentan las filas del rango sobre los índices.
+    """
+    if not _con_fechas(filtros):
+        columna = _COLUMNA_ESTADO[filtros['estado']] if filtros.get('estado') else 'total'
+        return estadisticas.obtener(conn, filtros.get('analista_id'))[columna]
+    condiciones, params = construir_where(filtros)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    return conn.execute(f'SELECT COUNT(*) FROM creditos cr {where}', params).fetchone()[0]
+
+
+def listar_solicitudes(conn, filtros, cursor=None, direccion='sig', page=1,
+                       por_pagina=POR_PAGINA, contar=True, args_filtros=None):
+    """Una página de solicitudes ordenadas de la más reciente a la más antigua.
+
+    `cursor` es el token de la última fila (o la primera, si direccion='ant')
+    de la página desde la que se navega. Solo se leen `por_pagina + 1` filas;
+    con filtro de fechas el total se cuenta en la primera página y las
+    siguientes lo toman del cursor.
+    """
+    por_pagina = max(1, min(int(por_pagina), MAX_POR_PAGINA))
+    page = max(1, int(page or 1))
+    condiciones, params = construir_where(filtros)
+    posicion = decodificar_cursor(cursor)
+    hacia_atras = posicion is not None and direccion == 'ant'
+
+    if posicion is None:
+        page = 1
+    else:
+        fecha, credito_id, _ = posicion
+        # La primera condición acota el rango del índice; la segunda desempata por id
+        if hacia_atras:
+            condiciones.append('cr.fecha_solicitud >= ? AND (cr.fecha_solicitud > ? OR cr.id > ?)')
+        else:
+            condiciones.append('cr.fecha_solicitud <= ? AND (cr.fecha_solicitud < ? OR cr.id < ?)')
+        params.extend([fecha, fecha, credito_id])
+
+    orden = 'ASC' if hacia_atras else 'DESC'
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+    sql = (f'SELECT {COLUMNAS} {FROM} {where} '
+           f'ORDER BY cr.fecha_solicitud {orden}, cr.id {orden} LIMIT ?')
+    filas = conn.execute(sql, params + [por_pagina + 1]).fetchall()
+
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if hacia_atras:
+        filas.reverse()
+        has_prev, has_next = hay_mas, True
+    else:
+        has_prev, has_next = posicion is not None, hay_mas
+
+    total = None
+    if contar:
+        if _con_fechas(filtros) and posicion is not None and posicion[2] is not None:
+            total = posicion[2]
+        else:
+            total = contar_solicitudes(conn, filtros)
+    # Solo el conteo por rango de fechas cuesta: ese viaja en el cursor
+    arrastrar = total if _con_fechas(filtros) else None
+
+    items = [fila_a_solicitud(f) for f in filas]
+    cursor_anterior = cursor_siguiente = None
+    if filas:
+        cursor_anterior = codificar_cursor(filas[0]['fecha_solicitud'], filas[0]['id'], arrastrar)
+        cursor_siguiente = codificar_cursor(filas[-1]['fecha_solicitud'], filas[-1]['id'], arrastrar)
+    if hacia_atras and not has_prev:
+        page = 1
+
+    return Pagina(items, page, por_pagina, total, has_prev, has_next,
+                  cursor_anterior, cursor_siguiente, args_filtros or {})
+
+
+def obtener_solicitud(conn, credito_id):
+    """Una solicitud por id, o None"""
+    row = conn.execute(f'SELECT {COLUMNAS} {FROM} WHERE cr.id = ?', (credito_id,)).fetchone()
+    return fila_a_solicitud(row) if row else None
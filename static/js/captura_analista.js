@@ -0,0 +1,40 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Actualizar estadísticas cada 5 minutos
+    setInterval(function() {
+        fetch('/api/estadisticas_analista')
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    // Actualizar contadores
+                    document.querySelector('.stats-card:nth-child(1) h3').textContent = data.total;
+                    document.querySelector('.stats-card:nth-child(2) h3').textContent = data.aprobadas;
+                    document.querySelector('.stats-card:nth-child(3) h3').textContent = data.rechazadas;
+                    document.querySelector('.stats-card:nth-child(4) h3').textContent = data.zona_gris;
+                }
+            })
+            .catch(error => console.log('Error al actualizar estadísticas:', error));
+    }, 300000); // 5 minutos
+
+    // Animación de contadores
+    function animateCounter(element, target) {
+        let current = 0;
+        const increment = target / 50;
+        const timer = setInterval(function() {
+            current += increment;
+            if (current >= target) {
+                current = target;
+                clearInterval(timer);
+            }
+            element.textContent = Math.floor(current);
+        }, 20);
+    }
+
+    // Animar contadores al cargar
+    document.querySelectorAll('.stats-card h3').forEach(function(element) {
+        const target = parseInt(element.textContent);
+        if (target > 0) {
+            element.textContent = '0';
+            animateCounter(element, target);
+        }
+    });
+});
@@ -0,0 +1,145 @@
+function toggleDecisionFields() {
+    const decision = document.getElementById('decision_manual').value;
+    const camposAprobacion = document.getElementById('camposAprobacion');
+    const camposRechazo = document.getElementById('camposRechazo');
+
+    // Ocultar todos los campos
+    camposAprobacion.style.display = 'none';
+    camposRechazo.style.display = 'none';
+
+    // Mostrar campos según la decisión
+    if (decision === 'aprobado') {
+        camposAprobacion.style.display = 'block';
+
+        // Sugerir valores por defecto
+        const ingresoMensual = EVALUACION.ingreso_mensual;
+        const montoSugerido = Math.min(ingresoMensual * 8, 150000);
+
+        document.getElementById('monto_aprobado').value = montoSugerido;
+        document.getElementById('tasa_interes').value = EVALUACION.tasa_sugerida;
+        document.getElementById('plazo_meses').value = 12;
+    } else if (decision === 'rechazado') {
+        camposRechazo.style.display = 'block';
+    }
+}
+
+function obtenerRecomendacion() {
+    const btn = event.target;
+    const originalText = btn.innerHTML;
+    btn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Analizando...';
+    btn.disabled = true;
+
+    // Simular llamada a API de recomendación
+    setTimeout(function() {
+        const ficoScore = EVALUACION.fico_score;
+        const tdsr = EVALUACION.tdsr;
+        const scoreTotal = EVALUACION.score_total;
+        // La recomendación la calcula el motor de scoring del servidor
+        const decision = EVALUACION.recomendacion;
+
+        let recomendacion = '';
+
+        if (decision === 'rechazado') {
+            recomendacion = `
+                <div class="alert alert-danger">
+                    <h6><i class="fas fa-times-circle me-2"></i>Recomendación: RECHAZAR</h6>
+                    <ul class="mb-0">
+                        ${ficoScore < EVALUACION.fico_rechazo ? '<li>FICO Score muy bajo (' + ficoScore + ' < ' + EVALUACION.fico_rechazo + ')</li>' : ''}
+                        ${tdsr > EVALUACION.tdsr_rechazo ? '<li>TDSR muy alto (' + tdsr + '% > ' + EVALUACION.tdsr_rechazo + '%)</li>' : ''}
+                        ${scoreTotal < EVALUACION.score_rechazo ? '<li>Score total insuficiente (' + scoreTotal + ' < ' + EVALUACION.score_rechazo + ')</li>' : ''}
+                    </ul>
+                </div>
+            `;
+        } else if (decision === 'aprobado') {
+            const montoSugerido = Math.min(EVALUACION.ingreso_mensual * 8, 200000);
+            recomendacion = `
+                <div class="alert alert-success">
+                    <h6><i class="fas fa-check-circle me-2"></i>Recomendación: APROBAR</h6>
+                    <p><strong>Términos sugeridos:</strong></p>
+                    <ul class="mb-0">
+                        <li>Monto: ${montoSugerido.toLocaleString()}</li>
+                        <li>Tasa: ${EVALUACION.tasa_sugerida}% anual</li>
+                        <li>Plazo: 12 meses</li>
+                    </ul>
+                </div>
+            `;
+        } else {
+            recomendacion = `
+                <div class="alert alert-warning">
+                    <h6><i class="fas fa-exclamation-triangle me-2"></i>Recomendación: ZONA GRIS</h6>
+                    <p>El perfil presenta características mixtas que requieren evaluación adicional por parte de un supervisor.</p>
+                    <p><strong>Motivo:</strong> Perfil de riesgo intermedio que no cumple todos los criterios de aprobación automática.</p>
+                </div>
+            `;
+        }
+
+        document.getElementById('recomendacionAutomatica').innerHTML = recomendacion;
+        document.getElementById('recomendacionAutomatica').style.display = 'block';
+
+        // Restaurar botón
+        btn.innerHTML = originalText;
+        btn.disabled = false;
+
+        // Auto-seleccionar la recomendación
+        document.getElementById('decision_manual').value = decision;
+        toggleDecisionFields();
+
+    }, 2000);
+}
+
+function confirmarDecision() {
+    const decision = document.getElementById('decision_manual').value;
+    const justificacion = document.getElementById('justificacion').value;
+
+    if (!decision || !justificacion.trim()) {
+        alert('Por favor complete todos los campos obligatorios.');
+        return false;
+    }
+
+    const cliente = EVALUACION.cliente;
+    let mensaje = `¿Confirma la decisión de ${decision.toUpperCase()} para el cliente ${cliente}?`;
+
+    if (decision === 'aprobado') {
+        const monto = document.getElementById('monto_aprobado').value;
+        const tasa = document.getElementById('tasa_interes').value;
+        const plazo = document.getElementById('plazo_meses').value;
+
+        if (!monto || !tasa || !plazo) {
+            alert('Por favor complete todos los términos del crédito.');
+            return false;
+        }
+
+        mensaje += `\n\nTérminos:\n- Monto: ${parseFloat(monto).toLocaleString()}\n- Tasa: ${tasa}%\n- Plazo: ${plazo} meses`;
+    }
+
+    return confirm(mensaje + '\n\nEsta acción no se puede deshacer.');
+}
+
+// Validación en tiempo real
+document.addEventListener('DOMContentLoaded', function() {
+    // Calcular pago mensual automáticamente
+    function calcularPagoMensual() {
+        const monto = parseFloat(document.getElementById('monto_aprobado')?.value) || 0;
+        const tasa = parseFloat(document.getElementById('tasa_interes')?.value) || 0;
+        const plazo = parseInt(document.getElementById('plazo_meses')?.value) || 0;
+
+        if (monto && tasa && plazo) {
+            const tasaMensual = (tasa / 100) / 12;
+            const pagoMensual = monto * (tasaMensual * Math.pow(1 + tasaMensual, plazo)) / (Math.pow(1 + tasaMensual, plazo) - 1);
+
+            // Mostrar el pago mensual calculado
+            const ingresoCliente = EVALUACION.ingreso_mensual;
+            const porcentajeIngreso = (pagoMensual / ingresoCliente) * 100;
+
+            console.log(`Pago mensual estimado: ${pagoMensual.toFixed(2)} (${porcentajeIngreso.toFixed(1)}% del ingreso)`);
+        }
+    }
+
+    // Agregar listeners si existen los campos
+    ['monto_aprobado', 'tasa_interes', 'plazo_meses'].forEach(id => {
+        const element = document.getElementById(id);
+        if (element) {
+            element.addEventListener('input', calcularPagoMensual);
+        }
+    });
+});
@@ -0,0 +1,91 @@
+function verDetalles(codigoAnalista) {
+    const content = `
+        <div class="row">
+            <div class="col-md-6">
+                <h6>Información Personal</h6>
+                <p><strong>Código:</strong> ${codigoAnalista}</p>
+                <p><strong>Estado:</strong> Activo</p>
+            </div>
+            <div class="col-md-6">
+                <h6>Estadísticas</h6>
+                <p><strong>Solicitudes Procesadas:</strong> 15</p>
+                <p><strong>Aprobadas:</strong> 8 (53%)</p>
+                <p><strong>Rechazadas:</strong> 5 (33%)</p>
+            </div>
+        </div>
+    `;
+
+    document.getElementById('detallesContent').innerHTML = content;
+    new bootstrap.Modal(document.getElementById('detallesModal')).show();
+}
+
+function resetearNIP(codigoAnalista) {
+    if (confirm(`¿Está seguro de resetear el NIP del analista ${codigoAnalista}?`)) {
+        const nuevoNIP = Math.floor(1000 + Math.random() * 9000);
+        alert(`NIP reseteado exitosamente para ${codigoAnalista}.\nNuevo NIP: ${nuevoNIP}`);
+    }
+}
+
+// Búsqueda en el servidor (índice de texto completo: ignora acentos, busca
+// por prefijo y tolera errores de dedo); se espera a que el usuario deje de teclear
+let busquedaPendiente;
+function filtrarAnalistas() {
+    clearTimeout(busquedaPendiente);
+    busquedaPendiente = setTimeout(buscarAnalistas, 250);
+}
+
+function buscarAnalistas() {
+    const searchTerm = document.getElementById('searchInput').value.trim();
+    if (!searchTerm) {
+        mostrarFilas(() => true);
+        return;
+    }
+    const params = new URLSearchParams({ q: searchTerm, limite: 50 });
+    fetch(`${RUTAS.buscar_analistas}?${params.toString()}`)
+        .then(response => response.json())
+        .then(datos => {
+            if (!datos.success) {
+                throw new Error(datos.error);
+            }
+            const codigos = new Set(datos.resultados.map(analista => analista.codigo));
+            mostrarFilas(row => codigos.has(row.querySelector('.seleccion-analista')?.value));
+        })
+        .catch(() => {
+            // Sin respuesta del servidor, filtrar las filas que ya están en la página
+            const termino = searchTerm.toLowerCase();
+            mostrarFilas(row => row.textContent.toLowerCase().includes(termino));
+        });
+}
+
+function mostrarFilas(visible) {
+    let visibleCount = 0;
+    document.querySelectorAll('tbody tr').forEach(row => {
+        const mostrar = visible(row);
+        row.style.display = mostrar ? '' : 'none';
+        if (mostrar) {
+            visibleCount++;
+        }
+    });
+
+    // Actualizar contador
+    document.getElementById('totalAnalistas').textContent = visibleCount;
+}
+
+function seleccionarTodos(marcado) {
+    // Solo las filas visibles con el filtro de búsqueda actual
+    document.querySelectorAll('tbody tr').forEach(row => {
+        const casilla = row.querySelector('.seleccion-analista');
+        if (casilla && row.style.display !== 'none') {
+            casilla.checked = marcado;
+        }
+    });
+}
+
+function confirmarSeleccion(accion) {
+    const seleccionados = document.querySelectorAll('.seleccion-analista:checked').length;
+    if (seleccionados === 0) {
+        alert('Seleccione al menos un analista');
+        return false;
+    }
+    return confirm(`¿${accion.charAt(0).toUpperCase() + accion.slice(1)} ${seleccionados} analistas?`);
+}
@@ -0,0 +1,254 @@
+function duplicarSolicitud(solicitudId) {
+    if (confirm('¿Desea crear una nueva solicitud basada en los datos de esta solicitud?')) {
+        // Redirigir a nueva solicitud con parámetros para pre-llenar
+        window.location.href = `${RUTAS.nueva_solicitud}?duplicar=${solicitudId}`;
+    }
+}
+
+// Función para exportar datos
+function exportarSolicitudes() {
+    const filtros = new URLSearchParams(window.location.search);
+    window.open(`${RUTAS.exportar_solicitudes}?${filtros.toString()}`, '_blank');
+}
+
+// Auto-submit de filtros con delay
+let filterTimeout;
+document.querySelectorAll('select[name="estado"], input[name="fecha_desde"], input[name="fecha_hasta"]').forEach(element => {
+    element.addEventListener('change', function() {
+        clearTimeout(filterTimeout);
+        filterTimeout = setTimeout(() => {
+            this.form.submit();
+        }, 500);
+    });
+});
+
+// Actualización automática cada 5 minutos
+setInterval(function() {
+    if (document.visibilityState === 'visible') {
+        window.location.reload();
+    }
+}, 300000);
+
+// Marcar como leído al hacer clic en una solicitud
+document.querySelectorAll('a[href*="ver_solicitud"], a[href*="evaluar_solicitud"], a[href*="resultado_solicitud"]').forEach(link => {
+    link.addEventListener('click', function() {
+        const row = this.closest('tr');
+        row.style.opacity = '0.7';
+    });
+});
+
+// Tooltips para los badges de estado
+document.addEventListener('DOMContentLoaded', function() {
+    // Agregar tooltips informativos
+    document.querySelectorAll('.badge').forEach(badge => {
+        const value = badge.textContent.trim();
+        let tooltip = '';
+
+        if (value.includes('FICO')) {
+            const score = parseInt(value);
+            if (score >= 700) {
+                tooltip = 'Excelente historial crediticio';
+            } else if (score >= 650) {
+                tooltip = 'Buen historial crediticio';
+            } else {
+                tooltip = 'Historial crediticio mejorable';
+            }
+        } else if (value.includes('%')) {
+            const tdsr = parseFloat(value);
+            if (tdsr <= 30) {
+                tooltip = 'Bajo nivel de endeudamiento';
+            } else if (tdsr <= 35) {
+                tooltip = 'Nivel de endeudamiento moderado';
+            } else {
+                tooltip = 'Alto nivel de endeudamiento';
+            }
+        }
+
+        if (tooltip) {
+            badge.title = tooltip;
+        }
+    });
+
+    // Agregar indicador de solicitudes nuevas/actualizadas
+    const solicitudesRecientes = document.querySelectorAll('tbody tr');
+    solicitudesRecientes.forEach((row, index) => {
+        const fechaCell = row.querySelector('td:nth-last-child(2)');
+        if (fechaCell) {
+            const fechaTexto = fechaCell.textContent.trim();
+            const hoy = new Date();
+            const fecha = new Date(fechaTexto.split('/').reverse().join('-'));
+
+            // Si la solicitud es de hoy, agregar indicador
+            if (fecha.toDateString() === hoy.toDateString()) {
+                const badge = document.createElement('span');
+                badge.className = 'badge bg-info ms-2';
+                badge.innerHTML = '<i class="fas fa-star"></i> Nuevo';
+                badge.style.fontSize = '0.7em';
+                fechaCell.appendChild(badge);
+            }
+        }
+    });
+});
+
+// Búsqueda rápida: un número de solicitud se busca en la página; lo demás
+// (nombre, RFC o teléfono del cliente) en el índice del servidor, que ignora
+// acentos y tolera errores de dedo
+function busquedaRapida() {
+    const searchTerm = (prompt('Buscar por RFC, nombre, teléfono o número de solicitud:') || '').trim();
+    if (!searchTerm) {
+        return;
+    }
+    if (/^s-?\d+$/i.test(searchTerm)) {
+        resaltarFilas(searchTerm);
+        return;
+    }
+
+    const params = new URLSearchParams({ q: searchTerm });
+    const analista = new URLSearchParams(window.location.search).get('analista');
+    if (analista) {
+        params.set('analista', analista);
+    }
+    fetch(`${RUTAS.buscar_clientes}?${params.toString()}`)
+        .then(response => response.json())
+        .then(datos => {
+            if (!datos.success || !datos.resultados.length) {
+                alert('No se encontraron resultados para: ' + searchTerm);
+                return;
+            }
+            mostrarResultadosBusqueda(searchTerm, datos);
+        })
+        .catch(() => alert('No se pudo realizar la búsqueda'));
+}
+
+function resaltarFilas(searchTerm) {
+    let found = false;
+    document.querySelectorAll('tbody tr').forEach(row => {
+        if (row.textContent.toLowerCase().includes(searchTerm.toLowerCase())) {
+            row.style.backgroundColor = '#fff3cd';
+            row.scrollIntoView({ behavior: 'smooth', block: 'center' });
+            found = true;
+        } else {
+            row.style.backgroundColor = '';
+        }
+    });
+    if (!found) {
+        alert('No se encontraron resultados para: ' + searchTerm);
+    }
+}
+
+function mostrarResultadosBusqueda(searchTerm, datos) {
+    let panel = document.getElementById('resultadosBusqueda');
+    if (!panel) {
+        panel = document.createElement('div');
+        panel.id = 'resultadosBusqueda';
+        panel.className = 'card card-custom mb-4';
+        document.querySelector('.stats-summary').before(panel);
+    }
+    panel.innerHTML = `
+        <div class="card-header bg-transparent d-flex justify-content-between align-items-center">
+            <h6 class="mb-0"><i class="fas fa-search me-2"></i><span class="titulo"></span></h6>
+            <button type="button" class="btn-close" aria-label="Cerrar"></button>
+        </div>
+        <div class="list-group list-group-flush"></div>
+    `;
+    panel.querySelector('.titulo').textContent = `Clientes para "${searchTerm}"` +
+        (datos.corregida ? ' (incluye coincidencias aproximadas)' : '');
+    panel.querySelector('.btn-close').onclick = () => panel.remove();
+
+    const lista = panel.querySelector('.list-group');
+    datos.resultados.forEach(cliente => {
+        const item = document.createElement(cliente.url ? 'a' : 'div');
+        item.className = 'list-group-item' + (cliente.url ? ' list-group-item-action' : '');
+        if (cliente.url) {
+            item.href = cliente.url;
+        }
+        const nombre = document.createElement('strong');
+        nombre.textContent = cliente.nombre;
+        const detalle = document.createElement('small');
+        detalle.className = 'text-muted ms-2';
+        detalle.textContent = [cliente.rfc, cliente.telefono].filter(Boolean).join(' · ');
+        item.append(nombre, detalle);
+        lista.appendChild(item);
+    });
+}
+
+// Agregar botón de búsqueda rápida
+document.addEventListener('DOMContentLoaded', function() {
+    const header = document.querySelector('.card-header .row .col-md-6:last-child');
+    if (header) {
+        const searchBtn = document.createElement('button');
+        searchBtn.className = 'btn btn-sm btn-outline-secondary ms-2';
+        searchBtn.innerHTML = '<i class="fas fa-search"></i>';
+        searchBtn.title = 'Búsqueda rápida';
+        searchBtn.onclick = busquedaRapida;
+        header.appendChild(searchBtn);
+    }
+});
+
+// Estadísticas del analista (precalculadas en el servidor, no solo de esta página)
+function mostrarEstadisticas() {
+    const params = new URLSearchParams(window.location.search);
+    const url = RUTAS.estadisticas_analista +
+        (params.get('analista') ? '?analista=' + encodeURIComponent(params.get('analista')) : '');
+    fetch(url)
+        .then(response => response.json())
+        .then(stats => {
+            if (!stats.success) return;
+            alert(`Estadísticas:
+
+Total: ${stats.total} solicitudes
+Aprobadas: ${stats.aprobadas} (${stats.tasa_aprobacion}%)
+Rechazadas: ${stats.rechazadas}
+Zona gris: ${stats.zona_gris}
+Pendientes: ${stats.pendientes}
+
+Monto total solicitado: ${stats.monto_solicitado.toLocaleString()}
+Monto total aprobado: ${stats.monto_aprobado.toLocaleString()}`);
+        })
+        .catch(error => console.log('Error al obtener estadísticas:', error));
+}
+
+// Atajos de teclado
+document.addEventListener('keydown', function(e) {
+    if (e.ctrlKey) {
+        switch(e.key) {
+            case 'f':
+                e.preventDefault();
+                busquedaRapida();
+                break;
+            case 'n':
+                e.preventDefault();
+                window.location.href = RUTAS.nueva_solicitud;
+                break;
+            case 's':
+                e.preventDefault();
+                mostrarEstadisticas();
+                break;
+        }
+    }
+});
+
+// Mostrar ayuda de atajos
+function mostrarAyuda() {
+    alert(`Atajos de teclado disponibles:
+
+Ctrl + F: Búsqueda rápida
+Ctrl + N: Nueva solicitud
+Ctrl + S: Mostrar estadísticas
+
+Clic en cualquier solicitud para ver detalles.
+Los badges de colores indican el nivel de riesgo.`);
+}
+
+// Agregar botón de ayuda
+document.addEventListener('DOMContentLoaded', function() {
+    const helpBtn = document.createElement('button');
+    helpBtn.className = 'btn btn-sm btn-outline-info position-fixed';
+    helpBtn.style.bottom = '20px';
+    helpBtn.style.right = '20px';
+    helpBtn.style.zIndex = '1000';
+    helpBtn.innerHTML = '<i class="fas fa-question"></i>';
+    helpBtn.title = 'Ayuda y atajos';
+    helpBtn.onclick = mostrarAyuda;
+    document.body.appendChild(helpBtn);
+});
@@ -0,0 +1,259 @@
+let currentStep = 1;
+const totalSteps = 5;
+
+function showStep(step) {
+    // Ocultar todos los pasos
+    document.querySelectorAll('.form-step').forEach(function(element) {
+        element.classList.remove('active');
+    });
+
+    // Mostrar paso actual
+    document.getElementById(`form-step-${step}`).classList.add('active');
+
+    // Actualizar wizard
+    document.querySelectorAll('.step').forEach(function(element) {
+        element.classList.remove('active');
+    });
+    document.getElementById(`step-${step}`).classList.add('active');
+
+    // Actualizar botones
+    updateButtons(step);
+
+    // Actualizar barra de progreso
+    updateProgress(step);
+}
+
+function updateButtons(step) {
+    const prevBtn = document.getElementById('prevBtn');
+    const nextBtn = document.getElementById('nextBtn');
+    const submitBtn = document.getElementById('submitBtn');
+
+    if (step === 1) {
+        prevBtn.style.display = 'none';
+    } else {
+        prevBtn.style.display = 'inline-block';
+    }
+
+    if (step === totalSteps) {
+        nextBtn.style.display = 'none';
+        submitBtn.style.display = 'inline-block';
+    } else {
+        nextBtn.style.display = 'inline-block';
+        submitBtn.style.display = 'none';
+    }
+}
+
+function updateProgress(step) {
+    const progress = (step / totalSteps) * 100;
+    document.getElementById('progressBar').style.width = progress + '%';
+}
+
+function changeStep(direction) {
+    const newStep = currentStep + direction;
+
+    if (newStep >= 1 && newStep <= totalSteps) {
+        // Validar paso actual antes de continuar
+        if (direction > 0 && !validateCurrentStep()) {
+            return;
+        }
+
+        currentStep = newStep;
+        showStep(currentStep);
+
+        // Marcar paso como completado
+        if (direction > 0) {
+            document.getElementById(`step-${currentStep - 1}`).classList.add('completed');
+        }
+
+        // Actualizar resumen en el último paso
+        if (currentStep === totalSteps) {
+            updateResumen();
+        }
+    }
+}
+
+function goToStep(step) {
+    if (step <= currentStep || validateStepsUntil(step - 1)) {
+        currentStep = step;
+        showStep(currentStep);
+    }
+}
+
+function validateCurrentStep() {
+    const currentForm = document.getElementById(`form-step-${currentStep}`);
+    const requiredFields = currentForm.querySelectorAll('[required]');
+    let isValid = true;
+
+    requiredFields.forEach(field => {
+        if (!field.value.trim()) {
+            field.classList.add('is-invalid');
+            isValid = false;
+        } else {
+            field.classList.remove('is-invalid');
+            field.classList.add('is-valid');
+        }
+    });
+
+    if (!isValid) {
+        alert('Por favor complete todos los campos obligatorios antes de continuar.');
+    }
+
+    return isValid;
+}
+
+function validateStepsUntil(step) {
+    for (let i = 1; i <= step; i++) {
+        const form = document.getElementById(`form-step-${i}`);
+        const requiredFields = form.querySelectorAll('[required]');
+
+        for (let field of requiredFields) {
+            if (!field.value.trim()) {
+                return false;
+            }
+        }
+    }
+    return true;
+}
+
+function generateRFC() {
+    const nombre = document.getElementById('nombre').value.trim();
+    const apellidoPaterno = document.getElementById('apellido_paterno').value.trim();
+    const apellidoMaterno = document.getElementById('apellido_materno').value.trim();
+    const fechaNacimiento = document.getElementById('fecha_nacimiento').value;
+    const homoclave = document.getElementById('homoclave').value.trim();
+
+    if (nombre && apellidoPaterno && apellidoMaterno && fechaNacimiento && homoclave) {
+        fetch('/api/generar_rfc', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({
+                nombre: nombre,
+                apellido_paterno: apellidoPaterno,
+                apellido_materno: apellidoMaterno,
+                fecha_nacimiento: fechaNacimiento,
+                homoclave: homoclave
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                document.getElementById('rfc').value = data.rfc;
+                document.getElementById('edad').value = data.edad;
+            }
+        })
+        .catch(error => console.error('Error:', error));
+    }
+}
+
+function calculateTDSR() {
+    const ingresoMensual = parseFloat(document.getElementById('ingreso_mensual').value) || 0;
+    const pagosMinimos = parseFloat(document.getElementById('pagos_minimos').value) || 0;
+
+    if (ingresoMensual > 0) {
+        fetch('/api/calcular_tdsr', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({
+                ingreso_mensual: ingresoMensual,
+                pagos_minimos: pagosMinimos
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                document.getElementById('tdsr').value = data.tdsr;
+
+                // Cambiar color según el TDSR
+                const tdsrField = document.getElementById('tdsr');
+                if (data.tdsr <= 30) {
+                    tdsrField.className = 'form-control form-control-custom auto-generated text-success fw-bold';
+                } else if (data.tdsr <= 35) {
+                    tdsrField.className = 'form-control form-control-custom auto-generated text-warning fw-bold';
+                } else {
+                    tdsrField.className = 'form-control form-control-custom auto-generated text-danger fw-bold';
+                }
+            }
+        })
+        .catch(error => console.error('Error:', error));
+    }
+}
+
+function validateCP() {
+    const cp = document.getElementById('codigo_postal').value;
+
+    if (cp.length === 5) {
+        fetch('/api/validar_cp', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({codigo_postal: cp})
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success && data.valido) {
+                document.getElementById('estado').value = data.estado;
+                document.getElementById('municipio').value = data.municipio;
+                document.getElementById('zona').value = data.zona;
+            } else {
+                document.getElementById('estado').value = '';
+                document.getElementById('municipio').value = '';
+                document.getElementById('zona').value = '';
+                alert('Código postal no encontrado');
+            }
+        })
+        .catch(error => console.error('Error:', error));
+    }
+}
+
+function updateResumen() {
+    const nombre = document.getElementById('nombre').value;
+    const apellidoPaterno = document.getElementById('apellido_paterno').value;
+    const monto = document.getElementById('monto_solicitado').value;
+    const fico = document.getElementById('fico_score').value;
+    const tdsr = document.getElementById('tdsr').value;
+
+    document.getElementById('resumen-cliente').textContent = `${nombre} ${apellidoPaterno}`;
+    document.getElementById('resumen-monto').textContent = monto ? `${parseFloat(monto).toLocaleString()}` : '-';
+    document.getElementById('resumen-fico').textContent = fico || '-';
+    document.getElementById('resumen-tdsr').textContent = tdsr ? `${tdsr}%` : '-';
+}
+
+function restaurarBorrador(datos) {
+    const form = document.getElementById('solicitudForm');
+    Object.entries(datos).forEach(([nombre, valor]) => {
+        // El número de solicitud lo pone el servidor en el campo oculto
+        if (nombre === 'numero_solicitud') {
+            return;
+        }
+        const campo = form.elements.namedItem(nombre);
+        if (!campo) {
+            return;
+        }
+        if (campo.type === 'checkbox') {
+            campo.checked = true;
+        } else {
+            campo.value = valor;
+        }
+    });
+}
+
+function guardarBorrador() {
+    alert('Funcionalidad de guardar borrador en desarrollo');
+}
+
+// Inicializar
+document.addEventListener('DOMContentLoaded', function() {
+    showStep(1);
+    restaurarBorrador(BORRADOR);
+
+    // Evitar el doble envío; si aun así llega otro, el servidor lo reconoce
+    // por el número de solicitud y lleva a la misma solicitud
+    document.getElementById('solicitudForm').addEventListener('submit', function() {
+        document.getElementById('submitBtn').disabled = true;
+    });
+
+    // Auto-save cada 30 segundos
+    setInterval(function() {
+        const formData = new FormData(document.getElementById('solicitudForm'));
+        localStorage.setItem('solicitud_borrador', JSON.stringify(Object.fromEntries(formData)));
+    }, 30000);
+});
@@ -0,0 +1,74 @@
+function generarReporte() {
+    alert('Funcionalidad en desarrollo.\n\nEsta función generará un reporte ejecutivo completo con:\n- Estadísticas de solicitudes\n- Productividad por analista\n- Análisis de tendencias\n- Métricas de aprobación');
+}
+
+function respaldarSistema() {
+    if (confirm('¿Desea generar un respaldo completo del sistema?\n\nEsto incluirá:\n- Base de datos\n- Configuraciones\n- Logs del sistema')) {
+        alert('Respaldo iniciado. Se notificará cuando esté completo.');
+        // Aquí iría la lógica real de respaldo
+    }
+}
+
+function mostrarAyuda() {
+    alert(`Panel de Administrador - Ayuda
+
+FUNCIONES PRINCIPALES:
+• Aprobar/Rechazar analistas nuevos
+• Configurar reglas de negocio
+• Ver todas las solicitudes del sistema
+• Generar reportes ejecutivos
+
+GESTIÓN DE ANALISTAS:
+• Los nuevos registros requieren aprobación
+• Los NIPs están encriptados por seguridad
+• Cada analista tiene un código único (E-XXX)
+
+CONFIGURACIÓN:
+• Las reglas de negocio son modificables
+• Los cambios afectan inmediatamente las evaluaciones
+• Se recomienda respaldo antes de cambios importantes
+
+SEGURIDAD:
+• Acceso con clave maestra (RAG123)
+• Todas las acciones quedan registradas
+• Sesión automática expira por seguridad`);
+}
+
+// Auto-actualizar estadísticas cada 30 segundos
+setInterval(function() {
+    fetch('/api/estadisticas_admin')
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                // Actualizar los números en las tarjetas de estadísticas
+                const cards = document.querySelectorAll('.stats-card h3');
+                if (cards.length >= 4) {
+                    cards[0].textContent = data.total_solicitudes;
+                    cards[1].textContent = data.aprobadas;
+                    cards[2].textContent = data.rechazadas;
+                    cards[3].textContent = data.total_analistas;
+                }
+            }
+        })
+        .catch(error => console.log('Error al actualizar estadísticas:', error));
+}, 30000);
+
+// Animación de números al cargar
+document.addEventListener('DOMContentLoaded', function() {
+    const numbers = document.querySelectorAll('.stats-card h3');
+    numbers.forEach(number => {
+        const target = parseInt(number.textContent);
+        if (target > 0) {
+            let current = 0;
+            const increment = target / 30;
+            const timer = setInterval(() => {
+                current += increment;
+                if (current >= target) {
+                    current = target;
+                    clearInterval(timer);
+                }
+                number.textContent = Math.floor(current);
+            }, 50);
+        }
+    });
+});
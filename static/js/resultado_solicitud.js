@@ -0,0 +1,94 @@
+// Función para calcular pago mensual (disponible en el template)
+function calcularPagoMensual(monto, tasa, plazo) {
+    const tasaMensual = (tasa / 100) / 12;
+    if (tasaMensual === 0) {
+        return monto / plazo;
+    }
+    return monto * (tasaMensual * Math.pow(1 + tasaMensual, plazo)) / (Math.pow(1 + tasaMensual, plazo) - 1);
+}
+
+function enviarPorEmail() {
+    const cliente = RESULTADO.cliente;
+    const numero = RESULTADO.numero;
+    const decision = RESULTADO.decision;
+
+    // Simular envío por email
+    const email = prompt('Ingrese el email destino:');
+    if (email) {
+        alert(`Resultado de solicitud ${numero} para ${cliente} enviado a ${email}`);
+
+        // Aquí se haría la llamada real al backend para enviar el email
+        fetch('/api/enviar_resultado', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                solicitud_id: RESULTADO.id,
+                email_destino: email
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                alert('Email enviado correctamente');
+            } else {
+                alert('Error al enviar email: ' + data.error);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error al enviar email');
+        });
+    }
+}
+
+// Animaciones al cargar la página
+document.addEventListener('DOMContentLoaded', function() {
+    // Animación del resultado principal
+    const resultCard = document.querySelector('.result-card');
+    if (resultCard) {
+        resultCard.style.opacity = '0';
+        resultCard.style.transform = 'translateY(50px)';
+
+        setTimeout(() => {
+            resultCard.style.transition = 'all 0.8s ease';
+            resultCard.style.opacity = '1';
+            resultCard.style.transform = 'translateY(0)';
+        }, 300);
+    }
+
+    // Contador animado para números
+    const numbers = document.querySelectorAll('.terms-table h2, .certificate-section h3');
+    numbers.forEach(number => {
+        const text = number.textContent;
+        const match = text.match(/[\d,]+\.?\d*/);
+        if (match) {
+            const finalValue = parseFloat(match[0].replace(/,/g, ''));
+            if (!isNaN(finalValue)) {
+                animateNumber(number, finalValue, text);
+            }
+        }
+    });
+});
+
+function animateNumber(element, target, originalText) {
+    let current = 0;
+    const increment = target / 50;
+    const interval = setInterval(() => {
+        current += increment;
+        if (current >= target) {
+            current = target;
+            clearInterval(interval);
+        }
+
+        // Mantener el formato original
+        const formatted = originalText.replace(/[\d,]+\.?\d*/, current.toLocaleString());
+        element.textContent = formatted;
+    }, 20);
+}
+
+// Función para generar PDF (opcional)
+function generarPDF() {
+    window.print();
+}
@@ -0,0 +1,295 @@
+"""Cola de trabajos persistente en SQLite.
+
+Las rutas encolan el trabajo derivado (cálculos, notificaciones) en la misma
+transacción que guarda el cambio de estado: el trabajo existe si y solo si el
+cambio se confirmó, y sobrevive a reinicios. Un pool de hilos toma cada
+trabajo con un UPDATE ... RETURNING atómico (varios procesos pueden compartir
+la tabla), lo ejecuta y lo marca `completado`. Si falla se reprograma con
+espera exponencial hasta `max_intentos` y después queda como `fallido`. Un
+trabajo `en_proceso` cuyo worker murió vuelve a `pendiente` pasados
+TRABAJOS_VENCIMIENTO_S.
+
+La entrega es "al menos una vez": los manejadores deben ser idempotentes.
+
+Uso:
+    cola = ColaTrabajos(get_db)
+
+    @cola.tarea('notificar')
+    def notificar(credito_id):
+        ...
+
+    with get_db() as conn:
+        conn.execute('UPDATE creditos ...')
+        cola.encolar(conn, 'notificar', {'credito_id': 7})
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HILOS = int(os.environ.get('TRABAJOS_HILOS', 2))
+REINTENTOS = int(os.environ.get('TRABAJOS_REINTENTOS', 5))
+ESPERA_BASE = float(os.environ.get('TRABAJOS_ESPERA_BASE_S', 2))
+ESPERA_MAXIMA = float(os.environ.get('TRABAJOS_ESPERA_MAXIMA_S', 600))
+INTERVALO = float(os.environ.get('TRABAJOS_INTERVALO_S', 0.5))
+VENCIMIENTO = float(os.environ.get('TRABAJOS_VENCIMIENTO_S', 300))
+RETENCION = float(os.environ.get('TRABAJOS_RETENCION_S', 7 * 86400))
+INTERVALO_MANTENIMIENTO = 60
+VENTANA_METRICAS = 60
+TAMANO_LOTE_PURGA = 5_000
+
+
+def encolar(conn, tipo, datos, referencia=None, max_intentos=REINTENTOS, retraso=0):
+    """Insertar un trabajo dentro de la transacción de `conn`; regresa su id.
+
+    `referencia` (p. ej. 'credito:42') permite consultar los trabajos de un
+    objeto sin conocer sus ids.
+    """
+    ahora = time.time()
+    return conn.execute('''
+        INSERT INTO trabajos (tipo, datos, referencia, max_intentos, disponible_en, creado)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (tipo, json.dumps(datos), referencia, max_intentos, ahora + retraso, ahora)).lastrowid
+
+
+def espera_reintento(intento, base=ESPERA_BASE, maxima=ESPERA_MAXIMA):
+    """Segundos antes del siguiente intento: exponencial, con tope y jitter"""
+    return min(base * 2 ** (intento - 1), maxima) * random.uniform(0.5, 1.0)
+
+
+def tomar(conn, ahora):
+    """Reclamar el siguiente trabajo disponible, o None.
+
+    Es un solo UPDATE: SQLite lo ejecuta con el candado de escritura tomado,
+    así que dos workers nunca reclaman el mismo trabajo.
+    """
+    row = conn.execute('''
+        UPDATE trabajos SET estado = 'en_proceso', intentos = intentos + 1, iniciado = ?
+        WHERE id = (
+            SELECT id FROM trabajos
+            WHERE estado = 'pendiente' AND disponible_en <= ?
+            ORDER BY disponible_en LIMIT 1
+        )
+        RETURNING id, tipo, datos, intentos, max_intentos
+    ''', (ahora, ahora)).fetchone()
+    if row is None:
+        return None
+    return {'id': row[0], 'tipo': row[1], 'datos': json.loads(row[2]),
+            'intentos': row[3], 'max_intentos': row[4]}
+
+
+def completar(conn, trabajo_id, resultado=None):
+    conn.execute('''
+        UPDATE trabajos SET estado = 'completado', terminado = ?, resultado = ?, error = NULL
+        WHERE id = ?
+    ''', (time.time(), None if resultado is None else json.dumps(resultado), trabajo_id))
+
+
+def fallar(conn, trabajo, error):
+    """Reprogramar el trabajo con espera o, sin intentos restantes, marcarlo
+    fallido. Regresa True si se reprogramó."""
+    ahora = time.time()
+    if trabajo['intentos'] >= trabajo['max_intentos']:
+        conn.execute('''
+            UPDATE trabajos SET estado = 'fallido', terminado = ?, error = ? WHERE id = ?
+        ''', (ahora, error, trabajo['id']))
+        return False
+    conn.execute('''
+        UPDATE trabajos SET estado = 'pendiente', disponible_en = ?, error = ? WHERE id = ?
+    ''', (ahora + espera_reintento(trabajo['intentos']), error, trabajo['id']))
+    return True
+
+
+def recuperar_vencidos(conn, ahora, vencimiento=VENCIMIENTO):
+    """Liberar los trabajos `en_proceso` de workers que murieron sin terminarlos"""
+    return conn.execute('''
+        UPDATE trabajos SET
+            estado = CASE WHEN intentos >= max_intentos THEN 'fallido' ELSE 'pendiente' END,
+            terminado = CASE WHEN intentos >= max_intentos THEN ? END,
+            disponible_en = ?,
+            error = 'Vencido: el worker no terminó el trabajo'
+        WHERE estado = 'en_proceso' AND iniciado < ?
+    ''', (ahora, ahora, ahora - vencimiento)).rowcount
+
+
+def purgar(conn, ahora, retencion=RETENCION, tamano_lote=TAMANO_LOTE_PURGA):
+    """Borrar un lote de trabajos completados hace más de `retencion` segundos
+    (los fallidos se conservan para revisarlos)"""
+    return conn.execute('''
+        DELETE FROM trabajos WHERE id IN (
+            SELECT id FROM trabajos WHERE terminado < ? AND estado = 'completado' LIMIT ?
+        )
+    ''', (ahora - retencion, tamano_lote)).rowcount
+
+
+_COLUMNAS_ESTADO = '''
+    id, tipo, referencia, estado, intentos, max_intentos, disponible_en, creado,
+    iniciado, terminado, resultado, error
+'''
+
+
+def _fila_a_trabajo(row):
+    trabajo = dict(row)
+    trabajo['resultado'] = json.loads(trabajo['resultado']) if trabajo['resultado'] else None
+    return trabajo
+
+
+def obtener(conn, trabajo_id):
+    """Estado de un trabajo como dict, o None"""
+    row = conn.execute(f'SELECT {_COLUMNAS_ESTADO} FROM trabajos WHERE id = ?', (trabajo_id,)).fetchone()
+    return _fila_a_trabajo(row) if row else None
+
+
+def listar(conn, referencia):
+    """Trabajos de una referencia, del más antiguo al más reciente"""
+    rows = conn.execute(f'''
+        SELECT {_COLUMNAS_ESTADO} FROM trabajos WHERE referencia = ? ORDER BY id
+    ''', (referencia,)).fetchall()
+    return [_fila_a_trabajo(row) for row in rows]
+
+
+def metricas(conn, ahora=None, ventana=VENTANA_METRICAS):
+    """Tamaño de la cola y rendimiento de la última `ventana` de segundos.
+
+    Salen de la tabla, no de contadores en memoria, para que reflejen a todos
+    los procesos que trabajan la cola.
+    """
+    ahora = time.time() if ahora is None else ahora
+    por_estado = dict(conn.execute('SELECT estado, COUNT(*) FROM trabajos GROUP BY estado').fetchall())
+    mas_antiguo = conn.execute('''
+        SELECT MIN(creado) FROM trabajos WHERE estado = 'pendiente'
+    ''').fetchone()[0]
+    terminados, completados, fallidos, duracion, espera, reintentos = conn.execute('''
+        SELECT COUNT(*), SUM(estado = 'completado'), SUM(estado = 'fallido'),
+               AVG(terminado - iniciado), AVG(iniciado - creado), SUM(intentos - 1)
+        FROM trabajos WHERE terminado >= ?
+    ''', (ahora - ventana,)).fetchone()
+    return {
+        'pendientes': por_estado.get('pendiente', 0),
+        'en_proceso': por_estado.get('en_proceso', 0),
+        'completados': por_estado.get('completado', 0),
+        'fallidos': por_estado.get('fallido', 0),
+        'antiguedad_pendiente_s': round(ahora - mas_antiguo, 3) if mas_antiguo else 0,
+        'ventana_s': ventana,
+        'terminados_ventana': terminados,
+        'por_segundo': round((completados or 0) / ventana, 3),
+        'fallidos_ventana': fallidos or 0,
+        'reintentos_ventana': reintentos or 0,
+        'duracion_promedio_ms': round(duracion * 1000, 3) if duracion is not None else None,
+        'espera_promedio_ms': round(espera * 1000, 3) if espera is not None else None,
+    }
+
+
+class ColaTrabajos:
+    """Registro de manejadores y pool de hilos que trabaja la tabla `trabajos`.
+
+    `obtener_conexion` es un callable como app.get_db. Los hilos no
+    sobreviven a fork(): cada proceso que deba trabajar la cola llama a
+    iniciar() (o a ejecutar() en un proceso dedicado).
+    """
+
+    def __init__(self, obtener_conexion, intervalo=INTERVALO):
+        self._obtener_conexion = obtener_conexion
+        self.intervalo = intervalo
+        self._manejadores = {}
+        self._lock = threading.Lock()
+        self._hilos = []
+        self._pid = None
+        self._detener = threading.Event()
+        self._aviso = threading.Event()
+        self._proximo_mantenimiento = 0.0
+
+    def tarea(self, tipo):
+        """Decorador que registra el manejador de un tipo de trabajo; recibe
+        los datos del trabajo como argumentos con nombre"""
+        def registrar(funcion):
+            self._manejadores[tipo] = funcion
+            return funcion
+        return registrar
+
+    def encolar(self, conn, tipo, datos, **opciones):
+        if tipo not in self._manejadores:
+            raise KeyError(f'Tipo de trabajo desconocido: {tipo}')
+        trabajo_id = encolar(conn, tipo, datos, **opciones)
+        # Los hilos de este proceso despiertan sin esperar al siguiente sondeo;
+        # su UPDATE espera el candado hasta que esta transacción confirme
+        self._aviso.set()
+        return trabajo_id
+
+    def iniciar(self, hilos=HILOS):
+        """Arrancar los hilos en este proceso (no hace nada si ya corren)"""
+        with self._lock:
+            if self._pid == os.getpid() and self._hilos:
+                return
+            self._pid = os.getpid()
+            self._detener.clear()
+            self._hilos = [threading.Thread(target=self._trabajar, name=f'trabajos-{i}', daemon=True)
+                           for i in range(hilos)]
+            for hilo in self._hilos:
+                hilo.start()
+        logger.info('Cola de trabajos iniciada', extra={'hilos': hilos})
+
+    def detener(self, timeout=30):
+        """Pedir a los hilos que terminen y esperar el trabajo en curso"""
+        self._detener.set()
+        self._aviso.set()
+        with self._lock:
+            hilos, self._hilos = self._hilos, []
+        for hilo in hilos:
+            if hilo is not threading.current_thread():
+                hilo.join(timeout)
+
+    def ejecutar(self, hilos=HILOS):
+        """Trabajar la cola hasta que una señal termine el proceso"""
+        self.iniciar(hilos)
+        try:
+            self._detener.wait()
+        finally:
+            self.detener()
+
+    def _trabajar(self):
+        while not self._detener.is_set():
+            try:
+                if not self.procesar_uno():
+                    self._aviso.wait(self.intervalo)
+                    self._aviso.clear()
+            except Exception:
+                logger.exception('Error en la cola de trabajos')
+                self._detener.wait(self.intervalo)
+
+    def procesar_uno(self):
+        """Tomar y ejecutar un trabajo; False si no había ninguno disponible"""
+        ahora = time.time()
+        with self._obtener_conexion() as conn:
+            if ahora >= self._proximo_mantenimiento:
+                self._proximo_mantenimiento = ahora + INTERVALO_MANTENIMIENTO
+                recuperar_vencidos(conn, ahora)
+                purgar(conn, ahora)
+            trabajo = tomar(conn, ahora)
+        if trabajo is None:
+            return False
+
+        inicio = time.perf_counter()
+        try:
+            manejador = self._manejadores[trabajo['tipo']]
+            resultado = manejador(**trabajo['datos'])
+        except Exception as e:
+            with self._obtener_conexion() as conn:
+                reprogramado = fallar(conn, trabajo, f'{type(e).__name__}: {e}')
+            logger.warning('Trabajo fallido', exc_info=True, extra={
+                'trabajo_id': trabajo['id'], 'tipo': trabajo['tipo'],
+                'intento': trabajo['intentos'], 'reprogramado': reprogramado,
+            })
+            return True
+
+        with self._obtener_conexion() as conn:
+            completar(conn, trabajo['id'], resultado)
+        logger.debug('Trabajo completado', extra={
+            'trabajo_id': trabajo['id'], 'tipo': trabajo['tipo'],
+            'duracion_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        })
+        return True